@@ -0,0 +1,7 @@
+"""Benchmarks do pipeline de importação, sem rede e sem custo de API.
+
+stand_ins imita OpenAI, Firecrawl e a Web API do Zotero em servidores HTTP
+locais, corpus gera bibliografias sintéticas e run_benchmark mede cada
+etapa e compara o resultado com uma linha de base salva. startup mede a
+abertura da interface e do CLI contra um orçamento fixo.
+"""
@@ -0,0 +1,132 @@
+"""Bibliografias sintéticas e reprodutíveis para os benchmarks.
+
+As referências misturam os estilos mais comuns nas colagens dos usuários
+(ABNT, APA, Vancouver e texto livre), com livros, artigos e DOIs em parte
+delas. A mesma semente gera sempre o mesmo corpus, e cada referência tem
+título próprio, para que o detector de duplicatas não as descarte. Com
+fmt='bibtex' ou 'ris', o corpus sai como um arquivo exportado de um
+gerenciador de referências, que é importado sem LLM.
+"""
+import random
+
+# Tamanhos usados nos cenários do benchmark
+CORPUS_SIZES = (10, 100, 1000, 10000, 100000)
+
+STYLES = ('abnt', 'apa', 'vancouver', 'free')
+
+# Formatos do arquivo do corpus e a extensão de cada um
+FORMATS = {'text': '.txt', 'bibtex': '.bib', 'ris': '.ris'}
+
+SURNAMES = ('Silva', 'Santos', 'Oliveira', 'Souza', 'Pereira', 'Costa', 'Rodrigues', 'Almeida', 'Nascimento',
+            'Lima', 'Araújo', 'Fernandes', 'Carvalho', 'Gomes', 'Martins', 'Rocha', 'Ribeiro', 'Barbosa',
+            'Smith', 'Johnson', 'Müller', 'García', 'Rossi', 'Dubois', 'Tanaka', 'Kowalski')
+GIVEN_NAMES = ('Ana', 'João', 'Maria', 'Pedro', 'Luiza', 'Carlos', 'Fernanda', 'Rafael', 'Juliana', 'Thiago',
+               'Beatriz', 'Lucas', 'Camila', 'Gabriel', 'Helena', 'Mateus', 'Emma', 'James', 'Sofia', 'Hiroshi')
+TOPICS = ('atenção primária à saúde', 'aprendizagem de máquina', 'políticas públicas de educação',
+          'epidemiologia da dengue', 'gestão de recursos hídricos', 'letramento digital',
+          'reabilitação neurológica', 'economia solidária', 'saúde mental de adolescentes',
+          'agricultura familiar', 'mudanças climáticas', 'formação de professores')
+QUALIFIERS = ('uma revisão sistemática', 'estudo transversal', 'análise de coorte', 'ensaio clínico randomizado',
+              'estudo qualitativo', 'revisão narrativa', 'análise comparativa entre regiões')
+PLACES = ('no Nordeste brasileiro', 'em capitais brasileiras', 'na América Latina', 'em escolas públicas',
+          'no Sistema Único de Saúde', 'em comunidades rurais')
+JOURNALS = ('Revista de Saúde Pública', 'Cadernos de Saúde Pública', 'Ciência & Saúde Coletiva',
+            'Educação e Pesquisa', 'Revista Brasileira de Educação', 'Ambiente & Sociedade',
+            'Arquivos de Neuro-Psiquiatria', 'Journal of Applied Research', 'PLOS ONE')
+PUBLISHERS = (('São Paulo', 'Atlas'), ('Rio de Janeiro', 'Fiocruz'), ('Porto Alegre', 'Artmed'),
+              ('Belo Horizonte', 'Autêntica'), ('Campinas', 'Editora da Unicamp'))
+
+
+def author_names(rng):
+    return [(rng.choice(SURNAMES), rng.choice(GIVEN_NAMES)) for _ in range(rng.randint(1, 4))]
+
+
+def synthetic_reference(rng, number):
+    """Uma referência sintética; number entra no título para que ela seja única"""
+    authors = author_names(rng)
+    title = f"{rng.choice(TOPICS).capitalize()} {rng.choice(PLACES)}: {rng.choice(QUALIFIERS)} {number}"
+    year = rng.randint(1985, 2024)
+    volume, issue = rng.randint(1, 60), rng.randint(1, 12)
+    first_page = rng.randint(1, 900)
+    pages = f"{first_page}-{first_page + rng.randint(5, 30)}"
+    journal = rng.choice(JOURNALS)
+    doi = f"10.{rng.randint(1000, 9999)}/bench.{number}" if rng.random() < 0.3 else ''
+    book = rng.random() < 0.15
+    style = rng.choice(STYLES)
+
+    if style == 'abnt':
+        names = '; '.join(f"{last.upper()}, {first}" for last, first in authors)
+        if book:
+            place, publisher = rng.choice(PUBLISHERS)
+            reference = f"{names}. {title}. {rng.randint(1, 5)}. ed. {place}: {publisher}, {year}."
+        else:
+            reference = f"{names}. {title}. {journal}, v. {volume}, n. {issue}, p. {pages}, {year}."
+        return f"{reference} DOI: {doi}." if doi else reference
+    if style == 'apa':
+        names = ', '.join(f"{last}, {first[0]}." for last, first in authors[:-1])
+        last, first = authors[-1]
+        names = f"{names}, & {last}, {first[0]}." if names else f"{last}, {first[0]}."
+        if book:
+            place, publisher = rng.choice(PUBLISHERS)
+            reference = f"{names} ({year}). {title}. {publisher}."
+        else:
+            reference = f"{names} ({year}). {title}. {journal}, {volume}({issue}), {pages}."
+        return f"{reference} https://doi.org/{doi}" if doi else reference
+    if style == 'vancouver':
+        names = ', '.join(f"{last} {first[0]}" for last, first in authors)
+        reference = f"{names}. {title}. {journal}. {year};{volume}({issue}):{pages}."
+        return f"{reference} doi:{doi}" if doi else reference
+    # Texto livre, como em listas copiadas de slides ou e-mails
+    last, first = authors[0]
+    others = ' et al.' if len(authors) > 1 else ''
+    return f"{title} — {first} {last}{others}, {journal} ({year})"
+
+
+def structured_record(rng, number, fmt):
+    """Um registro BibTeX ou RIS sintético, como os exportados por gerenciadores de referências"""
+    authors = author_names(rng)
+    title = f"{rng.choice(TOPICS).capitalize()} {rng.choice(PLACES)}: {rng.choice(QUALIFIERS)} {number}"
+    year = rng.randint(1985, 2024)
+    volume, issue = rng.randint(1, 60), rng.randint(1, 12)
+    first_page = rng.randint(1, 900)
+    last_page = first_page + rng.randint(5, 30)
+    journal = rng.choice(JOURNALS)
+    doi = f"10.{rng.randint(1000, 9999)}/bench.{number}" if rng.random() < 0.3 else ''
+
+    if fmt == 'bibtex':
+        fields = [('author', ' and '.join(f"{last}, {first}" for last, first in authors)), ('title', title),
+                  ('journal', journal), ('year', year), ('volume', volume), ('number', issue),
+                  ('pages', f"{first_page}--{last_page}")]
+        if doi:
+            fields.append(('doi', doi))
+        body = ',\n'.join(f"  {name} = {{{value}}}" for name, value in fields)
+        return f"@article{{ref{number},\n{body}\n}}\n"
+    lines = ['TY  - JOUR'] + [f"AU  - {last}, {first}" for last, first in authors]
+    lines += [f"TI  - {title}", f"T2  - {journal}", f"PY  - {year}", f"VL  - {volume}", f"IS  - {issue}",
+              f"SP  - {first_page}", f"EP  - {last_page}"]
+    if doi:
+        lines.append(f"DO  - {doi}")
+    return '\n'.join(lines + ['ER  - ', ''])
+
+
+def synthetic_references(count, seed=0):
+    """Gera count referências sintéticas, sempre as mesmas para a mesma semente"""
+    rng = random.Random(seed)
+    for number in range(1, count + 1):
+        yield synthetic_reference(rng, number)
+
+
+def write_corpus(path, count, seed=0, fmt='text'):
+    """Grava o corpus com uma referência por linha, como um arquivo .txt colado pelo usuário
+
+    Com fmt='bibtex' ou 'ris', grava um registro estruturado por referência.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        if fmt == 'text':
+            for reference in synthetic_references(count, seed):
+                f.write(reference + '\n')
+        else:
+            rng = random.Random(seed)
+            for number in range(1, count + 1):
+                f.write(structured_record(rng, number, fmt) + '\n')
+    return path
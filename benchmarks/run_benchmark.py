@@ -0,0 +1,414 @@
+"""Benchmark do pipeline completo contra os servidores locais de stand_ins.
+
+    python -m benchmarks.run_benchmark --references 1000 --latency openai=0.4 --error-rate firecrawl=0.02
+    python -m benchmarks.run_benchmark --references 10000 --baseline benchmarks/baseline.json
+
+Gera um corpus sintético (ou lê --corpus), sobe os stand-ins num processo
+separado e roda ImportEngine.run_references de ponta a ponta. Para cada
+etapa (parse_references, generate_firecrawl_query, fetch_firecrawl_data,
+merge_batch e o upload de create_zotero_items) reporta chamadas, erros,
+vazão em referências por segundo e latência p50/p99 por chamada, além do
+tempo total e do pico de memória do processo.
+
+Com --duplicates, uma fração do corpus é importada antes da medição (sem
+entrar nos números), e a execução medida encontra esses itens como
+duplicatas e os trata conforme --duplicate-mode (skip, update ou force).
+
+Com --baseline, compara o resultado com o cenário de mesmo nome salvo no
+arquivo e sai com código 1 se alguma métrica de REGRESSION_METRICS piorou
+além da tolerância, para que a verificação possa barrar um commit ou um
+build; --save-baseline grava o resultado atual como a nova referência. As
+métricas comparadas não dependem da máquina (falhas, chamadas por
+referência e latência em múltiplos da latência do stand-in), então a linha
+de base gravada num computador vale no CI.
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from benchmarks.corpus import FORMATS, write_corpus
+from benchmarks.stand_ins import SERVICES, ServiceProfile, StandInConfig, StandIns
+from import_engine import ImportConfig, ImportEngine
+from library_index import DUPLICATE_MODES
+from reference_reader import read_references
+from zotero_uploader import ZoteroUploader
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Latência padrão de cada serviço, em segundos (da ordem de uma chamada real, em escala menor)
+DEFAULT_LATENCY = {'openai': 0.05, 'firecrawl': 0.05, 'zotero': 0.02}
+
+# Etapas medidas, na ordem do pipeline
+STAGE_NAMES = ('parse', 'query', 'firecrawl', 'merge', 'create')
+
+# Serviço simulado de que cada etapa depende (a latência dele é a unidade das razões de latência)
+STAGE_SERVICES = {'parse': 'openai', 'query': 'openai', 'firecrawl': 'firecrawl', 'merge': 'openai',
+                  'create': 'zotero'}
+
+# Métricas comparadas com a linha de base: (caminho, maior é melhor, diferença absoluta ignorada).
+# Só entram métricas que não dependem da máquina: falhas, chamadas por referência e a mediana da latência
+# em múltiplos da latência do stand-in. Vazão, tempos absolutos, p99 e memória ficam só no relatório,
+# porque variam entre a máquina que gravou a linha de base e os runners compartilhados do CI.
+REGRESSION_METRICS = (
+    [('total.failed', False, 0)]
+    + [(f"{stage}.calls_per_ref", False, 0.05) for stage in STAGE_NAMES]
+    + [(f"{stage}.p50_latency_ratio", False, 2.0) for stage in STAGE_NAMES]
+)
+
+# Percentis de etapas com menos chamadas que isto não são comparados (variam demais entre execuções)
+MIN_LATENCY_SAMPLES = 20
+
+
+def percentile(values, fraction):
+    """Percentil pelo posto mais próximo (values já ordenados)"""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(values)))
+    return values[rank - 1]
+
+
+def peak_memory_mb():
+    """Pico de memória residente do processo, em MB (None onde não há resource)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class StageRecorder:
+    """Duração de cada chamada de uma etapa e quantas referências ela processou"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = {stage: [] for stage in STAGE_NAMES}
+
+    def wrap(self, stage, func, count):
+        """Envolve func; count(args, result) diz quantas referências a chamada processou"""
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            result, ok = None, False
+            try:
+                result = func(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                end = time.perf_counter()
+                items = count(args, result) if ok else 0
+                with self._lock:
+                    self.calls[stage].append((start, end, items, ok))
+        return timed
+
+    def summary(self):
+        stages = {}
+        for stage, calls in self.calls.items():
+            durations = sorted((end - start) * 1000 for start, end, _, _ in calls)
+            items = sum(count for _, _, count, _ in calls)
+            span = (max(end for _, end, _, _ in calls) - min(start for start, _, _, _ in calls)) if calls else 0
+            stages[stage] = {
+                'calls': len(calls),
+                'errors': sum(1 for *_, ok in calls if not ok),
+                'items': items,
+                # Referências por segundo enquanto a etapa esteve ativa (as etapas se sobrepõem no fluxo)
+                'throughput': round(items / span, 2) if span else 0.0,
+                'p50_ms': round(percentile(durations, 0.50), 2),
+                'p99_ms': round(percentile(durations, 0.99), 2),
+            }
+        return stages
+
+
+def instrument(engine, recorder):
+    """Mede as etapas desta instância do motor (e os uploads, enquanto o bloco with durar)"""
+    engine.parse_references = recorder.wrap('parse', engine.parse_references, lambda args, items: len(items))
+    engine.generate_firecrawl_query = recorder.wrap('query', engine.generate_firecrawl_query, lambda args, url: 1)
+    engine.fetch_firecrawl_data = recorder.wrap('firecrawl', engine.fetch_firecrawl_data, lambda args, data: 1)
+    engine.merge_batch = recorder.wrap('merge', engine.merge_batch, lambda args, items: len(items))
+
+    @contextlib.contextmanager
+    def uploads():
+        # O uploader é criado dentro de create_zotero_items, então a medição fica na classe
+        original = ZoteroUploader.upload
+        ZoteroUploader.upload = recorder.wrap('create', original, lambda args, report: len(report['success']))
+        try:
+            yield
+        finally:
+            ZoteroUploader.upload = original
+    return uploads()
+
+
+def parse_settings(values, cast, defaults=None):
+    """Converte opções "serviço=valor" repetidas num dicionário"""
+    settings = dict(defaults or {})
+    for value in values or ():
+        service, sep, raw = value.partition('=')
+        if not sep or service not in SERVICES:
+            raise ValueError(f"use serviço=valor, com serviço em {', '.join(SERVICES)}: {value}")
+        settings[service] = cast(raw)
+    return settings
+
+
+def stand_in_config(args):
+    latency = parse_settings(args.latency, float, DEFAULT_LATENCY)
+    jitter = parse_settings(args.jitter, float)
+    error_rate = parse_settings(args.error_rate, float)
+    rpm = parse_settings(args.rpm, int)
+    profiles = {
+        service: ServiceProfile(latency.get(service, 0.0), jitter.get(service, 0.0),
+                                error_rate.get(service, 0.0), rpm.get(service, 0))
+        for service in SERVICES
+    }
+    return StandInConfig(profiles=profiles, page_chars=args.page_chars, conflict_rate=args.conflict_rate,
+                         library_items=args.library_items, seed=args.seed)
+
+
+def engine_config(args, stand_ins, workdir):
+    """Configuração do motor apontada para os stand-ins, sem caches nem diário que mascarem a medição"""
+    budgets = {} if args.keep_budgets else {'openai_rpm': 0, 'openai_tpm': 0, 'firecrawl_rpm': 0, 'resolver_rpm': 0}
+    return ImportConfig(
+        library_id='1', api_key='benchmark', openai_key='benchmark', firecrawl_key='benchmark',
+        max_workers=args.workers, parse_workers=args.parse_workers, upload_workers=args.upload_workers,
+        metadata_resolvers=(), local_parse=args.local_parse, duplicate_mode=args.duplicate_mode,
+        response_cache_path='', scrape_cache_dir='', journal_path='',
+        library_index_path=os.path.join(workdir, 'library_index.json'),
+        schema_cache_path=os.path.join(workdir, 'schema.json'),
+        page_attachments_dir=os.path.join(workdir, 'pages'),
+        **budgets, **stand_ins.config_overrides()
+    )
+
+
+def run(args):
+    """Roda um cenário e retorna o resultado (etapas, totais e configuração)"""
+    config = stand_in_config(args)
+    with tempfile.TemporaryDirectory() as workdir, StandIns(config) as stand_ins:
+        corpus = args.corpus or write_corpus(os.path.join(workdir, f"corpus{FORMATS[args.format]}"),
+                                             args.references, args.seed, args.format)
+        if args.duplicates:
+            preload(args, stand_ins, workdir, corpus)
+        before = stand_ins.stats()
+        engine = ImportEngine(engine_config(args, stand_ins, workdir))
+        warm_up(engine)
+        recorder = StageRecorder()
+        outcomes = Counter()
+
+        def on_item(outcome):
+            outcomes[outcome['status']] += 1
+
+        start = time.perf_counter()
+        with instrument(engine, recorder), open(os.devnull, 'w', encoding='utf-8') as devnull:
+            # Os prints do pipeline (um por scrape) custariam mais que as etapas medidas
+            with contextlib.redirect_stdout(sys.stdout if args.verbose else devnull):
+                engine.run_references(read_references(corpus), on_item=on_item)
+        elapsed = time.perf_counter() - start
+        service_stats = {service: {name: value - before[service][name] for name, value in stats.items()}
+                         for service, stats in stand_ins.stats().items()}
+        library_missing = missing_from_index(engine.config.library_index_path, args.library_items)
+
+    references = sum(outcomes.values())
+    return {
+        'scenario': args.scenario or scenario_name(args),
+        'references': references,
+        'total': {
+            'seconds': round(elapsed, 2),
+            'throughput': round(references / elapsed, 2) if elapsed else 0.0,
+            'peak_memory_mb': peak_memory_mb(),
+            'failed': outcomes.get('failed', 0),
+            'outcomes': dict(outcomes),
+            # Itens que já estavam na biblioteca e não chegaram ao índice de duplicatas
+            'library_missing': library_missing,
+        },
+        **relative_metrics(recorder.summary(), references, config),
+        'services': service_stats,
+        # Tokens, custo estimado, espera em fila e novas tentativas medidos pelo próprio motor
+        'metrics': engine.metrics.summary(),
+    }
+
+
+def scenario_name(args):
+    name = f"{args.references}-refs" if args.format == 'text' else f"{args.references}-{args.format}"
+    if args.duplicates:
+        name += f"-{args.duplicate_mode}"
+    return name
+
+
+def preload(args, stand_ins, workdir, corpus):
+    """Importa a fração --duplicates do corpus antes da medição, para que volte como duplicata"""
+    references = list(read_references(corpus))
+    engine = ImportEngine(engine_config(args, stand_ins, workdir))
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        engine.run_references(references[:math.ceil(len(references) * args.duplicates)])
+
+
+def relative_metrics(stages, references, config):
+    """Acrescenta a cada etapa as chamadas por referência e a latência em múltiplos da do stand-in"""
+    for stage, summary in stages.items():
+        summary['calls_per_ref'] = round(summary['calls'] / references, 3) if references else 0.0
+        latency = config.profiles[STAGE_SERVICES[stage]].latency
+        if latency > 0:
+            summary['p50_latency_ratio'] = round(summary['p50_ms'] / (latency * 1000), 2)
+            summary['p99_latency_ratio'] = round(summary['p99_ms'] / (latency * 1000), 2)
+    return stages
+
+
+def warm_up(engine):
+    """Carrega os SDKs e cria os clientes antes da medição
+
+    Os SDKs são importados só no primeiro uso (para a abertura do programa),
+    e sem isto a primeira chamada de cada etapa pagaria a importação.
+    """
+    engine.openai_client()
+    engine.firecrawl_client()
+    engine.zotero_client()
+
+
+def missing_from_index(path, library_items):
+    """Quantos dos library_items pré-existentes do stand-in faltam no índice gravado"""
+    if not library_items:
+        return 0
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            items = json.load(f).get('items', {})
+    except (OSError, ValueError):
+        return library_items
+    # Os itens pré-existentes têm títulos "Item existente N" (normalizados no índice)
+    found = sum(1 for prints in items.values() if prints.get('title', '').startswith('item existente '))
+    return library_items - found
+
+
+def metric(result, path):
+    value = result
+    for part in path.split('.'):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def regressions(result, baseline, tolerance):
+    """Métricas que pioraram mais que tolerance (fração) em relação à linha de base"""
+    found = []
+    for path, higher_is_better, slack in REGRESSION_METRICS:
+        current, previous = metric(result, path), metric(baseline, path)
+        if current is None or previous is None:
+            continue
+        stage = path.split('.')[0]
+        if 'latency' in path and min(metric(result, f"{stage}.calls") or 0,
+                                        metric(baseline, f"{stage}.calls") or 0) < MIN_LATENCY_SAMPLES:
+            continue
+        if higher_is_better:
+            worse = current < previous * (1 - tolerance) and previous - current > slack
+        else:
+            worse = current > previous * (1 + tolerance) and current - previous > slack
+        if worse:
+            found.append(f"{path}: {previous} → {current}")
+    return found
+
+
+def print_report(result, file=sys.stdout):
+    total = result['total']
+    print(f"Cenário {result['scenario']}: {result['references']} referências em {total['seconds']} s "
+          f"({total['throughput']} ref/s), pico de memória {total['peak_memory_mb']} MB", file=file)
+    print(f"Desfechos: {json.dumps(total['outcomes'], ensure_ascii=False)}", file=file)
+    print(f"{'etapa':<10}{'chamadas':>10}{'erros':>8}{'itens':>9}{'ref/s':>11}{'p50 ms':>10}{'p99 ms':>10}", file=file)
+    for stage in STAGE_NAMES:
+        s = result[stage]
+        print(f"{stage:<10}{s['calls']:>10}{s['errors']:>8}{s['items']:>9}{s['throughput']:>11}"
+              f"{s['p50_ms']:>10}{s['p99_ms']:>10}", file=file)
+    for service, stats in result['services'].items():
+        print(f"{service}: {stats['requests']} requisições, {stats['errors']} erros 5xx simulados, "
+              f"{stats['rate_limited']} respostas 429", file=file)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de importação contra stand-ins locais")
+    parser.add_argument('--references', type=int, default=1000, help="tamanho do corpus sintético (10 a 100000)")
+    parser.add_argument('--corpus', help="usa um arquivo de referências em vez do corpus sintético")
+    parser.add_argument('--format', choices=FORMATS, default='text',
+                        help="formato do corpus sintético: texto livre ou registros BibTeX/RIS (importados sem LLM)")
+    parser.add_argument('--seed', type=int, default=0, help="semente do corpus e dos erros simulados")
+    parser.add_argument('--scenario',
+                        help="nome do cenário na linha de base (padrão: <referências>-refs ou <referências>-<formato>, "
+                             "mais -<modo> com --duplicates)")
+    parser.add_argument('--latency', action='append', metavar='SERVIÇO=S', help="latência de um serviço, em segundos")
+    parser.add_argument('--jitter', action='append', metavar='SERVIÇO=S', help="variação da latência, em segundos")
+    parser.add_argument('--error-rate', action='append', metavar='SERVIÇO=F', help="fração de respostas 500")
+    parser.add_argument('--rpm', action='append', metavar='SERVIÇO=N',
+                        help="requisições por minuto antes de responder 429")
+    parser.add_argument('--page-chars', type=int, default=20000, help="tamanho do markdown de cada página")
+    parser.add_argument('--conflict-rate', type=float, default=0.2,
+                        help="fração das páginas que divergem do item e vão à mescla pelo LLM")
+    parser.add_argument('--library-items', type=int, default=0,
+                        help="itens já presentes na biblioteca, que o índice de duplicatas precisa sincronizar")
+    parser.add_argument('--duplicates', type=float, default=0.0,
+                        help="fração do corpus importada antes da medição, que volta como duplicata")
+    parser.add_argument('--duplicate-mode', choices=DUPLICATE_MODES, default='skip',
+                        help="tratamento das duplicatas na execução medida")
+    parser.add_argument('--workers', type=int, default=4, help="referências enriquecidas em paralelo")
+    parser.add_argument('--parse-workers', type=int, default=4, help="blocos analisados em paralelo")
+    parser.add_argument('--upload-workers', type=int, default=3, help="lotes enviados ao Zotero em paralelo")
+    parser.add_argument('--local-parse', action='store_true', help="usa o parser local antes do LLM")
+    parser.add_argument('--keep-budgets', action='store_true',
+                        help="mantém os orçamentos por minuto padrão do motor (por padrão ficam sem limite)")
+    parser.add_argument('--output', help="grava o resultado em JSON")
+    parser.add_argument('--baseline', help="arquivo JSON com os resultados de referência, por cenário")
+    parser.add_argument('--save-baseline', action='store_true', help="grava este resultado na linha de base")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="piora tolerada em cada métrica (fração)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="mostra as mensagens do pipeline")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.save_baseline and not args.baseline:
+        parser.exit(2, "Erro: --save-baseline exige --baseline\n")
+    try:
+        result = run(args)
+    except ValueError as e:
+        parser.exit(2, f"Erro: {str(e)}\n")
+
+    print_report(result)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    if result['total']['library_missing']:
+        print(f"Erro: {result['total']['library_missing']} de {args.library_items} itens da biblioteca "
+              f"ficaram fora do índice de duplicatas", file=sys.stderr)
+        return 1
+
+    if not args.baseline:
+        return 0
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baselines = json.load(f)
+    if args.save_baseline:
+        baselines[result['scenario']] = result
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2)
+        print(f"Linha de base do cenário {result['scenario']} gravada em {args.baseline}")
+        return 0
+
+    baseline = baselines.get(result['scenario'])
+    if baseline is None:
+        print(f"Aviso: o cenário {result['scenario']} não está em {args.baseline}; nada a comparar", file=sys.stderr)
+        return 0
+    found = regressions(result, baseline, args.tolerance)
+    if found:
+        print(f"Regressões em relação à linha de base (tolerância de {args.tolerance:.0%}):", file=sys.stderr)
+        for line in found:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    print(f"Sem regressões em relação à linha de base (tolerância de {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,557 @@
+"""Servidores HTTP locais que imitam OpenAI, Firecrawl e a Web API do Zotero.
+
+Um único servidor atende os três serviços por prefixo de caminho
+(/openai/v1, /firecrawl e /zotero), com respostas no formato que cada SDK
+espera: chat completions (com e sem streaming), /v1/scrape do Firecrawl e os endpoints
+de itens (listagem, item único, criação e PATCH), versões e /schema do Zotero. Cada serviço tem um ServiceProfile
+com latência, taxa de erros 5xx e limite de requisições por minuto (acima
+dele a resposta é 429 com Retry-After), para medir o pipeline com
+resultados repetíveis. StandIns roda o servidor num processo separado, que
+não disputa CPU nem memória com o pipeline medido.
+"""
+import hashlib
+import itertools
+import json
+import multiprocessing
+import random
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from urllib.request import urlopen
+
+SERVICES = ('openai', 'firecrawl', 'zotero')
+
+# Campos de cada tipo de item servidos em /schema (subconjunto do esquema real do Zotero)
+COMMON_FIELDS = ['title', 'abstractNote', 'date', 'language', 'shortTitle', 'url', 'accessDate',
+                 'archive', 'archiveLocation', 'libraryCatalog', 'callNumber', 'rights', 'extra']
+ITEM_TYPES = {
+    'journalArticle': ['publicationTitle', 'volume', 'issue', 'pages', 'series', 'seriesTitle',
+                       'journalAbbreviation', 'DOI', 'ISSN'],
+    'book': ['series', 'seriesNumber', 'volume', 'numberOfVolumes', 'edition', 'place', 'publisher',
+             'numPages', 'ISBN'],
+    'bookSection': ['bookTitle', 'series', 'seriesNumber', 'volume', 'edition', 'place', 'publisher',
+                    'pages', 'ISBN'],
+    'thesis': ['thesisType', 'university', 'place', 'numPages'],
+    'conferencePaper': ['proceedingsTitle', 'conferenceName', 'place', 'publisher', 'volume', 'pages',
+                        'series', 'DOI', 'ISBN'],
+    'report': ['reportNumber', 'reportType', 'institution', 'place', 'pages'],
+    'webpage': ['websiteTitle', 'websiteType'],
+}
+
+# Tamanho de cada pedaço de uma resposta em streaming, em caracteres
+STREAM_CHUNK_CHARS = 64
+
+NUMBERED_LINE = re.compile(r'^\s*\[(\d+)\]\s+(.+?)\s*$')
+YEAR = re.compile(r'\b(1[89]\d\d|20\d\d)\b')
+NAME_WORD = re.compile(r"[A-ZÀ-Ý][A-Za-zÀ-ÿ'-]{2,}")
+
+
+@dataclass
+class ServiceProfile:
+    """Comportamento simulado de um serviço"""
+    # Atraso antes da resposta, em segundos, com variação uniforme de ±jitter
+    latency: float = 0.0
+    jitter: float = 0.0
+    # Fração das requisições respondidas com 500
+    error_rate: float = 0.0
+    # Requisições aceitas por minuto; acima disso responde 429 (0 = sem limite)
+    rpm: int = 0
+
+
+@dataclass
+class StandInConfig:
+    """Perfis dos serviços e forma dos dados simulados"""
+    profiles: dict = field(default_factory=lambda: {name: ServiceProfile() for name in SERVICES})
+    # Tamanho do markdown de cada página raspada
+    page_chars: int = 20000
+    # Fração das páginas cujos metadados divergem do item (título e data), exigindo a mescla pelo LLM
+    conflict_rate: float = 0.2
+    # Itens que já estão na biblioteca antes da importação (o índice de duplicatas precisa baixar todos)
+    library_items: int = 0
+    seed: int = 0
+
+
+# Propriedades de todo item além dos campos do tipo
+ITEM_PROPERTIES = {'key', 'version', 'itemType', 'creators', 'tags', 'collections', 'relations', 'dateAdded',
+                   'dateModified', 'deleted', 'parentItem'}
+
+
+def digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def reference_item(idx, reference):
+    """Item do Zotero extraído de forma aproximada de uma referência sintética
+
+    O título é o trecho mais longo depois dos autores e os sobrenomes são
+    as palavras capitalizadas do primeiro trecho: o suficiente para itens
+    válidos e distintos, sem pretender ser um parser.
+    """
+    parts = [part.strip() for part in re.split(r'\.\s+', reference) if part.strip()]
+    title = max(parts[1:] or parts, key=len)
+    creators = [{'creatorType': 'author', 'lastName': name.title(), 'firstName': ''}
+                for name in NAME_WORD.findall(parts[0] if len(parts) > 1 else '')[:3]]
+    item = {
+        '_id': idx,
+        'itemType': 'journalArticle',
+        'title': title,
+        'creators': creators or [{'creatorType': 'author', 'lastName': 'Anônimo', 'firstName': ''}],
+    }
+    year = YEAR.search(reference)
+    if year:
+        item['date'] = year.group(1)
+    return item
+
+
+def section(prompt, start, end):
+    """Trecho do prompt entre dois marcadores"""
+    begin = prompt.find(start)
+    if begin < 0:
+        return ''
+    begin += len(start)
+    finish = prompt.find(end, begin)
+    return prompt[begin:finish if finish >= 0 else len(prompt)]
+
+
+def chat_reply(prompt):
+    """Resposta do "modelo" para cada prompt do pipeline, reconhecido pelo texto"""
+    if 'Retorne APENAS a URL' in prompt:
+        reference = section(prompt, 'Referência:', 'Retorne APENAS').strip()
+        return f"https://bench.example.org/article/{digest(reference)[:12]}"
+    if 'Referências para processar' in prompt:
+        lines = section(prompt, 'Referências para processar:', 'Retorne APENAS').splitlines()
+        items = []
+        for line in lines:
+            match = NUMBERED_LINE.match(line)
+            if match:
+                items.append(reference_item(int(match.group(1)), match.group(2)))
+        return json.dumps({'items': items}, ensure_ascii=False)
+    if '"conflitos"' in prompt:
+        try:
+            entries = json.loads(section(prompt, 'Entradas:', 'Retorne APENAS'))
+        except ValueError:
+            return '{}'
+        # Fica com o valor da página, como um modelo que prefere a versão mais completa
+        return json.dumps({idx: dict(entry.get('conflitos', {})) for idx, entry in entries.items()},
+                          ensure_ascii=False)
+    if 'Mescle os dois conjuntos' in prompt:
+        data = section(prompt, 'Dados OpenAI:', 'Dados Firecrawl:').strip()
+        return data or '{}'
+    return '{}'
+
+
+def page_payload(url, config):
+    """Resposta do /v1/scrape para uma URL: markdown com ruído e metadados extraídos"""
+    key = digest(url)
+    rng = random.Random(key)
+    conflicting = rng.random() < config.conflict_rate
+    keywords = [f"tema {key[idx:idx + 4]}" for idx in range(0, 12, 4)]
+    abstract = ' '.join(f"Sentença {n} do resumo sobre o estudo {key[:8]}." for n in range(12))
+    head = [
+        '[Início](https://bench.example.org/) | [Edições](https://bench.example.org/issues)',
+        f"# Estudo {key[:8]}",
+        '## Abstract',
+        abstract,
+        f"**Keywords:** {'; '.join(keywords)}",
+        f"DOI: 10.5555/bench.{key[:10]}",
+        f"Published: {2000 + int(key[:2], 16) % 25}",
+        '## Introdução',
+    ]
+    markdown = '\n'.join(head) + '\n'
+    # Completa até page_chars com texto corrido, como o corpo de um artigo
+    body = f"Texto corrido do artigo {key[:8]} com parágrafos longos e citações. "
+    filler = max(0, config.page_chars - len(markdown))
+    markdown += (body * (filler // len(body) + 1))[:filler]
+
+    metadata = {
+        'abstract': abstract,
+        'keywords': keywords,
+        'authors': [{'name': f"Autora {key[12:16].upper()}"}],
+    }
+    if conflicting:
+        metadata['title'] = f"Estudo {key[:8]}"
+        metadata['date'] = str(1900 + int(key[:2], 16) % 100)
+    return {
+        'success': True,
+        'data': {
+            'markdown': markdown,
+            'json': metadata,
+            'metadata': {'sourceURL': url, 'statusCode': 200, 'language': 'pt'},
+        }
+    }
+
+
+def zotero_schema():
+    item_types = []
+    for name, fields in ITEM_TYPES.items():
+        item_types.append({
+            'itemType': name,
+            'fields': [{'field': field} for field in COMMON_FIELDS[:1] + fields + COMMON_FIELDS[1:]],
+            'creatorTypes': [{'creatorType': 'author', 'primary': True}, {'creatorType': 'editor'}],
+        })
+    return {'version': 1, 'itemTypes': item_types}
+
+
+class StandInState:
+    """Estado compartilhado entre as requisições: limites, contadores e a "biblioteca" do Zotero"""
+
+    def __init__(self, config):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.windows = {name: deque() for name in SERVICES}
+        self.stats = {name: {'requests': 0, 'errors': 0, 'rate_limited': 0} for name in SERVICES}
+        self.library_version = 1
+        self.keys = (f"B{n:07X}" for n in itertools.count())
+        self.schema = zotero_schema()
+        self.schema_etag = f'"{digest(json.dumps(self.schema))[:16]}"'
+        # Itens da biblioteca por chave, com a versão em que foram gravados
+        self.items = {}
+        for n in range(config.library_items):
+            key = next(self.keys)
+            self.items[key] = {'key': key, 'version': 1, 'itemType': 'journalArticle',
+                               'title': f"Item existente {n}", 'date': str(1950 + n % 70),
+                               'creators': [{'creatorType': 'author', 'lastName': f"Autor{n}", 'firstName': ''}]}
+
+    def admit(self, service):
+        """None se a requisição segue; senão (status, Retry-After) do erro simulado"""
+        profile = self.config.profiles.get(service) or ServiceProfile()
+        with self.lock:
+            self.stats[service]['requests'] += 1
+            now = time.monotonic()
+            window = self.windows[service]
+            while window and now - window[0] >= 60:
+                window.popleft()
+            if profile.rpm and len(window) >= profile.rpm:
+                self.stats[service]['rate_limited'] += 1
+                return 429, max(1, int(60 - (now - window[0])) + 1)
+            window.append(now)
+            if profile.error_rate and self.rng.random() < profile.error_rate:
+                self.stats[service]['errors'] += 1
+                return 500, None
+            delay = profile.latency + (self.rng.uniform(-profile.jitter, profile.jitter) if profile.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+        return None
+
+    def rate_headers(self, service):
+        profile = self.config.profiles.get(service) or ServiceProfile()
+        if not profile.rpm:
+            return {}
+        with self.lock:
+            remaining = max(0, profile.rpm - len(self.windows[service]))
+        return {'x-ratelimit-limit-requests': str(profile.rpm), 'x-ratelimit-remaining-requests': str(remaining),
+                'x-ratelimit-reset-requests': '60s'}
+
+    def create_items(self, items):
+        """Resposta de POST /items no formato da API de escrita do Zotero"""
+        result = {'successful': {}, 'success': {}, 'unchanged': {}, 'failed': {}}
+        with self.lock:
+            self.library_version += 1
+            version = self.library_version
+            for position, item in enumerate(items):
+                if not isinstance(item, dict) or item.get('itemType') not in ITEM_TYPES and not (
+                        item.get('itemType') == 'note' and item.get('parentItem') in self.items):
+                    result['failed'][str(position)] = {'key': None, 'code': 400, 'message': 'itemType inválido'}
+                    continue
+                key = next(self.keys)
+                data = dict(item, key=key, version=version)
+                self.items[key] = data
+                result['success'][str(position)] = key
+                result['successful'][str(position)] = {'key': key, 'version': version, 'data': data}
+        return result
+
+    def update_item(self, key, fields, expected_version):
+        """PATCH de um item: (status, nova versão); 412 se o item mudou desde expected_version
+
+        Como na API real, um campo que não existe no tipo do item recusa o PATCH inteiro com 400.
+        """
+        with self.lock:
+            data = self.items.get(key)
+            if data is None:
+                return 404, None
+            if expected_version is not None and int(expected_version) != data['version']:
+                return 412, None
+            allowed = set(COMMON_FIELDS + ITEM_TYPES.get(data['itemType'], [])) | ITEM_PROPERTIES
+            if set(fields) - allowed:
+                return 400, None
+            self.library_version += 1
+            data.update({name: value for name, value in fields.items() if name not in ('key', 'version')})
+            data['version'] = self.library_version
+            return 204, self.library_version
+
+    def list_items(self, query):
+        """(itens da página, total) de GET /items, com since, itemKey, start e limit como na API
+
+        Como na API real, o formato JSON devolve no máximo 100 itens por página
+        (25 sem limit) e format=versions só é paginado quando limit é dado.
+        """
+        since = int(query.get('since', ['0'])[0] or 0)
+        wanted = set(query['itemKey'][0].split(',')) if query.get('itemKey') else None
+        with self.lock:
+            found = [data for key, data in sorted(self.items.items())
+                     if data['version'] > since and (wanted is None or key in wanted)]
+        start = int(query.get('start', ['0'])[0] or 0)
+        limit = query.get('limit', [''])[0]
+        if query.get('format') == ['versions']:
+            end = start + int(limit) if limit else None
+        else:
+            end = start + min(int(limit or 25), 100)
+        return found[start:end], len(found)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'StandIn/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        try:
+            return json.loads(raw) if raw else None
+        except ValueError:
+            return None
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_status(self, service, status, retry):
+        headers = {'Retry-After': str(retry)} if retry else {}
+        headers.update(self.state.rate_headers(service))
+        message = 'Rate limit exceeded' if status == 429 else 'Simulated server error'
+        self.send_json(status, {'error': {'message': message, 'type': 'stand_in', 'code': status}}, headers)
+
+    def route(self, method):
+        url = urlsplit(self.path)
+        parts = url.path.strip('/').split('/')
+        service = parts[0] if parts else ''
+        if service == '_stats':
+            return self.send_json(200, self.state.stats)
+        if service not in SERVICES:
+            return self.send_json(404, {'error': f"caminho desconhecido: {url.path}"})
+        body = self.read_body() if method in ('POST', 'PATCH', 'PUT') else None
+        rejected = self.state.admit(service)
+        if rejected:
+            return self.send_error_status(service, *rejected)
+        handler = getattr(self, f"{method.lower()}_{service}", None)
+        if handler is None:
+            return self.send_json(405, {'error': 'método não suportado'})
+        return handler('/'.join(parts[1:]), parse_qs(url.query), body)
+
+    def do_GET(self):
+        self.route('GET')
+
+    def do_POST(self):
+        self.route('POST')
+
+    def do_PATCH(self):
+        self.route('PATCH')
+
+    # OpenAI: POST /openai/v1/chat/completions
+
+    def post_openai(self, path, query, body):
+        if path != 'v1/chat/completions' or not isinstance(body, dict):
+            return self.send_json(404, {'error': {'message': f"caminho desconhecido: {path}"}})
+        prompt = body['messages'][-1]['content']
+        content = chat_reply(prompt)
+        usage = {'prompt_tokens': len(prompt) // 4 + 1, 'completion_tokens': len(content) // 4 + 1}
+        usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+        base = {'id': f"chatcmpl-{digest(prompt)[:12]}", 'created': int(time.time()), 'model': body.get('model', '')}
+        headers = self.state.rate_headers('openai')
+        if not body.get('stream'):
+            return self.send_json(200, dict(base, object='chat.completion', usage=usage, choices=[{
+                'index': 0, 'finish_reason': 'stop',
+                'message': {'role': 'assistant', 'content': content},
+            }]), headers)
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        chunk = dict(base, object='chat.completion.chunk')
+        for start in range(0, len(content), STREAM_CHUNK_CHARS):
+            delta = {'content': content[start:start + STREAM_CHUNK_CHARS]}
+            if not start:
+                delta['role'] = 'assistant'
+            self.send_event(dict(chunk, choices=[{'index': 0, 'delta': delta, 'finish_reason': None}]))
+        self.send_event(dict(chunk, choices=[{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]))
+        if (body.get('stream_options') or {}).get('include_usage'):
+            self.send_event(dict(chunk, choices=[], usage=usage))
+        self.send_chunk(b'data: [DONE]\n\n')
+        self.send_chunk(b'')
+
+    def send_event(self, payload):
+        self.send_chunk(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode('utf-8'))
+
+    def send_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b'\r\n')
+
+    # Firecrawl: POST /firecrawl/v1/scrape
+
+    def post_firecrawl(self, path, query, body):
+        if path != 'v1/scrape' or not isinstance(body, dict) or not body.get('url'):
+            return self.send_json(400, {'success': False, 'error': 'requisição inválida'})
+        return self.send_json(200, page_payload(body['url'], self.state.config))
+
+    # Zotero: /zotero/schema, /zotero/itemFields..., /zotero/{users|groups}/<id>/items...
+
+    def zotero_headers(self, extra=None, total=0):
+        headers = {'Last-Modified-Version': str(self.state.library_version), 'Total-Results': str(total)}
+        headers.update(extra or {})
+        return headers
+
+    def get_zotero(self, path, query, body):
+        parts = path.split('/')
+        if path == 'schema':
+            if self.headers.get('If-None-Match') == self.state.schema_etag:
+                self.send_response(304)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return None
+            return self.send_json(200, self.state.schema, {'ETag': self.state.schema_etag})
+        if path == 'itemTypes':
+            return self.send_json(200, [{'itemType': name} for name in ITEM_TYPES])
+        if path == 'itemFields':
+            names = dict.fromkeys(COMMON_FIELDS + [f for fields in ITEM_TYPES.values() for f in fields])
+            return self.send_json(200, [{'field': name} for name in names])
+        if path == 'itemTypeFields':
+            fields = ITEM_TYPES.get(query.get('itemType', [''])[0])
+            if fields is None:
+                return self.send_json(400, {'error': 'itemType inválido'})
+            return self.send_json(200, [{'field': name} for name in COMMON_FIELDS[:1] + fields + COMMON_FIELDS[1:]])
+        if path == 'items/new':
+            item_type = next((t for t in self.state.schema['itemTypes']
+                              if t['itemType'] == query.get('itemType', [''])[0]), None)
+            if item_type is None:
+                return self.send_json(400, {'error': 'itemType inválido'})
+            template = {'itemType': item_type['itemType'],
+                        'creators': [{'creatorType': 'author', 'firstName': '', 'lastName': ''}]}
+            template.update({f['field']: '' for f in item_type['fields']})
+            template.update({'tags': [], 'collections': [], 'relations': {}})
+            return self.send_json(200, template)
+        if len(parts) >= 3 and parts[0] in ('users', 'groups'):
+            # Nada é apagado na biblioteca simulada
+            if parts[2] == 'deleted':
+                return self.send_json(200, {'collections': [], 'items': [], 'searches': [], 'tags': []},
+                                      self.zotero_headers())
+            if parts[2:] == ['items']:
+                items, total = self.state.list_items(query)
+                if query.get('format') == ['versions']:
+                    payload = {data['key']: data['version'] for data in items}
+                else:
+                    payload = [{'key': data['key'], 'version': data['version'], 'data': data} for data in items]
+                return self.send_json(200, payload, self.zotero_headers(total=total))
+            if len(parts) == 4 and parts[2] == 'items':
+                data = self.state.items.get(parts[3])
+                if data is None:
+                    return self.send_json(404, {'error': 'item não encontrado'})
+                return self.send_json(200, {'key': data['key'], 'version': data['version'], 'data': data},
+                                      self.zotero_headers())
+        return self.send_json(404, {'error': f"caminho desconhecido: {path}"})
+
+    def post_zotero(self, path, query, body):
+        parts = path.split('/')
+        if len(parts) != 3 or parts[0] not in ('users', 'groups') or parts[2] != 'items':
+            return self.send_json(404, {'error': f"caminho desconhecido: {path}"})
+        if not isinstance(body, list) or len(body) > 50:
+            return self.send_json(400, {'error': 'o corpo deve ser uma lista de até 50 itens'})
+        result = self.state.create_items(body)
+        return self.send_json(200, result, self.zotero_headers())
+
+
+    def patch_zotero(self, path, query, body):
+        parts = path.split('/')
+        if len(parts) != 4 or parts[0] not in ('users', 'groups') or parts[2] != 'items':
+            return self.send_json(404, {'error': f"caminho desconhecido: {path}"})
+        if not isinstance(body, dict):
+            return self.send_json(400, {'error': 'o corpo deve ser um objeto'})
+        status, version = self.state.update_item(parts[3], body, self.headers.get('If-Unmodified-Since-Version'))
+        if status != 204:
+            message = {404: 'item não encontrado', 412: 'item modificado'}.get(status, 'campo inválido para o tipo')
+            return self.send_json(status, {'error': message})
+        self.send_response(204)
+        self.send_header('Last-Modified-Version', str(version))
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+        return None
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Muitas conexões simultâneas dos pools dos SDKs
+    request_queue_size = 256
+
+    def __init__(self, address, config):
+        super().__init__(address, StandInHandler)
+        self.state = StandInState(config)
+
+
+def serve(config, ready, host='127.0.0.1', port=0):
+    """Sobe o servidor e informa a porta em ready (multiprocessing.Queue)"""
+    server = StandInServer((host, port), config)
+    ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+class StandIns:
+    """Servidores de stand_ins num processo separado, durante um bloco with
+
+        with StandIns(config) as stand_ins:
+            engine = ImportEngine(ImportConfig(**stand_ins.config_overrides(), ...))
+    """
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        self.config = config or StandInConfig()
+        self.host = host
+        self.port = port
+        self.url = None
+        self._process = None
+
+    def __enter__(self):
+        context = multiprocessing.get_context()
+        ready = context.Queue()
+        self._process = context.Process(target=serve, args=(self.config, ready, self.host, self.port), daemon=True)
+        self._process.start()
+        self.port = ready.get(timeout=30)
+        self.url = f"http://{self.host}:{self.port}"
+        return self
+
+    def __exit__(self, *exc):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join(timeout=10)
+            self._process = None
+        return False
+
+    def config_overrides(self):
+        """Campos de ImportConfig que apontam o motor para os stand-ins"""
+        return {
+            'openai_base_url': f"{self.url}/openai/v1",
+            'firecrawl_api_url': f"{self.url}/firecrawl",
+            'zotero_api_url': f"{self.url}/zotero",
+        }
+
+    def stats(self):
+        """Requisições, erros e 429 simulados por serviço"""
+        with urlopen(f"{self.url}/_stats", timeout=10) as response:
+            return json.loads(response.read())
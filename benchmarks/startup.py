@@ -0,0 +1,196 @@
+"""Tempo de abertura: importação dos módulos, --help do CLI e primeira janela.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 10 --budget first_window=800
+    python -m benchmarks.startup --exe "dist/Text to Zotero/Text to Zotero.exe"
+
+Cada medida roda num processo novo, como na abertura real: o tempo de
+importação vem de python -X importtime (com os módulos que mais pesam), o
+do CLI é o tempo de parede de zotero_importer_cli.py --help e o da janela
+vai do lançamento até a primeira atualização da janela, marcada pela
+variável ZOTERO_IMPORTER_STARTUP_PROBE (também funciona com o executável
+do PyInstaller, via --exe). Vale a mediana de --runs execuções.
+
+O programa sai com código 1 se alguma medida passar do orçamento em
+STARTUP_BUDGET_MS ou se algum SDK de LAZY_MODULES for carregado na
+abertura, em vez de no primeiro uso.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from zotero_importer import STARTUP_PROBE_VAR
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Orçamento de cada medida, em milissegundos, incluindo a partida do interpretador
+STARTUP_BUDGET_MS = {
+    'import_gui': 300,
+    'import_cli': 300,
+    'cli_help': 500,
+    'first_window': 1000,
+}
+
+# Módulos que só podem ser carregados no primeiro uso (juntos, passam de um segundo)
+LAZY_MODULES = ('openai', 'pyzotero', 'firecrawl', 'requests')
+
+# Módulo importado em cada medida de importação
+IMPORT_TARGETS = {'import_gui': 'zotero_importer', 'import_cli': 'zotero_importer_cli'}
+
+
+def parse_importtime(stderr, module):
+    """Tempo cumulativo de module (ms) e os filhos diretos que mais pesam, da saída de -X importtime"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        entries.append((int(cumulative), len(name) - len(name.lstrip()) - 1, name.strip()))
+    for idx, (cumulative, depth, name) in enumerate(entries):
+        if depth == 0 and name == module:
+            break
+    else:
+        raise ValueError(f"{module} não aparece na saída de -X importtime")
+    children = []
+    for child_cumulative, child_depth, child_name in reversed(entries[:idx]):
+        if child_depth == 0:
+            break
+        if child_depth == 2:
+            children.append((child_name, round(child_cumulative / 1000, 1)))
+    children.sort(key=lambda child: -child[1])
+    return cumulative / 1000, children[:5]
+
+
+def measure_import(module):
+    """Importa module num processo novo; retorna (ms, filhos mais pesados, SDKs carregados)"""
+    code = f"import sys, {module}; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    wall = (time.perf_counter() - start) * 1000
+    cumulative, heaviest = parse_importtime(result.stderr, module)
+    loaded = [name for name in result.stdout.strip().split(',') if name]
+    return wall, cumulative, heaviest, loaded
+
+
+def measure_cli_help():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, 'zotero_importer_cli.py', '--help'], cwd=ROOT,
+                   stdout=subprocess.DEVNULL, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def display_available():
+    if sys.platform.startswith('win') or sys.platform == 'darwin':
+        return True
+    return bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+
+def measure_first_window(exe=None):
+    """Do lançamento até a janela pronta, em ms (pelo arquivo gravado por startup_probe)"""
+    command = [exe] if exe else [sys.executable, 'zotero_importer.py']
+    with tempfile.TemporaryDirectory() as workdir:
+        probe = os.path.join(workdir, 'probe')
+        env = dict(os.environ, **{STARTUP_PROBE_VAR: probe})
+        start = time.time()
+        subprocess.run(command, cwd=ROOT, env=env, check=True, timeout=60)
+        if not os.path.exists(probe):
+            raise RuntimeError("a janela não abriu (o arquivo do probe não foi gravado)")
+        with open(probe, 'r', encoding='utf-8') as f:
+            return (float(f.read()) - start) * 1000
+
+
+def run(args):
+    result = {}
+    for name, module in IMPORT_TARGETS.items():
+        samples = [measure_import(module) for _ in range(args.runs)]
+        result[name] = {
+            'ms': round(statistics.median(sample[0] for sample in samples), 1),
+            'import_ms': round(statistics.median(sample[1] for sample in samples), 1),
+            'heaviest': samples[-1][2],
+            'lazy_modules_loaded': sorted({module for sample in samples for module in sample[3]}),
+        }
+    result['cli_help'] = {'ms': round(statistics.median(measure_cli_help() for _ in range(args.runs)), 1)}
+    if args.exe or display_available():
+        result['first_window'] = {
+            'ms': round(statistics.median(measure_first_window(args.exe) for _ in range(args.runs)), 1)
+        }
+        if args.exe:
+            result['first_window']['exe'] = args.exe
+    return result
+
+
+def over_budget(result, budget):
+    found = []
+    for name, limit in budget.items():
+        if name in result and result[name]['ms'] > limit:
+            found.append(f"{name}: {result[name]['ms']} ms (orçamento {limit} ms)")
+    for name in IMPORT_TARGETS:
+        if result[name]['lazy_modules_loaded']:
+            found.append(f"{name}: carregou na abertura {', '.join(result[name]['lazy_modules_loaded'])}")
+    return found
+
+
+def parse_budget(values):
+    budget = dict(STARTUP_BUDGET_MS)
+    for value in values or ():
+        name, sep, raw = value.partition('=')
+        if not sep or name not in STARTUP_BUDGET_MS:
+            raise ValueError(f"use medida=ms, com medida em {', '.join(STARTUP_BUDGET_MS)}: {value}")
+        budget[name] = float(raw)
+    return budget
+
+
+def print_report(result, budget, file=sys.stdout):
+    print(f"{'medida':<14}{'ms':>9}{'orçamento':>11}", file=file)
+    for name in STARTUP_BUDGET_MS:
+        if name not in result:
+            print(f"{name:<14}{'-':>9}{budget[name]:>11}  (sem tela; use --exe ou rode com DISPLAY)", file=file)
+            continue
+        print(f"{name:<14}{result[name]['ms']:>9}{budget[name]:>11}", file=file)
+    for name in IMPORT_TARGETS:
+        heaviest = ', '.join(f"{module} {ms} ms" for module, ms in result[name]['heaviest'])
+        print(f"{name}: importação {result[name]['import_ms']} ms; mais pesados: {heaviest}", file=file)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Mede a abertura da interface e do CLI contra um orçamento")
+    parser.add_argument('--runs', type=int, default=5, help="execuções por medida (vale a mediana)")
+    parser.add_argument('--budget', action='append', metavar='MEDIDA=MS',
+                        help=f"muda o orçamento de uma medida ({', '.join(STARTUP_BUDGET_MS)})")
+    parser.add_argument('--exe', help="mede a primeira janela deste executável em vez do código-fonte")
+    parser.add_argument('--output', help="grava o resultado em JSON")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        budget = parse_budget(args.budget)
+    except ValueError as e:
+        parser.exit(2, f"Erro: {str(e)}\n")
+    result = run(args)
+
+    print_report(result, budget)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    found = over_budget(result, budget)
+    if found:
+        print("Acima do orçamento de abertura:", file=sys.stderr)
+        for line in found:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    print("Abertura dentro do orçamento")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+"""Parser local e determinístico de referências bibliográficas.
+
+Reconhece referências de artigos e livros nos estilos ABNT, APA e Vancouver
+e produz o mesmo JSON do Zotero que o parse via OpenAI (itemType, creators,
+date, publicationTitle, volume, issue, pages, DOI...), junto com uma nota de
+confiança entre 0 e 1. Só as referências com confiança baixa precisam ir
+para o LLM.
+"""
+import re
+
+DOI_PATTERN = re.compile(r'\b(10\.\d{4,9}/[^\s"<>]+)', re.IGNORECASE)
+DOI_PREFIX = re.compile(r'(?:https?://(?:dx\.)?doi\.org/|doi:\s*)\S+', re.IGNORECASE)
+URL_PATTERN = re.compile(r'(?:Dispon[ií]vel em:\s*)?<?https?://\S+>?', re.IGNORECASE)
+ACCESS_PATTERN = re.compile(r'Acesso em:.*$', re.IGNORECASE)
+
+UPPER = 'A-ZÀ-ÖØ-Þ'
+NAME_CHARS = r"A-Za-zÀ-ÖØ-öø-ÿ'\-"
+
+# ABNT: "SOBRENOME, Nome; SOBRENOME, N. B. Título..." (o resto não começa com uma inicial)
+ABNT_HEAD = re.compile(
+    rf"^(?P<authors>[{UPPER}][{UPPER}'\- ]+,[^;]+?(?:;\s*[{UPPER}][{UPPER}'\- ]+,[^;]+?)*)"
+    rf"\.\s+(?![{UPPER}]\.)(?P<rest>.+)$"
+)
+# ABNT artigo: "Título. Revista, Local, v. 12, n. 3, p. 45-67, jan./mar. 2020" (o local é opcional)
+ABNT_ARTICLE = re.compile(
+    r'^(?P<title>.+?)\.\s+(?P<journal>[^.,]+?),\s*'
+    r'(?:(?P<place>[^.,\d]+?),\s*(?=v\.|n\.|p\.))?'
+    r'(?:v\.\s*(?P<volume>[\w\-]+),?\s*)?'
+    r'(?:n\.\s*(?P<issue>[\w\-/]+),?\s*)?'
+    r'(?:p\.\s*(?P<pages>[\w\-–]+),?\s*)?'
+    r'(?:[a-zç]{3,4}\.?(?:/[a-zç]{3,4}\.?)?\s*)?'
+    r'(?P<year>\d{4})$',
+    re.IGNORECASE
+)
+# ABNT livro: "Título. 2. ed. São Paulo: Editora, 2020"
+ABNT_BOOK = re.compile(
+    r'^(?P<title>.+?)\.\s+(?:(?P<edition>\d+)\.?\s*ed\.\s+)?'
+    r'(?P<place>[^.:]+?):\s*(?P<publisher>[^,]+?),\s*(?P<year>\d{4})$',
+    re.IGNORECASE
+)
+# APA: "Autores (2020). Resto"
+APA_HEAD = re.compile(r'^(?P<authors>.+?)\s*\((?P<year>\d{4})[a-z]?(?:,[^)]*)?\)\.\s+(?P<rest>.+)$')
+# APA artigo: "Título. Journal, 12(3), 45–67"
+APA_ARTICLE = re.compile(
+    r'^(?P<title>.+[.?!])\s+(?P<journal>[^.,]+?),\s*(?P<volume>\d+)(?:\s*\((?P<issue>[^)]+)\))?'
+    r'(?:,\s*(?P<pages>[\w\-–]+))?$'
+)
+# APA livro: "Título (2nd ed.). Local: Editora"
+APA_BOOK = re.compile(
+    r'^(?P<title>.+?)(?:\s*\((?P<edition>\d+)\w*\s*ed\.\))?\.\s+(?:(?P<place>[^.:]+):\s*)?(?P<publisher>[^.]+)$'
+)
+# Vancouver: "Silva JA, Souza M. Título. J Nutr. 2020 Jan;12(3):45-67"
+VANCOUVER = re.compile(
+    r'^(?P<authors>[^.]+)\.\s+(?P<title>.+[.?!])\s+(?P<journal>[^.;]+?)\.\s*'
+    r'(?P<year>\d{4})[^;:]*;\s*(?P<volume>[\w\-]+)?(?:\s*\((?P<issue>[^)]+)\))?'
+    r'(?::\s*(?P<pages>[\w\-–]+))?$'
+)
+
+# Peso de cada campo na nota de confiança
+FIELD_WEIGHTS = {
+    'creators': 0.25,
+    'title': 0.25,
+    'date': 0.15,
+    'publicationTitle': 0.15,
+    'volume': 0.05,
+    'pages': 0.05,
+    'publisher': 0.15,
+    'place': 0.05,
+}
+
+
+def extract_doi(text):
+    """Retorna o primeiro DOI encontrado no texto, sem pontuação final"""
+    match = DOI_PATTERN.search(text)
+    return match.group(1).rstrip('.,;)]>') if match else ''
+
+
+def _creator(last_name, first_name):
+    first_name = first_name.strip()
+    # A inicial final perde o ponto quando ele também encerra a lista de autores
+    if re.search(rf'(?:^|\s|\.)[{UPPER}]$', first_name):
+        first_name += '.'
+    return {'creatorType': 'author', 'firstName': first_name, 'lastName': last_name.strip()}
+
+
+def _clean_author_list(text):
+    return re.sub(r'\bet\s+al\.?', '', text, flags=re.IGNORECASE).strip(' ,;.')
+
+
+def parse_abnt_authors(text):
+    """'SILVA, João A.; SOUZA, M.' -> creators; exige sobrenomes em maiúsculas"""
+    creators = []
+    for part in _clean_author_list(text).split(';'):
+        last, sep, first = part.partition(',')
+        last = last.strip()
+        if not sep or not re.fullmatch(rf"[{UPPER}][{UPPER}'\- ]+", last):
+            return []
+        creators.append(_creator(last.title(), first))
+    return creators
+
+
+def parse_apa_authors(text):
+    """'Silva, J. A., Souza, M., & Lima, P.' -> creators"""
+    text = _clean_author_list(text).replace('&', ',')
+    # O ponto da última inicial pode ter saído com a pontuação final da lista
+    found = re.findall(
+        rf"([{UPPER}][{NAME_CHARS} ]+?),\s*((?:[{UPPER}]\.\s*-?\s*)*[{UPPER}]\.?)(?![{NAME_CHARS}])", text
+    )
+    return [_creator(last, initials) for last, initials in found]
+
+
+def count_authors(text, style):
+    """Quantos autores a lista tem pelos separadores do estilo (para conferir o que foi extraído)"""
+    text = _clean_author_list(text)
+    if not text:
+        return 0
+    if style == 'abnt':
+        return len([part for part in text.split(';') if part.strip()])
+    if style == 'apa':
+        # "., Sobrenome" ou "& Sobrenome" separam autores; "., J." é só a inicial seguinte
+        return 1 + len(re.findall(rf"(?:\.,|&)\s*(?:&\s*)?(?=[{UPPER}][{NAME_CHARS}]*[a-zà-öø-ÿ])", text))
+    return len([part for part in text.split(',') if part.strip()])
+
+
+def parse_vancouver_authors(text):
+    """'Silva JA, Souza M' -> creators"""
+    creators = []
+    for part in _clean_author_list(text).split(','):
+        tokens = part.split()
+        if len(tokens) < 2 or not re.fullmatch(rf'[{UPPER}]{{1,3}}', tokens[-1]):
+            return []
+        creators.append(_creator(' '.join(tokens[:-1]), ' '.join(f"{i}." for i in tokens[-1])))
+    return creators
+
+
+def _pages(value):
+    return (value or '').replace('–', '-').strip()
+
+
+def _strip_links(text):
+    """Remove DOI, URLs e datas de acesso, que atrapalham os padrões de estilo"""
+    text = DOI_PREFIX.sub('', text)
+    text = URL_PATTERN.sub('', text)
+    text = ACCESS_PATTERN.sub('', text)
+    text = DOI_PATTERN.sub('', text)
+    return re.sub(r'\s+', ' ', text).strip(' .')
+
+
+def _title(value):
+    return value.strip().rstrip('.')
+
+
+def _parse_abnt(text):
+    head = ABNT_HEAD.match(text)
+    if not head:
+        return None
+    creators = parse_abnt_authors(head.group('authors'))
+    if not creators:
+        return None
+    authors = count_authors(head.group('authors'), 'abnt')
+
+    # Livro primeiro: "Local: Editora, ANO" não tem v./n./p., mas casaria como periódico
+    match = ABNT_BOOK.match(head.group('rest'))
+    if match:
+        return authors, {
+            'itemType': 'book',
+            'creators': creators,
+            'title': _title(match.group('title')),
+            'edition': match.group('edition') or '',
+            'place': match.group('place').strip(),
+            'publisher': match.group('publisher').strip(),
+            'date': match.group('year'),
+        }
+    match = ABNT_ARTICLE.match(head.group('rest'))
+    if match:
+        return authors, {
+            'itemType': 'journalArticle',
+            'creators': creators,
+            'title': _title(match.group('title')),
+            'publicationTitle': match.group('journal').strip(),
+            'volume': match.group('volume') or '',
+            'issue': match.group('issue') or '',
+            'pages': _pages(match.group('pages')),
+            'date': match.group('year'),
+        }
+    return None
+
+
+def _parse_apa(text):
+    head = APA_HEAD.match(text)
+    if not head:
+        return None
+    creators = parse_apa_authors(head.group('authors'))
+    if not creators:
+        return None
+    authors = count_authors(head.group('authors'), 'apa')
+
+    match = APA_ARTICLE.match(head.group('rest'))
+    if match:
+        return authors, {
+            'itemType': 'journalArticle',
+            'creators': creators,
+            'title': _title(match.group('title')),
+            'publicationTitle': match.group('journal').strip(),
+            'volume': match.group('volume') or '',
+            'issue': match.group('issue') or '',
+            'pages': _pages(match.group('pages')),
+            'date': head.group('year'),
+        }
+    match = APA_BOOK.match(head.group('rest'))
+    if match:
+        return authors, {
+            'itemType': 'book',
+            'creators': creators,
+            'title': _title(match.group('title')),
+            'edition': match.group('edition') or '',
+            'place': (match.group('place') or '').strip(),
+            'publisher': match.group('publisher').strip(),
+            'date': head.group('year'),
+        }
+    return None
+
+
+def _parse_vancouver(text):
+    match = VANCOUVER.match(text)
+    if not match:
+        return None
+    creators = parse_vancouver_authors(match.group('authors'))
+    if not creators:
+        return None
+    return count_authors(match.group('authors'), 'vancouver'), {
+        'itemType': 'journalArticle',
+        'creators': creators,
+        'title': _title(match.group('title')),
+        'publicationTitle': match.group('journal').strip(),
+        'volume': match.group('volume') or '',
+        'issue': match.group('issue') or '',
+        'pages': _pages(match.group('pages')),
+        'date': match.group('year'),
+    }
+
+
+def score(item, authors=None):
+    """Nota de confiança: soma dos pesos dos campos preenchidos, mais bônus de DOI
+
+    authors é o número de autores contado pelos separadores da lista; se o
+    parser extraiu outro número de creators, algum autor se perdeu ou foi
+    partido e a nota cai na mesma proporção.
+    """
+    if item['itemType'] == 'book':
+        expected = ('creators', 'title', 'date', 'publisher', 'place')
+    else:
+        expected = ('creators', 'title', 'date', 'publicationTitle', 'volume', 'pages')
+    total = sum(FIELD_WEIGHTS[field] for field in expected)
+    found = sum(FIELD_WEIGHTS[field] for field in expected if item.get(field))
+    confidence = found / total
+    if item.get('DOI'):
+        confidence = min(1.0, confidence + 0.1)
+    # Títulos muito curtos ou muito longos costumam indicar segmentação errada
+    if not 3 <= len(item.get('title', '')) <= 400:
+        confidence *= 0.5
+    # Periódico só com números ou título terminado em "v"/"n"/"p" solto: o corte caiu no meio do "v. 30"
+    if re.fullmatch(r'[\d\s\-–/]+', item.get('publicationTitle', '') or 'x'):
+        confidence *= 0.5
+    if re.search(r'[\s,]+[vnp]$', item.get('title', '')):
+        confidence *= 0.5
+    parsed = len(item.get('creators') or [])
+    if authors and parsed != authors:
+        confidence *= min(parsed, authors) / max(parsed, authors)
+    return round(confidence, 3)
+
+
+def parse_citation(text):
+    """Analisa uma referência e retorna (item no formato do Zotero, confiança)
+
+    Retorna (None, 0.0) quando nenhum dos estilos reconhece a referência.
+    """
+    text = ' '.join(text.split())
+    text = re.sub(r'^\s*(?:\[\d+\]|\d+[.)])\s+', '', text)
+    doi = extract_doi(text)
+    stripped = _strip_links(text)
+
+    best, best_score = None, 0.0
+    for parser in (_parse_abnt, _parse_apa, _parse_vancouver):
+        parsed = parser(stripped)
+        if parsed is None:
+            continue
+        authors, item = parsed
+        if doi:
+            item['DOI'] = doi
+        item = {key: value for key, value in item.items() if value}
+        confidence = score(item, authors)
+        if confidence > best_score:
+            best, best_score = item, confidence
+    return best, best_score
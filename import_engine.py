@@ -0,0 +1,1571 @@
+"""Motor de importação sem interface gráfica.
+
+Todas as etapas do pipeline (parse, geração de URL, Firecrawl, mescla e
+criação no Zotero) vivem aqui, com configuração explícita, para que possam
+ser usadas em servidor, em lote ou em testes sem criar uma janela Tk.
+"""
+import gzip
+import hashlib
+import html
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from dataclasses import dataclass, asdict, fields
+
+from citation_parser import parse_citation
+from import_journal import ImportJournal, reference_id
+from import_metrics import ImportMetrics
+from json_stream import JSONItemStream, ReplayFilter, loads_tolerant
+from library_index import LibraryIndex, DUPLICATE_MODES
+from metadata_resolver import build_resolver, csl_to_zotero, extract_identifiers
+from page_content import extract_abstract, extract_keywords, page_excerpt, truncate
+from rate_limiter import RateLimiter, RateLimitExceeded, error_status
+from reference_merge import merge_item
+from reference_reader import iter_references
+from response_cache import ResponseCache
+from scrape_cache import ScrapeCache
+from structured_parser import parse_record
+from task_graph import TaskGraph
+from zotero_schema import SchemaCache, ZOTERO_API
+from zotero_uploader import ZoteroUploader
+
+# pyzotero, openai e requests são importados no primeiro uso, dentro dos métodos
+# *_client: só o openai leva perto de um segundo para carregar, e nem a janela nem
+# o --help do CLI precisam deles
+
+FIRECRAWL_API = 'https://api.firecrawl.dev'
+# Folga do timeout do cliente sobre o do scrape, para a resposta chegar depois que o Firecrawl desiste
+FIRECRAWL_TIMEOUT_MARGIN = 5
+
+CREDENTIALS_FILE = 'zotero_credentials.json'
+
+# Variáveis de ambiente usadas por ImportConfig.from_env (ver .env.example)
+ENV_VARS = {
+    'library_id': 'ZOTERO_LIBRARY_ID',
+    'api_key': 'ZOTERO_API_KEY',
+    'openai_key': 'OPENAI_API_KEY',
+    'firecrawl_key': 'FIRECRAWL_API_KEY',
+}
+
+# Process in batches of 50 (API limit)
+BATCH_SIZE = 50
+
+# Mensagens de status de cada etapa, na ordem em que são executadas
+STAGES = {
+    'parse': "Analisando referências com OpenAI...",
+    'enrich': "Buscando dados complementares via Firecrawl...",
+    'create': "Criando itens no Zotero...",
+}
+
+# Conteúdo da página raspada guardado no item (ver ImportConfig.page_notes)
+PAGE_NOTE_MODES = ('excerpt', 'attachment', 'none')
+
+
+@dataclass
+class ImportConfig:
+    """Credenciais e parâmetros do pipeline de importação"""
+    library_id: str = ''
+    api_key: str = ''
+    openai_key: str = ''
+    firecrawl_key: str = ''
+    library_type: str = 'user'
+    parse_model: str = 'o3-mini'
+    query_model: str = 'o3-mini'
+    merge_model: str = 'gpt-4o'
+    # Tempo máximo de cada scrape do Firecrawl, em milissegundos
+    scrape_timeout: int = 30000
+    # Referências enriquecidas em paralelo (URL + Firecrawl + mescla)
+    max_workers: int = 4
+    # Gera a URL do Firecrawl de cada referência sem identificador em paralelo com o parse, em vez de
+    # depois dele (custa uma chamada a mais se o item analisado acabar resolvido por DOI)
+    prefetch_queries: bool = True
+    # Tamanho estimado (em tokens) de cada lote de itens com conflitos enviado à mescla pelo LLM
+    merge_batch_tokens: int = 4000
+    # Chamadas simultâneas a cada serviço, somadas entre todas as etapas do pipeline
+    openai_concurrency: int = 8
+    firecrawl_concurrency: int = 4
+    resolver_concurrency: int = 8
+    # Orçamento por minuto de cada serviço (0 = sem limite); os cabeçalhos x-ratelimit-* do OpenAI o ajustam
+    openai_rpm: int = 500
+    openai_tpm: int = 200000
+    firecrawl_rpm: int = 100
+    resolver_rpm: int = 180
+    # Novas tentativas em 429, 5xx e falhas de rede, esperando o Retry-After ou com backoff exponencial
+    rate_limit_retries: int = 5
+    # Tamanho máximo estimado (em tokens) de cada bloco enviado ao parse
+    parse_chunk_tokens: int = 2000
+    # Blocos de referências analisados em paralelo
+    parse_workers: int = 4
+    # Respostas do OpenAI em modo JSON e em streaming, lidas item a item
+    json_mode: bool = True
+    stream_responses: bool = True
+    # Registros BibTeX, RIS, CSL-JSON e PubMed/MEDLINE viram itens direto, sem o OpenAI
+    native_formats: bool = True
+    # Busca dados complementares também para esses registros (resolvedores, Firecrawl e mescla);
+    # desligado, eles vão do arquivo para o Zotero sem nenhuma chamada externa além do upload
+    enrich_native: bool = False
+    # Referências que o parser local reconhece com esta confiança não vão ao OpenAI
+    local_parse: bool = True
+    local_parse_min_confidence: float = 0.9
+    # Cache SQLite das respostas do OpenAI; vazio desativa o cache
+    response_cache_path: str = 'zotero_importer_cache.sqlite'
+    response_cache_ttl: int = 30 * 24 * 3600
+    response_cache_max_entries: int = 50000
+    # Resolvedores de DOI/PMID/ISBN consultados antes do Firecrawl, em ordem
+    metadata_resolvers: tuple = ('doi', 'pubmed', 'isbn')
+    # Arquivo JSON de registros CSL para resolver offline (substitui os resolvedores de rede)
+    resolver_fixture_path: str = ''
+    # Cache dos scrapes do Firecrawl por URL; vazio desativa o cache. As entradas vencem só por
+    # idade: o Firecrawl não devolve ETag / Last-Modified para revalidar
+    scrape_cache_dir: str = 'zotero_importer_scrapes'
+    scrape_cache_max_age: int = 7 * 24 * 3600
+    # Página raspada no item: 'excerpt' guarda numa nota só resumo, palavras-chave e metadados de
+    # citação (até page_excerpt_chars); 'attachment' anexa o markdown completo comprimido (.md.gz);
+    # 'none' não guarda nada
+    page_notes: str = 'excerpt'
+    page_excerpt_chars: int = 4000
+    page_attachments_dir: str = 'zotero_importer_pages'
+    # Diário append-only do estado de cada referência, para retomar importações; vazio desativa
+    journal_path: str = 'zotero_import_journal.jsonl'
+    # Lotes enviados ao Zotero em paralelo e novas tentativas por item em erros temporários
+    upload_workers: int = 3
+    upload_retries: int = 4
+    # Duplicatas da biblioteca: 'skip' ignora, 'update' atualiza o item existente, 'force' cria mesmo assim
+    duplicate_mode: str = 'skip'
+    library_index_path: str = 'zotero_library_index.json'
+    # Esquema de tipos de item do Zotero (campos e templates), revalidado por ETag
+    schema_cache_path: str = 'zotero_schema.json'
+    schema_cache_max_age: int = 24 * 3600
+    # Endereços base das APIs; vazio usa o padrão de cada SDK (benchmarks/ aponta para servidores locais)
+    openai_base_url: str = ''
+    firecrawl_api_url: str = ''
+    zotero_api_url: str = ''
+    # Métricas das chamadas externas: trace JSONL (uma linha por chamada) e arquivo .prom; vazio desativa
+    metrics_trace_path: str = ''
+    metrics_prometheus_path: str = ''
+    # Créditos do Firecrawl por scrape (com extração JSON) quando a resposta não informa creditsUsed
+    firecrawl_scrape_credits: int = 5
+
+    @classmethod
+    def from_env(cls, **overrides):
+        """Cria a configuração a partir das variáveis de ambiente"""
+        values = {name: os.environ.get(var, '') for name, var in ENV_VARS.items()}
+        values.update(overrides)
+        return cls(**values)
+
+    @classmethod
+    def from_credentials_file(cls, path=CREDENTIALS_FILE, **overrides):
+        """Cria a configuração a partir do arquivo de credenciais salvo pela interface"""
+        with open(path, 'r', encoding='utf-8') as f:
+            creds = json.load(f)
+        known = {field.name for field in fields(cls)}
+        values = {key: value for key, value in creds.items() if key in known}
+        values.update(overrides)
+        return cls(**values)
+
+    def credentials(self):
+        """Retorna apenas as credenciais, no formato do arquivo de credenciais"""
+        return {name: getattr(self, name) for name in ENV_VARS}
+
+    def missing_credentials(self):
+        """Lista as credenciais obrigatórias que não foram preenchidas"""
+        return [name for name, value in self.credentials().items() if not value]
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class ImportCancelled(Exception):
+    """Importação cancelada antes de terminar"""
+
+
+@dataclass
+class ProgressEvent:
+    """Evento de progresso emitido pelo pipeline
+
+    kind é 'stage' (início de uma etapa), 'reference' (um item concluído),
+    'done', 'error' ou 'cancelled'.
+    """
+    kind: str
+    stage: str = ''
+    message: str = ''
+    current: int = 0
+    total: int = 0
+    result: object = None
+
+
+def save_credentials(config, path=CREDENTIALS_FILE):
+    """Save credentials for future use"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(config.credentials(), f, indent=4)
+
+
+def check_cancelled(cancel_event):
+    """Interrompe o pipeline se o cancelamento foi solicitado"""
+    if cancel_event is not None and cancel_event.is_set():
+        raise ImportCancelled("Importação cancelada")
+
+
+def split_references(text):
+    """Divide o texto colado em referências individuais
+
+    Registros BibTeX, RIS, MEDLINE e CSL-JSON são separados pelo formato; no
+    texto livre, usa parágrafos separados por linha em branco quando
+    existem; senão, marcadores de lista numerada; senão, uma referência por
+    linha.
+    """
+    return list(iter_references(text.strip().splitlines(), lookahead=None))
+
+
+def estimate_tokens(text):
+    """Estimativa rápida de tokens (~4 caracteres por token)"""
+    return len(text) // 4 + 1
+
+
+def chunk_references(references, max_tokens):
+    """Agrupa referências consecutivas em blocos de até max_tokens
+
+    Uma referência nunca é dividida; se sozinha passar do limite, forma um
+    bloco próprio. Um None na entrada sai como None, sem fechar o bloco: é
+    um ponto de passagem em que quem consome pode atender outras fontes.
+    """
+    chunk = []
+    chunk_tokens = 0
+    for reference in references:
+        if reference is None:
+            yield None
+            continue
+        tokens = estimate_tokens(reference)
+        if chunk and chunk_tokens + tokens > max_tokens:
+            yield chunk
+            chunk = []
+            chunk_tokens = 0
+        chunk.append(reference)
+        chunk_tokens += tokens
+    if chunk:
+        yield chunk
+
+
+def apply_resolved_metadata(item, resolved):
+    """Completa o item com os metadados do registro, que prevalecem por serem estruturados"""
+    merged = dict(item)
+    merged.update({field: value for field, value in resolved.items() if value})
+    return merged
+
+
+def merge_entry(item, conflicts):
+    """Entrada de um item no prompt de merge_batch (sem as notas, que não entram na mescla)
+
+    conflicts traz, para cada campo ambíguo, o valor alternativo.
+    """
+    return {
+        'item': {field: value for field, value in public_fields(item).items() if field != 'notes'},
+        'conflitos': conflicts
+    }
+
+
+def public_fields(item):
+    """Remove as marcações internas do pipeline (chaves iniciadas por '_')"""
+    return {field: value for field, value in item.items() if not field.startswith('_')}
+
+
+def firecrawl_timeout(params):
+    """Timeout do requests, em segundos, para um scrape cujo params['timeout'] está em milissegundos"""
+    timeout = params.get('timeout')
+    return timeout / 1000 + FIRECRAWL_TIMEOUT_MARGIN if timeout else None
+
+
+def firecrawl_data(response):
+    """Conteúdo de 'data' de uma resposta do /v1/scrape
+
+    Status de erro viram requests.HTTPError com a resposta anexada, para que
+    429 e 5xx sejam repetidos por call_service; uma resposta sem sucesso
+    levanta ValueError, que não é repetido.
+    """
+    if response.status_code != 200:
+        import requests
+        try:
+            detail = response.json().get('error')
+        except ValueError:
+            detail = None
+        raise requests.HTTPError(
+            f"Firecrawl respondeu {response.status_code}: {detail or response.reason}", response=response
+        )
+    body = response.json()
+    if not isinstance(body, dict) or not body.get('success') or 'data' not in body:
+        raise ValueError(f"Falha no scrape: {body.get('error', body) if isinstance(body, dict) else body}")
+    return body['data']
+
+
+def note_html(text):
+    """Texto de uma nota em HTML, como o Zotero guarda (notas já em HTML passam como estão)"""
+    text = (text or '').strip()
+    if text.startswith('<'):
+        return text
+    return ''.join(f"<p>{html.escape(line)}</p>" for line in text.splitlines() if line.strip())
+
+
+def describe_item(item):
+    """Monta uma referência textual a partir de um item no formato do Zotero"""
+    authors = '; '.join(
+        ', '.join(part for part in (c.get('lastName', ''), c.get('firstName', '')) if part) or c.get('name', '')
+        for c in item.get('creators', [])
+    )
+    parts = [authors, item.get('title', ''), item.get('publicationTitle', '') or item.get('publisher', ''),
+             item.get('date', '')]
+    if item.get('DOI'):
+        parts.append(f"DOI: {item['DOI']}")
+    return '. '.join(part for part in parts if part)
+
+
+def item_outcome(item_id, ref, item, status, key=None, error=None):
+    """Desfecho de um item na criação: 'created', 'duplicate', 'updated', 'resumed' ou 'failed'"""
+    return {
+        'position': int(item_id) if item_id is not None else None,
+        'ref': ref,
+        'status': status,
+        'key': key,
+        'title': item.get('title', '') if item else '',
+        'error': error,
+        'conflicts': sorted(item.get('_conflicts', {})) if item else [],
+    }
+
+
+def count_successes(results):
+    """Conta os itens criados com sucesso nas respostas de create_items"""
+    return sum(len(result.get('success', {})) for result in results)
+
+
+def count_duplicates(results):
+    """Conta os itens já existentes na biblioteca (ignorados, atualizados ou de uma importação retomada)"""
+    return sum(
+        len(result.get('unchanged', {})) + len(result.get('updated', {})) + len(result.get('resumed', {}))
+        for result in results
+    )
+
+
+class ImportEngine:
+    """Pipeline parse → Firecrawl → mescla → Zotero, independente da interface"""
+
+    def __init__(self, config, resolver=None):
+        self.config = config
+        self.resolver = resolver or build_resolver(config.metadata_resolvers, config.resolver_fixture_path)
+        self._response_cache = None
+        self._scrape_cache = None
+        self._cache_lock = threading.Lock()
+        # Um cliente por serviço durante toda a vida do motor, para reaproveitar conexões
+        self._clients = {}
+        self._local = threading.local()
+        self._limits = {
+            'openai': threading.BoundedSemaphore(max(1, config.openai_concurrency)),
+            'firecrawl': threading.BoundedSemaphore(max(1, config.firecrawl_concurrency)),
+            'resolver': threading.BoundedSemaphore(max(1, config.resolver_concurrency)),
+        }
+        self.rate_limits = {
+            'openai': RateLimiter(config.openai_rpm, config.openai_tpm),
+            'firecrawl': RateLimiter(config.firecrawl_rpm),
+            'resolver': RateLimiter(config.resolver_rpm),
+        }
+        self.metrics = ImportMetrics(config.metrics_trace_path)
+
+    def limit(self, service):
+        """Semáforo que limita as chamadas simultâneas a um serviço ('openai', 'firecrawl', 'resolver')"""
+        return self._limits[service]
+
+    def call_service(self, service, call, tokens=0, transient=(), operation='', details=None):
+        """Executa call dentro do orçamento por minuto e do limite de concorrência do serviço
+
+        Repete a chamada em 429, erros 5xx e falhas de rede; se o serviço
+        continua em 429 depois de rate_limit_retries tentativas, levanta
+        RateLimitExceeded. A chamada é registrada em self.metrics com o
+        tempo total, a espera por orçamento e concorrência e as novas
+        tentativas; call pode acrescentar detalhes (tokens, créditos) em
+        details, que vão junto no registro.
+        """
+        limiter = self.rate_limits[service]
+        retries = self.config.rate_limit_retries
+        operation = operation or service
+        details = {} if details is None else details
+        start = time.perf_counter()
+        queued = 0.0
+        for attempt in range(retries + 1):
+            waiting = time.perf_counter()
+            limiter.acquire(tokens)
+            try:
+                with self.limit(service):
+                    queued += time.perf_counter() - waiting
+                    result = call()
+            except Exception as e:
+                if attempt == retries or not limiter.backoff(e, attempt, transient):
+                    self.metrics.record(service, operation, time.perf_counter() - start, queued, attempt, 'error',
+                                        http_status=error_status(e), **details)
+                    if error_status(e) == 429:
+                        raise RateLimitExceeded(f"Limite de requisições do serviço {service} excedido: {str(e)}")
+                    raise
+            else:
+                self.metrics.record(service, operation, time.perf_counter() - start, queued, attempt, **details)
+                return result
+
+    @property
+    def response_cache(self):
+        """Cache de respostas do OpenAI, aberto no primeiro uso (None se desativado)"""
+        if self._response_cache is None and self.config.response_cache_path:
+            with self._cache_lock:
+                if self._response_cache is None:
+                    self._response_cache = ResponseCache(
+                        self.config.response_cache_path,
+                        ttl=self.config.response_cache_ttl,
+                        max_entries=self.config.response_cache_max_entries
+                    )
+        return self._response_cache
+
+    @property
+    def scrape_cache(self):
+        """Cache de scrapes do Firecrawl, aberto no primeiro uso (None se desativado)"""
+        if self._scrape_cache is None and self.config.scrape_cache_dir:
+            with self._cache_lock:
+                if self._scrape_cache is None:
+                    self._scrape_cache = ScrapeCache(
+                        self.config.scrape_cache_dir,
+                        max_age=self.config.scrape_cache_max_age
+                    )
+        return self._scrape_cache
+
+    def zotero_schema(self, zot):
+        """Esquema de tipos de item do Zotero, compartilhado no processo e salvo em disco"""
+        schema = self.item_schema()
+        with self.metrics.measure('zotero', 'schema'):
+            schema.ensure_loaded(zot)
+        return schema
+
+    def open_journal(self):
+        """Diário de importação desta biblioteca (None se desativado)"""
+        if not self.config.journal_path:
+            return None
+        return ImportJournal(self.config.journal_path, f"{self.config.library_type}:{self.config.library_id}")
+
+    def library_index(self, zot):
+        """Índice da biblioteca para detecção de duplicatas, sincronizado com o Zotero"""
+        index = LibraryIndex(self.config.library_index_path, f"{self.config.library_type}:{self.config.library_id}")
+        try:
+            with self.metrics.measure('zotero', 'sync'):
+                index.sync(zot)
+        except Exception as e:
+            raise Exception(f"Erro ao sincronizar o índice da biblioteca do Zotero: {str(e)}")
+        return index
+
+    def update_existing_item(self, zot, key, template, schema):
+        """Completa um item existente com os campos preenchidos do novo
+
+        Só entram os campos válidos para o tipo do item existente (e os
+        creators), como na criação: a API recusa o PATCH inteiro com 400 se
+        houver um campo desconhecido.
+        """
+        with self.metrics.measure('zotero', 'update_item'):
+            existing = zot.item(key)
+            data = existing.get('data', existing)
+            valid_item_fields = schema.valid_fields(data.get('itemType'))
+            for field, value in template.items():
+                if field.startswith('_') or field in ('itemType', 'collections', 'relations', 'tags', 'notes',
+                                                      'key', 'version'):
+                    continue
+                if field != 'creators' and valid_item_fields is not None and field not in valid_item_fields:
+                    continue
+                if value and not data.get(field):
+                    data[field] = value
+            zot.update_item(data)
+
+    def add_notes(self, zot, notes):
+        """Cria as notas dos itens criados (o trecho da página, por exemplo) como itens filhos
+
+        notes é {chave do item: [notas]}. 'notes' não é campo de nenhum tipo de
+        item, então não vai no upload do próprio item: cada nota vira um item
+        'note' com parentItem, em lotes de até BATCH_SIZE por requisição.
+        """
+        payload = []
+        for key, item_notes in notes.items():
+            for note in item_notes:
+                text = note_html(note.get('note') if isinstance(note, dict) else note)
+                if text:
+                    payload.append({'itemType': 'note', 'note': text, 'parentItem': key,
+                                    'tags': [], 'collections': [], 'relations': {}})
+        for start in range(0, len(payload), BATCH_SIZE):
+            batch = payload[start:start + BATCH_SIZE]
+            try:
+                with self.metrics.measure('zotero', 'notes'):
+                    result = zot.create_items(batch)
+                if result.get('failed'):
+                    messages = {failure.get('message') for failure in result['failed'].values()}
+                    print(f"Aviso: {len(result['failed'])} notas não foram criadas: {'; '.join(map(str, messages))}")
+            except Exception as e:
+                print(f"Aviso: Erro ao criar {len(batch)} notas: {str(e)}")
+
+    def attach_page(self, zot, key, path):
+        """Anexa ao item criado a página comprimida gravada por save_page"""
+        try:
+            with self.metrics.measure('zotero', 'attach'):
+                zot.attachment_simple([path], key)
+        except Exception as e:
+            print(f"Aviso: Erro ao anexar a página ao item {key}: {str(e)}")
+
+    def scrape(self, url, params):
+        """Faz o scrape de uma URL no Firecrawl, reaproveitando o cache por URL"""
+        cache = self.scrape_cache
+        session = self.firecrawl_client()
+        endpoint = f"{(self.config.firecrawl_api_url or FIRECRAWL_API).rstrip('/')}/v1/scrape"
+        details = {'url': url}
+
+        def call():
+            response = session.post(endpoint, json={'url': url, **params}, timeout=firecrawl_timeout(params))
+            results = firecrawl_data(response)
+            metadata = (results.get('data', results) or {}).get('metadata') or {}
+            details['credits'] = metadata.get('creditsUsed', self.config.firecrawl_scrape_credits)
+            return results
+
+        if not cache:
+            return self.call_service('firecrawl', call, operation='scrape', details=details)
+
+        # Referências do mesmo periódico esperam o primeiro scrape em vez de repeti-lo
+        with cache.lock(url, params):
+            results = cache.get(url, params)
+            if results is None:
+                results = self.call_service('firecrawl', call, operation='scrape', details=details)
+                cache.put(url, params, results)
+            else:
+                self.metrics.record('firecrawl', 'scrape', 0.0, status='cached', url=url)
+            return results
+
+    def chat(self, model, prompt, parse=None, json_mode=False, items=False, on_item=None, operation='chat'):
+        """Envia um prompt ao OpenAI, consultando antes o cache de respostas
+
+        parse (ex.: json.loads) é aplicado ao texto da resposta; só respostas
+        que passam por ele são guardadas, para que uma resposta inválida não
+        fique presa no cache. json_mode pede ao OpenAI um objeto JSON válido.
+        Com items, a resposta é lida por um JSONItemStream (em streaming, se
+        config.stream_responses): on_item recebe cada item assim que ele se
+        fecha e chat retorna a lista de itens. operation identifica a etapa
+        nas métricas ('parse', 'query', 'merge').
+        """
+        cache = self.response_cache
+        content = cache.get(model, prompt) if cache else None
+        if content is not None:
+            self.metrics.record('openai', operation, 0.0, status='cached', model=model)
+            if items:
+                stream = JSONItemStream(on_item)
+                stream.feed(content)
+                return stream.close()
+            return parse(content) if parse else content
+
+        request = {'model': model, 'messages': [{"role": "user", "content": prompt}]}
+        if json_mode and self.config.json_mode:
+            request['response_format'] = {'type': 'json_object'}
+        streaming = items and self.config.stream_responses
+        details = {'model': model}
+        # Numa nova tentativa, os itens que a anterior já entregou não voltam a on_item
+        replays = ReplayFilter(on_item) if items and on_item else None
+
+        def usage_details(usage):
+            details['prompt_tokens'] = getattr(usage, 'prompt_tokens', None)
+            details['completion_tokens'] = getattr(usage, 'completion_tokens', None)
+
+        def call():
+            # Um stream novo por tentativa, para que uma resposta cortada não se misture à seguinte
+            stream = JSONItemStream(replays.attempt() if replays else None) if items else None
+            if not streaming:
+                raw = client.chat.completions.with_raw_response.create(**request)
+                response = raw.parse()
+                text = response.choices[0].message.content
+                if stream is not None:
+                    stream.feed(text)
+                usage_details(getattr(response, 'usage', None))
+                return raw.headers, text, getattr(response, 'usage', None), stream
+            raw = client.chat.completions.with_raw_response.create(
+                stream=True, stream_options={'include_usage': True}, **request
+            )
+            parts, usage = [], None
+            for chunk in raw.parse():
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    stream.feed(parts[-1])
+                usage = getattr(chunk, 'usage', None) or usage
+            usage_details(usage)
+            return raw.headers, ''.join(parts), usage, stream
+
+        # A resposta costuma ter a mesma ordem de grandeza do prompt; response.usage corrige depois
+        estimated = 2 * estimate_tokens(prompt)
+        client = self.openai_client()
+        from openai import APIConnectionError
+        headers, content, usage, stream = self.call_service(
+            'openai', call, estimated, (APIConnectionError,), operation=operation, details=details
+        )
+        limiter = self.rate_limits['openai']
+        limiter.update_from_headers(headers)
+        limiter.settle(estimated, getattr(usage, 'total_tokens', None))
+
+        if items:
+            result = stream.close()
+            if cache and result:
+                cache.put(model, prompt, content)
+            return result
+        result = parse(content) if parse else content
+        if cache:
+            cache.put(model, prompt, content)
+        return result
+
+    def request_items(self, model, prompt, on_item=None, operation='parse'):
+        """Pede uma lista de itens ao LLM, em modo JSON, lendo cada um assim que chega"""
+        items = self.chat(model, prompt, json_mode=True, items=True, on_item=on_item, operation=operation)
+        if not items:
+            raise ValueError("a resposta não contém nenhum item JSON")
+        return items
+
+    def _shared_client(self, service, factory):
+        if service not in self._clients:
+            with self._cache_lock:
+                if service not in self._clients:
+                    self._clients[service] = factory()
+        return self._clients[service]
+
+    def openai_client(self):
+        """Cliente OpenAI compartilhado entre as threads (o pool HTTP dele é thread-safe)"""
+        def create():
+            from openai import OpenAI
+            # As novas tentativas ficam com call_service, que respeita o orçamento compartilhado
+            return OpenAI(api_key=self.config.openai_key, base_url=self.config.openai_base_url or None, max_retries=0)
+        return self._shared_client('openai', create)
+
+    def firecrawl_client(self):
+        """Sessão HTTP da thread atual para a API do Firecrawl
+
+        O scrape vai direto ao /v1/scrape em vez de passar pelo firecrawl-py:
+        o 1.x repassa ao requests, como timeout em segundos, o mesmo valor
+        que manda à API em milissegundos, e um scrape travado prendia a
+        thread por horas. Aqui o timeout do cliente é convertido (ver
+        firecrawl_timeout).
+        """
+        if not hasattr(self._local, 'firecrawl'):
+            import requests
+            session = requests.Session()
+            session.headers['Authorization'] = f"Bearer {self.config.firecrawl_key}"
+            self._local.firecrawl = session
+        return self._local.firecrawl
+
+    def zotero_client(self):
+        """Cliente pyzotero da thread atual, mantido entre chamadas
+
+        O pyzotero guarda o último request na instância, então cada thread
+        tem o seu, mas reaproveita a mesma conexão em todos os lotes.
+        """
+        if not hasattr(self._local, 'zot'):
+            from pyzotero import zotero
+            zot = zotero.Zotero(self.config.library_id, self.config.library_type, self.config.api_key)
+            if self.config.zotero_api_url:
+                zot.endpoint = self.config.zotero_api_url.rstrip('/')
+            self._local.zot = zot
+        return self._local.zot
+
+    def item_schema(self):
+        """Esquema do Zotero já salvo em disco, usado para validar itens antes do upload"""
+        return SchemaCache.shared(self.config.schema_cache_path, max_age=self.config.schema_cache_max_age,
+                                  endpoint=self.config.zotero_api_url or ZOTERO_API)
+
+    def parse_prompt(self, text):
+        return f"""
+        Analise as referências bibliográficas abaixo e converta em um JSON estruturado para o Zotero.
+
+        Regras importantes:
+        1. Determine o tipo correto do item (itemType):
+           - "journalArticle" para artigos de periódicos
+           - "book" para livros
+           - "bookSection" para capítulos de livros
+           - "thesis" para teses e dissertações
+           - "conferencePaper" para trabalhos em eventos
+
+        2. Para autores, use SEMPRE o formato:
+           "creators": [
+              {{"creatorType": "author", "firstName": "Nome", "lastName": "Sobrenome"}}
+           ]
+
+        3. Campos obrigatórios por tipo:
+           - Para journalArticle:
+             "title", "creators", "date", "publicationTitle", "volume", "issue", "pages"
+           - Para book:
+             "title", "creators", "date", "publisher", "place"
+           - Para bookSection:
+             "title", "creators", "bookTitle", "publisher", "date"
+           - Para thesis:
+             "title", "creators", "date", "university", "thesisType"
+           - Para conferencePaper:
+             "title", "creators", "date", "conferenceName", "place"
+
+        4. Regras adicionais:
+           - Não inclua campos vazios
+           - Use o campo "language" apenas se tiver certeza
+           - Extraia o DOI se disponível
+           - Mantenha datas no formato YYYY-MM-DD ou YYYY
+           - Para páginas, use o formato "1-10" ou apenas "1" se for página única
+
+        5. Se cada referência começar com um número entre colchetes, como [0], gere
+           exatamente um item por referência e inclua nele o campo "_id" com esse número
+
+        Referências para processar:
+        {text}
+
+        Retorne APENAS um objeto JSON no formato {{"items": [...]}}, sem explicações ou comentários.
+        """
+
+    def parse_references(self, text, on_item=None):
+        """Analisa as referências usando OpenAI e retorna JSON estruturado"""
+        try:
+            return self.request_items(self.config.parse_model, self.parse_prompt(text), on_item)
+        except Exception as e:
+            raise Exception(f"Erro ao analisar referências com OpenAI: {str(e)}")
+
+    def parse_numbered(self, references):
+        """Analisa um bloco de referências e devolve um item validado por referência
+
+        As referências vão numeradas e cada item volta com o "_id" da sua, então
+        um item malformado, inválido no esquema do Zotero ou ausente (resposta
+        cortada) não perde o bloco: só essa referência é pedida de novo,
+        sozinha. Retorna uma lista alinhada com references, com None onde nem
+        a nova tentativa deu um item válido.
+        """
+        schema = self.item_schema()
+        aligned = [None] * len(references)
+        unnumbered = []
+
+        def accept(item):
+            # Chamado durante o streaming, assim que cada item se fecha
+            idx = item.pop('_id', None) if isinstance(item, dict) else None
+            if schema.validate(item):
+                return
+            if isinstance(idx, str) and idx.isdigit():
+                idx = int(idx)
+            if isinstance(idx, int) and 0 <= idx < len(aligned):
+                if aligned[idx] is None:
+                    aligned[idx] = item
+            else:
+                unnumbered.append(item)
+
+        numbered = '\n'.join(f"[{idx}] {reference}" for idx, reference in enumerate(references))
+        try:
+            self.parse_references(numbered, on_item=accept)
+        except Exception as e:
+            if len(references) == 1:
+                raise
+            print(f"Aviso: {str(e)}")
+        # Um modelo que ignorou os números ainda pode ter respondido na ordem
+        if unnumbered and not any(aligned) and len(unnumbered) == len(references):
+            aligned = unnumbered
+
+        if len(references) > 1:
+            for idx, item in enumerate(aligned):
+                if item is None:
+                    try:
+                        aligned[idx] = self.parse_numbered([references[idx]])[0]
+                    except Exception as e:
+                        print(f"Aviso: Erro ao analisar a referência \"{references[idx][:60]}\": {str(e)}")
+        return aligned
+
+    def create_zotero_items(self, items, progress=None, cancel_event=None, total=0, journal=None, on_item=None,
+                            graph=None):
+        """Create items in Zotero
+
+        items pode ser qualquer iterável, inclusive um gerador: cada lote de
+        BATCH_SIZE é enviado assim que fica completo, sem esperar o resto, e
+        até upload_workers lotes seguem em paralelo. Cada resposta usa as
+        posições dos itens na entrada como chaves de 'success' e 'failed'.
+        Com journal, cada item marcado com '_ref' tem o upload registrado.
+        on_item recebe o desfecho de cada item (ver item_outcome). graph
+        (TaskGraph) pode trazer os nós 'schema' e 'index' já iniciados em
+        paralelo com as etapas anteriores; sem eles, ambos são buscados aqui.
+        """
+        zot = self.zotero_client()
+
+        if isinstance(items, (list, tuple)):
+            if not items:
+                raise Exception("Nenhum item válido para criar no Zotero.")
+            total = total or len(items)
+
+        mode = self.config.duplicate_mode
+        if mode not in DUPLICATE_MODES:
+            raise Exception(f"Modo de duplicatas inválido: {mode}")
+
+        current_batch = []
+        results = []
+        skipped = {}
+        updated = {}
+        failed = {}
+        # Itens originais (com as marcações '_ref' e '_conflicts') dos lotes em voo
+        sources = {}
+        created = 0
+
+        # Get valid fields for items (carregados uma vez e mantidos em disco)
+        schema = graph.result('schema') if graph is not None and 'schema' in graph else self.zotero_schema(zot)
+        if mode == 'force':
+            index = None
+        elif graph is not None and 'index' in graph:
+            index = graph.result('index')
+        else:
+            index = self.library_index(zot)
+        uploader = ZoteroUploader(self.zotero_client, max_retries=self.config.upload_retries, metrics=self.metrics)
+        workers = max(1, self.config.upload_workers)
+
+        def collect(futures, return_when):
+            nonlocal created
+            finished, _ = wait(futures, return_when=return_when)
+            for future in finished:
+                batch = futures.pop(future)
+                report = future.result()
+                report['unchanged'] = {}
+                results.append(report)
+                created += len(batch)
+                notes = {}
+                for item_id, key in report['success'].items():
+                    source = sources.pop(item_id)
+                    if index is not None:
+                        index.add(key, batch[item_id])
+                    if journal is not None and source.get('_ref'):
+                        journal.record(source['_ref'], 'uploaded', key=key)
+                    if source.get('notes'):
+                        notes[key] = source['notes']
+                    if source.get('_attachment'):
+                        self.attach_page(zot, key, source['_attachment'])
+                    if on_item:
+                        on_item(item_outcome(item_id, source.get('_ref'), source, 'created', key=key))
+                if notes:
+                    self.add_notes(zot, notes)
+                for item_id, failure in report['failed'].items():
+                    source = sources.pop(item_id)
+                    if on_item:
+                        on_item(item_outcome(item_id, source.get('_ref'), source, 'failed',
+                                             error=failure.get('message')))
+                if report['failed']:
+                    messages = {failure.get('message') for failure in report['failed'].values()}
+                    print(f"Aviso: {len(report['failed'])} itens não foram criados no Zotero: {'; '.join(messages)}")
+                if index is not None:
+                    for item_id in batch:
+                        index.discard(f"pending:{item_id}")
+                if progress:
+                    progress(ProgressEvent('reference', 'create', STAGES['create'], created, max(total, created)))
+
+        count = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+
+            def flush():
+                check_cancelled(cancel_event)
+                batch = dict(current_batch)
+                current_batch.clear()
+                futures[executor.submit(uploader.upload, list(batch.items()))] = batch
+                # Limita os lotes em voo para que a memória não cresça com a entrada
+                if len(futures) >= 2 * workers:
+                    collect(futures, FIRST_COMPLETED)
+
+            try:
+                for idx, item in enumerate(items, start=1):
+                    count = idx
+                    item_id = str(idx - 1)
+                    try:
+                        # Itens já na biblioteca (ou repetidos nesta importação) não são recriados
+                        if index is not None:
+                            existing = index.find(item)
+                            if existing:
+                                if mode == 'update' and not existing.startswith('pending:'):
+                                    self.update_existing_item(zot, existing, item, schema)
+                                    updated[item_id] = existing
+                                else:
+                                    skipped[item_id] = existing
+                                if on_item:
+                                    status = 'updated' if item_id in updated else 'duplicate'
+                                    on_item(item_outcome(item_id, item.get('_ref'), item, status, key=existing))
+                                if journal is not None and item.get('_ref') and not existing.startswith('pending:'):
+                                    journal.record(item['_ref'], 'uploaded', key=existing)
+                                continue
+
+                        # Get item type, default to 'journalArticle' if not specified
+                        item_type = item.get('itemType', 'journalArticle')
+
+                        # Create a new template for this item type
+                        template = schema.template(item_type, zot)
+
+                        # Only copy valid fields for this item type
+                        valid_item_fields = schema.valid_fields(item_type)
+                        if valid_item_fields is not None:
+                            for field, value in item.items():
+                                if field in valid_item_fields:
+                                    template[field] = value
+                                elif field == 'creators':
+                                    # Handle creators separately as they have a special structure
+                                    template['creators'] = value
+
+                    except Exception as e:
+                        print(f"Aviso: Erro ao processar item {idx}: {str(e)}")
+                        failed[item_id] = {'code': 0, 'message': str(e)}
+                        if on_item:
+                            on_item(item_outcome(item_id, item.get('_ref'), item, 'failed', error=str(e)))
+                        continue
+
+                    current_batch.append((item_id, template))
+                    sources[item_id] = item
+                    if index is not None:
+                        index.add(f"pending:{item_id}", item)
+
+                    if len(current_batch) == BATCH_SIZE:
+                        flush()
+
+                if not count:
+                    raise Exception("Nenhum item válido para criar no Zotero.")
+
+                if current_batch:
+                    flush()
+                while futures:
+                    collect(futures, FIRST_COMPLETED)
+            except ImportCancelled:
+                for future in futures:
+                    future.cancel()
+                raise
+            finally:
+                if index is not None:
+                    index.save()
+
+        if skipped or updated or failed:
+            results.append({'success': {}, 'unchanged': skipped, 'updated': updated, 'failed': failed})
+
+        return results
+
+    def generate_firecrawl_query(self, text):
+        """Gera URLs para o Firecrawl usando OpenAI"""
+        prompt_template = f"""
+        A partir da referência abaixo, identifique e retorne a URL do documento acadêmico.
+        Priorize URLs de repositórios acadêmicos (ex: scielo.org, researchgate.net, academia.edu).
+        Se não encontrar uma URL específica, retorne a URL da página principal do periódico ou instituição.
+
+        Referência:
+        {text}
+
+        Retorne APENAS a URL, sem explicações ou formatação adicional.
+        """
+
+        try:
+            return self.chat(self.config.query_model, prompt_template, operation='query').strip()
+        except Exception as e:
+            raise Exception(f"Erro ao gerar URL para Firecrawl: {str(e)}")
+
+    def fetch_firecrawl_data(self, query):
+        """Busca dados usando Firecrawl"""
+        try:
+            print(f"Buscando URL: {query}")
+
+            # Primeiro fazemos um scrape da URL
+            results = self.scrape(
+                query,
+                {
+                    'formats': ['markdown', 'json'],
+                    # Sem menus, barras laterais e rodapés: o markdown já chega bem menor
+                    'onlyMainContent': True,
+                    'timeout': self.config.scrape_timeout,
+                    'jsonOptions': {
+                        'prompt': 'Extraia os metadados acadêmicos desta página, incluindo: título, autores, data, DOI, abstract, palavras-chave e informações de publicação.'
+                    }
+                }
+            )
+
+            # Organizando os dados retornados
+            # firecrawl-py 1.x já devolve o conteúdo de 'data'; versões antigas, a resposta inteira
+            data = results.get('data', results)
+            json_data = data.get('json', {})
+            markdown = data.get('markdown', '')
+            max_chars = self.config.page_excerpt_chars
+            print(f"Resultado do Firecrawl: {json_data.get('title', '') or 'sem título'} "
+                  f"({len(markdown)} caracteres de markdown)")
+
+            # Converter autores para o formato do Zotero
+            creators = []
+            if 'authors' in json_data:
+                for author in json_data['authors']:
+                    name_parts = author['name'].split()
+                    if len(name_parts) > 1:
+                        creators.append({
+                            'creatorType': 'author',
+                            'firstName': ' '.join(name_parts[:-1]),
+                            'lastName': name_parts[-1]
+                        })
+                    else:
+                        creators.append({
+                            'creatorType': 'author',
+                            'firstName': '',
+                            'lastName': name_parts[0]
+                        })
+
+            # Construir metadados formatados
+            metadata = {
+                'title': json_data.get('title', ''),
+                'abstractNote': truncate(json_data.get('abstract', '') or extract_abstract(markdown, max_chars), max_chars),
+                'url': query,
+                'language': data.get('language', ''),
+                'creators': creators,
+                'date': json_data.get('date', ''),
+                'extra': ''
+            }
+
+            # Adicionar informações de publicação
+            pub_info = json_data.get('publication_info', {})
+            if pub_info:
+                metadata['publisher'] = pub_info.get('publisher', '')
+                metadata['edition'] = pub_info.get('edition', '')
+                if 'print_year' in pub_info:
+                    metadata['date'] = str(pub_info['print_year'])
+
+                # Adicionar informações adicionais ao campo extra
+                extra_info = []
+                if pub_info.get('online_version'):
+                    extra_info.append(f"Versão online: {pub_info['online_version']}")
+                if pub_info.get('available_from'):
+                    extra_info.append(f"Disponível em: {pub_info['available_from']}")
+                if extra_info:
+                    metadata['extra'] = '\n'.join(extra_info)
+
+            # Adicionar palavras-chave
+            keywords = json_data.get('keywords') or extract_keywords(markdown)
+            if keywords:
+                metadata['tags'] = [{'tag': kw} for kw in keywords]
+
+            # Conteúdo da página: trecho relevante numa nota, ou a página inteira comprimida em anexo
+            if markdown and self.config.page_notes == 'excerpt':
+                excerpt = page_excerpt(markdown, max_chars)
+                if excerpt:
+                    metadata['notes'] = [{'note': excerpt}]
+            elif markdown and self.config.page_notes == 'attachment':
+                metadata['_attachment'] = self.save_page(query, markdown)
+
+            return metadata
+
+        except Exception as e:
+            print(f"Erro detalhado do Firecrawl: {str(e)}")
+            raise Exception(f"Erro ao buscar dados via Firecrawl: {str(e)}")
+
+    def save_page(self, url, markdown):
+        """Grava o markdown da página comprimido, para anexar ao item depois do upload"""
+        directory = self.config.page_attachments_dir
+        os.makedirs(directory, exist_ok=True)
+        name = hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+        path = os.path.join(directory, f"{name}.md.gz")
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            f.write(markdown)
+        return path
+
+    def merge_reference_data(self, openai_json, firecrawl_data):
+        """Mescla dados do OpenAI com dados do Firecrawl
+
+        As regras de reference_merge resolvem a maioria dos casos; o LLM só é
+        chamado quando sobram campos ambíguos.
+        """
+        result = merge_item(openai_json, firecrawl_data)
+        if not result.ambiguous:
+            return [result.item]
+
+        merge_prompt = f"""
+        Mescle os dois conjuntos de dados em um único JSON para Zotero.
+        Mantenha a estrutura do Zotero e priorize dados mais completos.
+
+        Regras importantes:
+        1. Mantenha o itemType original do OpenAI
+        2. Preserve todos os creators do OpenAI, mas adicione novos do Firecrawl se não existirem
+        3. Use os dados do Firecrawl para enriquecer:
+           - title se mais completo
+           - abstractNote para o resumo
+           - url da fonte
+           - DOI se disponível
+           - tags para palavras-chave
+           - notes para conteúdo adicional
+           - extra para informações complementares
+        4. Para campos conflitantes, use a versão mais completa
+        5. Mantenha apenas campos válidos do Zotero
+
+        Dados OpenAI:
+        {json.dumps(openai_json, ensure_ascii=False)}
+
+        Dados Firecrawl:
+        {json.dumps(firecrawl_data, ensure_ascii=False)}
+
+        Retorne APENAS o JSON mesclado, sem explicações.
+        """
+
+        try:
+            merged_data = self.chat(self.config.merge_model, merge_prompt, parse=loads_tolerant, operation='merge')
+            return merged_data if isinstance(merged_data, list) else [merged_data]
+        except Exception as e:
+            raise Exception(f"Erro ao mesclar dados: {str(e)}")
+
+    def parse_locally(self, references):
+        """Separa as referências que o parser local resolve com confiança suficiente
+
+        Registros estruturados (BibTeX, RIS, CSL-JSON, MEDLINE) são convertidos
+        por parse_record e marcados com '_native'; o texto livre passa pelo
+        parser de citações. Retorna (referências locais, itens locais,
+        referências restantes).
+        """
+        if not self.config.local_parse and not self.config.native_formats:
+            return [], [], list(references)
+
+        local_references, local_items, remaining = [], [], []
+        for reference in references:
+            item = parse_record(reference) if self.config.native_formats else None
+            if item is not None:
+                local_references.append(reference)
+                local_items.append(dict(item, _native=True))
+                continue
+            if not self.config.local_parse:
+                remaining.append(reference)
+                continue
+            item, confidence = parse_citation(reference)
+            if item is not None and confidence >= self.config.local_parse_min_confidence:
+                local_references.append(reference)
+                local_items.append(item)
+            else:
+                remaining.append(reference)
+        return local_references, local_items, remaining
+
+    def parse_chunks(self, references, cancel_event=None, on_dropped=None):
+        """Analisa as referências em blocos paralelos e gera cada bloco assim que termina
+
+        Gera tuplas (referências do bloco, itens), com um item por referência
+        (ver parse_numbered). No máximo 2 * parse_workers blocos ficam
+        pendentes, então a memória não cresce com a entrada. Referências que
+        não puderam ser analisadas são descartadas com aviso sem afetar as
+        demais, e on_dropped(referência, motivo) é chamado para cada uma.
+        Um None em references (ver chunk_references) sai como None, sem
+        esperar o LLM, para quem consome escoar o que foi resolvido localmente.
+        """
+        chunks = chunk_references(references, self.config.parse_chunk_tokens)
+        workers = max(1, self.config.parse_workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {}
+            try:
+                while True:
+                    check_cancelled(cancel_event)
+                    passthrough = False
+                    if len(pending) < 2 * workers:
+                        for chunk in chunks:
+                            if chunk is None:
+                                passthrough = True
+                                break
+                            pending[executor.submit(self.parse_numbered, chunk)] = chunk
+                            if len(pending) >= 2 * workers:
+                                break
+                    if passthrough:
+                        yield None
+                        finished = [future for future in pending if future.done()]
+                    elif not pending:
+                        return
+                    else:
+                        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        chunk = pending.pop(future)
+                        try:
+                            items = future.result()
+                        except Exception as e:
+                            print(f"Aviso: Erro ao analisar bloco de {len(chunk)} referências: {str(e)}")
+                            if on_dropped:
+                                for reference in chunk:
+                                    on_dropped(reference, str(e))
+                            continue
+                        # Referências sem item válido ficam de fora sem desalinhar as demais
+                        kept = [(reference, item) for reference, item in zip(chunk, items) if item is not None]
+                        if len(kept) < len(chunk):
+                            print(f"Aviso: {len(chunk) - len(kept)} referências não puderam ser analisadas")
+                            if on_dropped:
+                                for reference, item in zip(chunk, items):
+                                    if item is None:
+                                        on_dropped(reference, "A referência não pôde ser analisada")
+                        if kept:
+                            yield [reference for reference, _ in kept], [item for _, item in kept]
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def fetch_enrichment(self, reference, item, cancel_event=None, query=None):
+        """Busca os dados complementares de uma referência
+
+        Referências com DOI, ISBN ou PMID são resolvidas direto no serviço
+        bibliográfico e retornam ('resolved', campos do Zotero); só as demais
+        passam por URL via LLM e scrape e retornam ('firecrawl', metadados).
+        query é o Future da URL já pedida em paralelo com o parse, se houver.
+        """
+        check_cancelled(cancel_event)
+        identifiers = extract_identifiers(reference)
+        if item.get('DOI'):
+            identifiers.setdefault('DOI', item['DOI'])
+        if identifiers:
+            try:
+                csl = self.call_service('resolver', lambda: self.resolver.resolve(identifiers), operation='resolve')
+            except ImportCancelled:
+                raise
+            except Exception as e:
+                # Resolvedor fora do ar mesmo depois das novas tentativas: segue pela URL e pelo scrape
+                print(f"Aviso: Erro ao resolver {identifiers}: {str(e)}")
+                csl = None
+            if csl:
+                return 'resolved', csl_to_zotero(csl)
+
+        check_cancelled(cancel_event)
+        if query is not None and not query.cancelled():
+            firecrawl_query = query.result()
+        else:
+            firecrawl_query = self.generate_firecrawl_query(reference)
+        check_cancelled(cancel_event)
+        return 'firecrawl', self.fetch_firecrawl_data(firecrawl_query)
+
+    def merge_batch(self, entries, cancel_event=None, journal=None):
+        """Resolve com uma única chamada ao LLM os conflitos de vários itens
+
+        entries é uma lista de (item mesclado por regras, {campo ambíguo: valor alternativo}).
+        Só os campos em conflito vão no prompt, identificados pela posição no
+        lote, e a resposta é mapeada de volta por esse ID; um item que não
+        aparece na resposta fica com a pré-mescla.
+        """
+        check_cancelled(cancel_event)
+        batch = {str(idx): merge_entry(item, conflicts) for idx, (item, conflicts) in enumerate(entries)}
+        merge_prompt = f"""
+        Cada entrada abaixo tem um item do Zotero ("item") e valores alternativos
+        vindos de uma página web ("conflitos") para alguns campos.
+
+        Para cada entrada, escolha o melhor valor de cada campo em conflito:
+        1. Prefira a versão mais completa e correta
+        2. Mantenha o formato do Zotero (datas YYYY-MM-DD ou YYYY, páginas "1-10")
+        3. Não altere campos que não estão em "conflitos"
+
+        Entradas:
+        {json.dumps(batch, ensure_ascii=False)}
+
+        Retorne APENAS um objeto JSON no formato {{"<id da entrada>": {{"<campo>": "<valor escolhido>"}}}},
+        sem explicações.
+        """
+
+        try:
+            resolved = self.chat(self.config.merge_model, merge_prompt, parse=loads_tolerant, json_mode=True,
+                                 operation='merge')
+        except Exception as e:
+            raise Exception(f"Erro ao mesclar dados: {str(e)}")
+
+        merged_items = []
+        for idx, (item, conflicts) in enumerate(entries):
+            choice = resolved.get(str(idx)) if isinstance(resolved, dict) else None
+            if isinstance(choice, dict):
+                item = dict(item)
+                item.update({field: value for field, value in choice.items() if field in conflicts and value})
+            merged_items.append(self.record_merged(item, journal))
+        return merged_items
+
+    def record_merged(self, item, journal=None):
+        """Registra no diário a mescla final de um item marcado com '_ref'"""
+        if journal is not None and item.get('_ref'):
+            fields = public_fields(item)
+            # O anexo da página (page_notes='attachment') só é enviado depois do upload
+            if item.get('_attachment'):
+                fields['_attachment'] = item['_attachment']
+            journal.record(item['_ref'], 'merged', item=fields)
+        return item
+
+    def enrich_reference(self, reference, item, cancel_event=None, journal=None):
+        """Busca dados complementares de uma referência e mescla no item por regras
+
+        Retorna (item, conflicts): com conflicts vazio o item está pronto;
+        senão os campos ambíguos ainda precisam de merge_batch. Divergências
+        que as regras decidiram ficam registradas em item['_conflicts']. Com
+        journal, retoma de uma busca já registrada e registra as etapas
+        'enriched' e 'merged' da referência marcada em item['_ref'] (uma
+        referência já mesclada volta sem nova busca). Itens de registros
+        estruturados ('_native') voltam como vieram, salvo com
+        config.enrich_native.
+        """
+        ref = item.get('_ref')
+        query = item.get('_query')
+        native = item.get('_native')
+        item = public_fields(item)
+        entry = journal.state(ref) if journal is not None and ref else None
+        if entry and entry['state'] == 'merged':
+            return dict(entry['item'], _ref=ref), {}
+        if native and not self.config.enrich_native:
+            # Registro estruturado: o item já está completo
+            merged = dict(item, _ref=ref) if ref else item
+            return self.record_merged(merged, journal), {}
+
+        if entry and entry['state'] == 'enriched':
+            kind, data = entry['kind'], entry['data']
+        else:
+            kind, data = self.fetch_enrichment(reference, item, cancel_event, query)
+            if journal is not None and ref:
+                journal.record(ref, 'enriched', item=item, kind=kind, data=data)
+
+        check_cancelled(cancel_event)
+        if kind == 'resolved':
+            merged, conflicts = apply_resolved_metadata(item, data), {}
+        else:
+            result = merge_item(item, data)
+            merged = result.item
+            conflicts = {name: result.conflicts[name]['enrichment'] for name in result.ambiguous}
+            if result.conflicts:
+                merged['_conflicts'] = result.conflicts
+        if ref:
+            merged = dict(merged, _ref=ref)
+        if not conflicts:
+            self.record_merged(merged, journal)
+        return merged, conflicts
+
+    def enrich_stream(self, parsed, progress=None, cancel_event=None, done=0, total=0, journal=None):
+        """Enriquece os itens à medida que os blocos saem do parse e gera cada um ao terminar
+
+        parsed é um iterável de (referências do bloco, itens), como o de
+        parse_chunks. Até 2 * max_workers tarefas ficam em voo ao mesmo
+        tempo, de qualquer bloco, então o enriquecimento de um bloco não
+        espera o anterior terminar e cada item segue para o upload assim que
+        fica pronto. Itens com campos ambíguos na mescla por regras esperam num lote
+        de até merge_batch_tokens, resolvido por uma chamada de merge_batch.
+        Itens cuja busca ou mescla falha seguem com o que já tinham em vez
+        de serem descartados. done e total situam os eventos de progresso
+        dentro da importação inteira.
+        """
+        workers = max(1, self.config.max_workers)
+        parsed = iter(parsed)
+        queued = iter(())
+        exhausted = False
+        to_merge = []
+        merge_tokens = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {}
+            try:
+                while True:
+                    check_cancelled(cancel_event)
+                    while len(pending) < 2 * workers and not exhausted:
+                        pair = next(queued, None)
+                        if pair is None:
+                            # Resultados já prontos não esperam o próximo bloco do parse
+                            if any(future.done() for future in pending):
+                                break
+                            block = next(parsed, None)
+                            if block is None:
+                                exhausted = True
+                                break
+                            references, items = block
+                            # O parse pode agrupar ou dividir referências; nesse caso a busca usa o próprio item
+                            if len(references) != len(items):
+                                references = [describe_item(item) for item in items]
+                            queued = zip(references, items)
+                            continue
+                        reference, item = pair
+                        future = executor.submit(self.enrich_reference, reference, item, cancel_event, journal)
+                        pending[future] = ('enrich', item)
+
+                    # O lote de mescla sai quando enche ou quando não há mais buscas que possam completá-lo
+                    searching = any(kind == 'enrich' for kind, _ in pending.values())
+                    if to_merge and (merge_tokens >= self.config.merge_batch_tokens or not searching):
+                        future = executor.submit(self.merge_batch, to_merge, cancel_event, journal)
+                        pending[future] = ('merge', to_merge)
+                        to_merge = []
+                        merge_tokens = 0
+
+                    if not pending:
+                        return
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        kind, payload = pending.pop(future)
+                        if kind == 'merge':
+                            try:
+                                merged_items = future.result()
+                            except ImportCancelled:
+                                raise
+                            except Exception as e:
+                                print(f"Aviso: Erro ao mesclar lote de {len(payload)} referências: {str(e)}")
+                                merged_items = [self.record_merged(item, journal) for item, _ in payload]
+                            yield from merged_items
+                            continue
+
+                        try:
+                            item, conflicts = future.result()
+                        except ImportCancelled:
+                            raise
+                        except Exception as e:
+                            print(f"Aviso: Erro ao enriquecer referência {done + 1}: {str(e)}")
+                            item, conflicts = payload, {}
+                        done += 1
+                        if progress:
+                            progress(ProgressEvent('reference', 'enrich', STAGES['enrich'], done, max(total, done)))
+                        if conflicts:
+                            to_merge.append((item, conflicts))
+                            merge_tokens += estimate_tokens(json.dumps(merge_entry(item, conflicts), ensure_ascii=False))
+                        else:
+                            yield item
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def run(self, text, progress=None, cancel_event=None, on_item=None):
+        """Executa o pipeline completo sobre um texto e retorna as respostas de create_items
+
+        O texto é dividido com split_references; ver run_references.
+        """
+        text = text.strip()
+        if not text:
+            raise Exception("Nenhuma referência para importar")
+        return self.run_references(split_references(text), progress, cancel_event, on_item)
+
+    def run_references(self, references, progress=None, cancel_event=None, on_item=None):
+        """Executa o pipeline completo e retorna as respostas de create_items
+
+        references pode ser uma lista ou um gerador (ex.: read_references de
+        um arquivo enorme): cada referência é lida só quando o parse precisa
+        dela, então a memória não cresce com a entrada. As etapas são
+        encadeadas em fluxo: cada referência analisada é enriquecida e
+        enviada ao Zotero enquanto as seguintes ainda estão no scrape ou no
+        parse. O que não depende do parse roda num TaskGraph desde o início:
+        o esquema do Zotero e a sincronização do índice da biblioteca, que
+        create_zotero_items só espera no primeiro lote, e a URL do Firecrawl
+        de cada referência sem identificador (config.prefetch_queries).
+        progress recebe um ProgressEvent a cada etapa, referência enriquecida
+        e lote criado; cancel_event (threading.Event) é verificado entre eles.
+        on_item recebe o desfecho de cada item, com o texto da referência
+        original em 'reference' quando ele pode ser atribuído. Os desfechos
+        também são contados em self.metrics, e as métricas vão para
+        config.metrics_prometheus_path ao final.
+        """
+        missing = self.config.missing_credentials()
+        if missing:
+            raise Exception(f"Credenciais ausentes: {', '.join(missing)}")
+        if self.config.page_notes not in PAGE_NOTE_MODES:
+            raise Exception(f"Modo de notas da página inválido: {self.config.page_notes}")
+
+        def stage(name):
+            check_cancelled(cancel_event)
+            if progress:
+                progress(ProgressEvent('stage', name, STAGES[name]))
+
+        # Retomada: o diário diz até onde cada referência já chegou
+        journal = self.open_journal()
+        total = len(references) if isinstance(references, (list, tuple)) else 0
+        done = 0
+        if total and journal is not None:
+            done = sum(1 for reference in references
+                       if journal.status(reference_id(reference)) == 'uploaded')
+
+        # Texto das referências ainda sem desfecho, para o campo 'reference' de on_item
+        texts = {}
+        report_item = on_item
+
+        def on_item(outcome):
+            self.metrics.reference(outcome['status'])
+            if report_item:
+                outcome['reference'] = texts.pop(outcome['ref'], None)
+                report_item(outcome)
+
+        uploaded = {}
+        ready = deque()
+        # URL do Firecrawl de cada referência enviada ao parse, pedida em paralelo com ele
+        queries = {} if self.config.prefetch_queries else None
+        graph = TaskGraph(self.config.max_workers + 2)
+
+        def fresh_references():
+            # Referências já analisadas seguem direto para ready; as novas passam pelo parse local
+            for reference in references:
+                check_cancelled(cancel_event)
+                ref = reference_id(reference)
+                entry = journal.state(ref) if journal is not None else None
+                if entry is not None and entry['state'] == 'uploaded':
+                    uploaded[ref] = entry['key']
+                    self.metrics.reference('resumed')
+                    if report_item:
+                        report_item(dict(item_outcome(None, ref, None, 'resumed', key=entry['key']),
+                                         reference=reference))
+                    continue
+                if report_item:
+                    texts[ref] = reference
+                if entry is not None:
+                    # 'merged' é devolvido por enrich_reference sem nova busca
+                    ready.append(([reference], [dict(entry['item'], _ref=ref)]))
+                    yield None
+                    continue
+                local = self.parse_locally([reference])
+                if local[1]:
+                    ready.append((local[0], record_parsed(local[0], local[1])))
+                    # Ponto de passagem: o item segue sem esperar a próxima referência que vai ao LLM
+                    yield None
+                    continue
+                # Referências com DOI, ISBN ou PMID devem ser resolvidas sem URL
+                if queries is not None and not extract_identifiers(reference):
+                    queries[ref] = graph.add(None, self.generate_firecrawl_query, reference)
+                yield reference
+
+        def record_parsed(chunk, items):
+            # Só blocos alinhados (um item por referência) podem ser atribuídos a cada referência
+            if len(chunk) != len(items):
+                return items
+            marked = []
+            for reference, item in zip(chunk, items):
+                ref = reference_id(reference)
+                if journal is not None:
+                    journal.record(ref, 'parsed', item=item)
+                query = queries.pop(ref, None) if queries else None
+                marked.append(dict(item, _ref=ref, _query=query) if query else dict(item, _ref=ref))
+            return marked
+
+        def dropped(reference, reason):
+            # Sem item não há upload: o desfecho 'failed' sai aqui, e a URL pedida em paralelo é descartada
+            ref = reference_id(reference)
+            query = queries.pop(ref, None) if queries else None
+            if query is not None:
+                query.cancel()
+            on_item(item_outcome(None, ref, None, 'failed', error=reason))
+
+        def parsed_chunks():
+            # Passo 1: Parse local para as referências reconhecidas; as demais vão ao OpenAI em blocos
+            for block in self.parse_chunks(fresh_references(), cancel_event, dropped):
+                while ready:
+                    yield ready.popleft()
+                if block is not None:
+                    chunk, items = block
+                    yield chunk, record_parsed(chunk, items)
+            while ready:
+                yield ready.popleft()
+
+        def announced(chunks):
+            first = True
+            for chunk in chunks:
+                if first:
+                    stage('enrich')
+                    first = False
+                yield chunk
+
+        try:
+            # Esquema e índice da biblioteca não dependem de nenhuma etapa: começam junto com o parse
+            graph.add('schema', lambda: self.zotero_schema(self.zotero_client()))
+            if self.config.duplicate_mode != 'force':
+                graph.add('index', lambda: self.library_index(self.zotero_client()))
+
+            # Passo 2: Buscar dados complementares e mesclar, em paralelo com o parse dos blocos seguintes
+            stage('parse')
+            items = self.enrich_stream(announced(parsed_chunks()), progress, cancel_event, done, total, journal)
+
+            # Passo 3: Criar no Zotero conforme os itens ficam prontos
+            first = next(items, None)
+            if first is None:
+                if not uploaded:
+                    raise Exception("Nenhuma referência para importar")
+                return [{'success': {}, 'unchanged': {}, 'resumed': uploaded, 'failed': {}}]
+            results = self.create_zotero_items(
+                itertools.chain([first], items), progress, cancel_event, total, journal, on_item, graph
+            )
+        finally:
+            graph.close()
+            if journal is not None:
+                journal.close()
+            if self.config.metrics_prometheus_path:
+                self.metrics.write_prometheus(self.config.metrics_prometheus_path)
+        if uploaded:
+            results.append({'success': {}, 'unchanged': {}, 'resumed': uploaded, 'failed': {}})
+        return results
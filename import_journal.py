@@ -0,0 +1,130 @@
+"""Diário de importação: estado de cada referência, gravado em modo append.
+
+Cada linha JSONL registra uma etapa concluída de uma referência
+(parsed, enriched, merged, uploaded) com o dado produzido por ela. Ao
+reabrir o diário, o último estado de cada referência é reconstruído e o
+pipeline retoma dali, sem repetir chamadas ao LLM, scrapes ou uploads.
+
+Em memória fica só a etapa de cada referência (e a chave, se já enviada)
+com a posição da linha no arquivo; o dado da etapa é lido do disco apenas
+para as referências que forem retomadas, então a memória não cresce com o
+histórico do diário.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from response_cache import normalize_text
+
+# Etapas na ordem do pipeline
+STATES = ('parsed', 'enriched', 'merged', 'uploaded')
+
+
+def reference_id(reference):
+    """Identificador estável de uma referência (hash do texto normalizado)"""
+    return hashlib.sha256(normalize_text(reference).encode('utf-8')).hexdigest()[:32]
+
+
+class ImportJournal:
+    """Diário append-only das referências de uma biblioteca"""
+
+    def __init__(self, path, library=''):
+        self.path = path
+        self.library = library
+        # ref -> entrada 'uploaded' completa (só ref, state e key) ou {'state': ..., 'offset': posição da linha}
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._lines = 0
+        self._load()
+        self._file = open(path, 'ab')
+
+    @staticmethod
+    def _slim(entry, offset):
+        if entry['state'] == 'uploaded':
+            return {'ref': entry['ref'], 'library': entry.get('library'), 'state': 'uploaded', 'key': entry.get('key')}
+        return {'state': entry['state'], 'offset': offset}
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        offset = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                self._lines += 1
+                position, offset = offset, offset + len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Última linha truncada por uma queda no meio da escrita
+                    continue
+                if entry.get('library') == self.library:
+                    self.entries[entry['ref']] = self._slim(entry, position)
+        if self._lines > 1000 and self._lines > 4 * len(self.entries):
+            self.compact()
+
+    def _read(self, offset):
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def compact(self):
+        """Reescreve o diário só com o último estado de cada referência"""
+        others = []
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get('library') != self.library:
+                        others.append(entry)
+        latest = {}
+        for entry in others:
+            latest[(entry.get('library'), entry['ref'])] = entry
+        tmp_path = f"{self.path}.tmp"
+        entries = {}
+        with open(tmp_path, 'wb') as f:
+            for entry in latest.values():
+                f.write(self._encode(entry))
+            # Os dados desta biblioteca são copiados um a um do arquivo antigo, sem carregar todos
+            for ref, slim in self.entries.items():
+                entry = slim if slim['state'] == 'uploaded' else self._read(slim['offset'])
+                entries[ref] = self._slim(entry, f.tell())
+                f.write(self._encode(entry))
+        os.replace(tmp_path, self.path)
+        self.entries = entries
+        self._lines = len(latest) + len(self.entries)
+
+    @staticmethod
+    def _encode(entry):
+        return (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+
+    def status(self, ref):
+        """Nome da última etapa registrada para a referência, ou None (sem ler o dado)"""
+        slim = self.entries.get(ref)
+        return slim['state'] if slim else None
+
+    def state(self, ref):
+        """Última entrada registrada para a referência, com o dado da etapa, ou None"""
+        slim = self.entries.get(ref)
+        if slim is None or slim['state'] == 'uploaded':
+            return slim
+        # A linha já foi gravada e descarregada por record, então pode ser lida por outro descritor
+        return self._read(slim['offset'])
+
+    def record(self, ref, state, **data):
+        """Acrescenta uma etapa concluída; a linha é gravada antes de retornar"""
+        entry = {'ref': ref, 'library': self.library, 'state': state, **data}
+        line = self._encode(entry)
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(line)
+            self._file.flush()
+            self.entries[ref] = self._slim(entry, offset)
+            self._lines += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
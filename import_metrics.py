@@ -0,0 +1,261 @@
+"""Métricas das chamadas externas do pipeline: tempo, fila, tentativas, tokens e custo.
+
+Cada chamada ao OpenAI, ao Firecrawl, aos resolvedores e ao Zotero vira um
+registro com serviço, operação, tempo total (wall), tempo de espera antes
+de começar (fila de orçamento e de concorrência), novas tentativas e os
+detalhes do serviço: tokens de response.usage e custo estimado no OpenAI,
+créditos no Firecrawl, tamanho do lote no Zotero. Os registros vão, um por
+linha, para um trace JSONL e alimentam contadores agregados, exportados no
+formato de texto do Prometheus (arquivo para o textfile collector ou
+endpoint HTTP /metrics).
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = 'zotero_importer'
+
+# Preço de cada modelo em USD por milhão de tokens (entrada, saída), para estimar o custo
+MODEL_PRICES = {
+    'o3-mini': (1.10, 4.40),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4o-mini': (0.15, 0.60),
+}
+
+# Limites dos histogramas de duração (segundos) e de tamanho de lote (itens)
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BATCH_BUCKETS = (1, 5, 10, 25, 50)
+
+# Desfechos de chamada que contam como erro no resumo ('partial' é um lote do Zotero com parte dos itens
+# recusada e 'cached' uma resposta servida pelo cache, sem chamada)
+ERROR_STATUSES = {'error'}
+
+
+def token_cost(model, prompt_tokens, completion_tokens):
+    """Custo estimado de uma chamada, em USD (0 para modelos sem preço conhecido)"""
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        # Versões datadas (ex.: gpt-4o-2024-08-06) usam o preço do modelo base
+        prices = next((price for name, price in MODEL_PRICES.items() if model.startswith(f"{name}-")), (0, 0))
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+
+def label_text(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+class Histogram:
+    """Contagens acumuladas por limite, soma e total, como um histograma do Prometheus"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for idx, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[idx] += 1
+
+    def lines(self, name, labels):
+        for bound, count in zip(self.buckets, self.counts):
+            yield f"{name}_bucket{label_text(labels + (('le', bound),))} {count}"
+        yield f"{name}_bucket{label_text(labels + (('le', '+Inf'),))} {self.count}"
+        yield f"{name}_sum{label_text(labels)} {round(self.sum, 6)}"
+        yield f"{name}_count{label_text(labels)} {self.count}"
+
+
+class ImportMetrics:
+    """Registros das chamadas externas, agregados em memória e opcionalmente gravados em JSONL
+
+    Os contadores são cumulativos durante a vida do objeto (um por
+    ImportEngine), como espera o Prometheus; summary resume o que foi
+    medido, incluindo o custo médio por referência.
+    """
+
+    def __init__(self, trace_path=''):
+        self.trace_path = trace_path
+        self._file = None
+        self._lock = threading.Lock()
+        self.calls = {}
+        self.durations = {}
+        self.queue_seconds = {}
+        self.retries = {}
+        self.tokens = {}
+        self.cost = {}
+        self.credits = 0.0
+        self.batch_sizes = Histogram(BATCH_BUCKETS)
+        self.references = {}
+
+    def record(self, service, operation, wall, queue=0.0, retries=0, status='ok', **details):
+        """Registra uma chamada concluída (ou que falhou de vez)
+
+        details aceita model, prompt_tokens e completion_tokens (OpenAI),
+        credits (Firecrawl), batch_size (Zotero) e campos livres, que só vão
+        para o trace.
+        """
+        key = (service, operation)
+        entry = {'ts': round(time.time(), 3), 'service': service, 'operation': operation,
+                 'status': status, 'wall': round(wall, 4), 'queue': round(queue, 4), 'retries': retries}
+        with self._lock:
+            self.calls[key + (status,)] = self.calls.get(key + (status,), 0) + 1
+            self.durations.setdefault(key, Histogram(DURATION_BUCKETS)).observe(wall)
+            self.queue_seconds[key] = self.queue_seconds.get(key, 0.0) + queue
+            self.retries[key] = self.retries.get(key, 0) + retries
+
+            model = details.get('model')
+            if model and (details.get('prompt_tokens') or details.get('completion_tokens')):
+                prompt, completion = details.get('prompt_tokens') or 0, details.get('completion_tokens') or 0
+                cost = token_cost(model, prompt, completion)
+                self.tokens[(model, 'prompt')] = self.tokens.get((model, 'prompt'), 0) + prompt
+                self.tokens[(model, 'completion')] = self.tokens.get((model, 'completion'), 0) + completion
+                self.cost[model] = self.cost.get(model, 0.0) + cost
+                details['cost_usd'] = round(cost, 6)
+            if details.get('credits'):
+                self.credits += details['credits']
+            if details.get('batch_size'):
+                self.batch_sizes.observe(details['batch_size'])
+
+            entry.update({name: value for name, value in details.items() if value is not None})
+            self._write(entry)
+
+    @contextmanager
+    def measure(self, service, operation, **details):
+        """Mede o bloco como uma chamada; uma exceção é registrada com status 'error'"""
+        start = time.perf_counter()
+        status = 'error'
+        try:
+            yield details
+            status = 'ok'
+        finally:
+            self.record(service, operation, time.perf_counter() - start, status=status, **details)
+
+    def reference(self, status):
+        """Conta o desfecho de uma referência ('created', 'duplicate', 'failed'...)"""
+        with self._lock:
+            self.references[status] = self.references.get(status, 0) + 1
+
+    def _write(self, entry):
+        if not self.trace_path:
+            return
+        if self._file is None:
+            # Uma linha por chamada, gravada na hora, para que o trace sobreviva a uma queda
+            self._file = open(self.trace_path, 'a', encoding='utf-8', buffering=1)
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def summary(self):
+        """Totais por serviço e operação, tokens, custo e custo médio por referência"""
+        with self._lock:
+            operations = {}
+            for (service, operation, status), count in self.calls.items():
+                entry = operations.setdefault(f"{service}.{operation}", {'calls': 0, 'errors': 0, 'cached': 0})
+                entry['calls'] += count
+                if status in ERROR_STATUSES:
+                    entry['errors'] += count
+                elif status == 'cached':
+                    entry['cached'] += count
+            for (service, operation), histogram in self.durations.items():
+                entry = operations[f"{service}.{operation}"]
+                entry['wall_seconds'] = round(histogram.sum, 3)
+                entry['queue_seconds'] = round(self.queue_seconds.get((service, operation), 0.0), 3)
+                entry['retries'] = self.retries.get((service, operation), 0)
+            references = sum(self.references.values())
+            cost = sum(self.cost.values())
+            return {
+                'operations': operations,
+                'tokens': {f"{model}.{kind}": count for (model, kind), count in self.tokens.items()},
+                'cost_usd': round(cost, 6),
+                'firecrawl_credits': self.credits,
+                'zotero_batches': self.batch_sizes.count,
+                'zotero_batch_size_avg': round(self.batch_sizes.sum / self.batch_sizes.count, 1)
+                if self.batch_sizes.count else 0,
+                'references': dict(self.references),
+                'cost_usd_per_reference': round(cost / references, 6) if references else 0,
+                'credits_per_reference': round(self.credits / references, 3) if references else 0,
+            }
+
+    def prometheus_text(self):
+        """Métricas no formato de exposição em texto do Prometheus"""
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+        with self._lock:
+            family('calls_total', 'counter', "Chamadas externas por serviço, operação e desfecho")
+            for (service, operation, status), count in sorted(self.calls.items()):
+                labels = (('service', service), ('operation', operation), ('status', status))
+                lines.append(f"{PREFIX}_calls_total{label_text(labels)} {count}")
+            family('call_duration_seconds', 'histogram', "Tempo total de cada chamada, com as novas tentativas")
+            for (service, operation), histogram in sorted(self.durations.items()):
+                lines.extend(histogram.lines(f"{PREFIX}_call_duration_seconds",
+                                             (('service', service), ('operation', operation))))
+            family('queue_seconds_total', 'counter', "Espera por orçamento e concorrência antes das chamadas")
+            for (service, operation), seconds in sorted(self.queue_seconds.items()):
+                labels = (('service', service), ('operation', operation))
+                lines.append(f"{PREFIX}_queue_seconds_total{label_text(labels)} {round(seconds, 6)}")
+            family('retries_total', 'counter', "Novas tentativas das chamadas")
+            for (service, operation), count in sorted(self.retries.items()):
+                labels = (('service', service), ('operation', operation))
+                lines.append(f"{PREFIX}_retries_total{label_text(labels)} {count}")
+            family('openai_tokens_total', 'counter', "Tokens informados em response.usage")
+            for (model, kind), count in sorted(self.tokens.items()):
+                lines.append(f"{PREFIX}_openai_tokens_total{label_text((('model', model), ('kind', kind)))} {count}")
+            family('openai_cost_usd_total', 'counter', "Custo estimado pelos preços de MODEL_PRICES")
+            for model, cost in sorted(self.cost.items()):
+                lines.append(f"{PREFIX}_openai_cost_usd_total{label_text((('model', model),))} {round(cost, 6)}")
+            family('firecrawl_credits_total', 'counter', "Créditos do Firecrawl consumidos pelos scrapes")
+            lines.append(f"{PREFIX}_firecrawl_credits_total {self.credits}")
+            family('zotero_batch_size', 'histogram', "Itens por lote enviado ao Zotero")
+            lines.extend(self.batch_sizes.lines(f"{PREFIX}_zotero_batch_size", ()))
+            family('references_total', 'counter', "Referências por desfecho")
+            for status, count in sorted(self.references.items()):
+                lines.append(f"{PREFIX}_references_total{label_text((('status', status),))} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Grava as métricas num arquivo .prom (troca atômica, para o textfile collector)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host='127.0.0.1'):
+        """Expõe GET /metrics numa thread em segundo plano; retorna o servidor"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
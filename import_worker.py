@@ -0,0 +1,59 @@
+"""Execução do pipeline de importação fora da thread da interface.
+
+O ImportWorker roda ImportEngine.run numa thread em segundo plano e publica
+cada ProgressEvent numa fila, que a interface Tk consome com window.after().
+"""
+import queue
+import threading
+
+from import_engine import ImportCancelled, ProgressEvent, count_duplicates, count_successes
+
+
+class ImportWorker:
+    """Executa uma importação em segundo plano, com progresso e cancelamento"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.thread = None
+
+    def start(self, text):
+        """Inicia a importação numa thread daemon"""
+        if self.is_running():
+            raise Exception("Já existe uma importação em andamento")
+        self.thread = threading.Thread(target=self._run, args=(text,), daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        """Solicita o cancelamento; o pipeline para na próxima verificação"""
+        self.cancel_event.set()
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def poll(self):
+        """Retorna os eventos pendentes sem bloquear"""
+        pending = []
+        while True:
+            try:
+                pending.append(self.events.get_nowait())
+            except queue.Empty:
+                return pending
+
+    def _run(self, text):
+        try:
+            results = self.engine.run(text, progress=self.events.put, cancel_event=self.cancel_event)
+            total_success = count_successes(results)
+            message = f"Importados com sucesso: {total_success} referências"
+            duplicates = count_duplicates(results)
+            if duplicates:
+                message += f" ({duplicates} já existiam na biblioteca)"
+            self.events.put(ProgressEvent(
+                'done', message=message,
+                current=total_success, total=total_success, result=results
+            ))
+        except ImportCancelled as e:
+            self.events.put(ProgressEvent('cancelled', message=str(e)))
+        except Exception as e:
+            self.events.put(ProgressEvent('error', message=f"Erro: {str(e)}"))
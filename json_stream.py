@@ -0,0 +1,152 @@
+"""Leitura tolerante de JSON gerado por LLM, item a item.
+
+O modelo pode cercar o JSON com ``` ou acrescentar texto antes e depois, e
+uma resposta longa pode chegar truncada. O JSONItemStream recebe o texto aos
+pedaços (por exemplo, do streaming da API), ignora o que está fora do JSON e
+entrega cada objeto de uma lista assim que ele se fecha, de modo que um item
+malformado ou cortado não invalida os demais.
+"""
+import collections
+import json
+
+OPENERS = {'{': '}', '[': ']'}
+
+# Campos que identificam um item (e não um creator ou uma tag) dentro de um objeto
+ITEM_KEYS = ('itemType', 'title', '_id')
+
+
+class JSONItemStream:
+    """Extrai os objetos de uma lista JSON conforme o texto chega
+
+    Os itens são os objetos que estão diretamente numa lista de primeiro
+    nível ("[{...}, {...}]") ou numa lista dentro do objeto de primeiro nível
+    ('{"items": [{...}]}'); neste caso, para não confundir com a lista de
+    creators de um item solto, só contam objetos com campos de item
+    (ITEM_KEYS). Se a resposta for um único item sem lista, ele é entregue
+    em close().
+    """
+
+    def __init__(self, on_item=None):
+        self.on_item = on_item
+        self.items = []
+        self.errors = 0
+        self._text = ''
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._root_start = None
+        self._item_start = None
+        self._done = False
+
+    def feed(self, text):
+        """Acrescenta texto e retorna os itens que ficaram completos"""
+        if self._done or not text:
+            return []
+        self._text += text
+        found = []
+        text = self._text
+        for pos in range(self._pos, len(text)):
+            char = text[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if not self._stack:
+                # Antes do JSON (cerca de código, explicações): só um '{' ou '[' abre o documento
+                if char in OPENERS:
+                    self._root_start = pos
+                    self._stack.append(char)
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char in OPENERS:
+                if char == '{' and self._stack[-1] == '[' and len(self._stack) <= 2:
+                    self._item_start = pos
+                self._stack.append(char)
+            elif char in '}]':
+                opener = self._stack.pop()
+                if OPENERS[opener] != char:
+                    # JSON malformado: descarta o item em andamento e segue
+                    self._item_start = None
+                    self.errors += 1
+                if char == '}' and self._item_start is not None and len(self._stack) <= 2 \
+                        and self._stack and self._stack[-1] == '[':
+                    self._emit(text[self._item_start:pos + 1], found)
+                    self._item_start = None
+                if not self._stack:
+                    # Fim do documento: o que vier depois é texto livre
+                    self._done = True
+                    self._pos = pos + 1
+                    return found
+        self._pos = len(text)
+        return found
+
+    def _emit(self, raw, found):
+        try:
+            item = json.loads(raw)
+        except ValueError:
+            self.errors += 1
+            return
+        if self._text[self._root_start] == '{' and not any(key in item for key in ITEM_KEYS):
+            return
+        self.items.append(item)
+        found.append(item)
+        if self.on_item:
+            self.on_item(item)
+
+    def close(self):
+        """Encerra a leitura; retorna todos os itens encontrados"""
+        if not self.items and self._root_start is not None:
+            # Resposta com um único objeto, sem lista de itens
+            try:
+                root = json.loads(self._text[self._root_start:self._pos])
+            except ValueError:
+                root = None
+            if isinstance(root, dict) and any(key in root for key in ITEM_KEYS):
+                self.items.append(root)
+                if self.on_item:
+                    self.on_item(root)
+        self._done = True
+        return self.items
+
+
+class ReplayFilter:
+    """Repassa a on_item os itens de várias tentativas da mesma resposta, sem repetições
+
+    Quando um streaming cai no meio e a chamada é repetida, a nova resposta
+    volta a entregar os itens que a anterior já tinha entregado. Cada
+    tentativa usa o callback de attempt(); um item só é repassado quando
+    aparece na tentativa mais vezes do que já foi repassado, de modo que
+    itens repetidos de propósito na mesma resposta continuam valendo.
+    """
+
+    def __init__(self, on_item):
+        self.on_item = on_item
+        self._emitted = collections.Counter()
+
+    def attempt(self):
+        """Callback de on_item para uma nova tentativa"""
+        seen = collections.Counter()
+
+        def emit(item):
+            # A assinatura é tirada antes do on_item, que pode alterar o item
+            key = json.dumps(item, sort_keys=True, ensure_ascii=False)
+            seen[key] += 1
+            if seen[key] > self._emitted[key]:
+                self._emitted[key] += 1
+                self.on_item(item)
+        return emit
+
+
+def loads_tolerant(text):
+    """json.loads que ignora cercas de código e texto antes ou depois do JSON"""
+    starts = [pos for pos in (text.find('{'), text.find('[')) if pos >= 0]
+    if not starts:
+        raise ValueError("Nenhum JSON na resposta")
+    value, _ = json.JSONDecoder().raw_decode(text, min(starts))
+    return value
@@ -0,0 +1,169 @@
+"""Índice local da biblioteca do Zotero para detectar duplicatas.
+
+Guarda, para cada item da biblioteca, as impressões digitais de DOI, título
+normalizado e primeiro autor + ano, em dicionários consultados em O(1). A
+sincronização é incremental: usa a versão da biblioteca do Zotero para
+buscar só os itens alterados e excluídos desde a última execução.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+
+# Tipos que não são referências e não entram no índice
+CHILD_TYPES = {'note', 'attachment', 'annotation'}
+
+# Modos de tratamento de duplicatas em create_zotero_items
+DUPLICATE_MODES = ('skip', 'update', 'force')
+
+
+def normalize(text):
+    """Minúsculas, sem acentos e só com letras, dígitos e espaços simples"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', text).split())
+
+
+def normalize_doi(doi):
+    doi = (doi or '').strip().lower()
+    return re.sub(r'^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)', '', doi)
+
+
+def fingerprints(item):
+    """Impressões digitais de um item: {'doi': ..., 'title': ..., 'author_year': ...}"""
+    prints = {}
+    doi = normalize_doi(item.get('DOI'))
+    if not doi:
+        match = re.search(r'\bDOI:\s*(10\.\S+)', item.get('extra', ''), re.IGNORECASE)
+        doi = normalize_doi(match.group(1)) if match else ''
+    if doi:
+        prints['doi'] = doi
+    title = normalize(item.get('title'))
+    if title:
+        prints['title'] = title
+    creators = item.get('creators') or []
+    year = re.search(r'\d{4}', item.get('date', '') or '')
+    if creators and year:
+        first = creators[0]
+        author = normalize(first.get('lastName') or first.get('name', ''))
+        if author:
+            prints['author_year'] = f"{author}|{year.group()}"
+    return prints
+
+
+class LibraryIndex:
+    """Índice em memória dos itens da biblioteca, persistido em JSON"""
+
+    def __init__(self, path, library=''):
+        self.path = path
+        self.library = library
+        self.library_version = 0
+        self.items = {}
+        self._by_doi = {}
+        self._by_title = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        # Índice de outra biblioteca: começa do zero
+        if data.get('library', '') != self.library:
+            return
+        self.library_version = data.get('library_version', 0)
+        for key, prints in data.get('items', {}).items():
+            self._add(key, prints)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {'library': self.library, 'library_version': self.library_version, 'items': self.items}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def _add(self, key, prints):
+        self._remove(key)
+        self.items[key] = prints
+        if prints.get('doi'):
+            self._by_doi[prints['doi']] = key
+        if prints.get('title'):
+            self._by_title.setdefault(prints['title'], []).append(key)
+
+    def _remove(self, key):
+        prints = self.items.pop(key, None)
+        if not prints:
+            return
+        if self._by_doi.get(prints.get('doi')) == key:
+            del self._by_doi[prints['doi']]
+        keys = self._by_title.get(prints.get('title'), [])
+        if key in keys:
+            keys.remove(key)
+            if not keys:
+                del self._by_title[prints['title']]
+
+    def add(self, key, item):
+        """Registra um item (criado agora ou ainda pendente de envio)"""
+        with self._lock:
+            self._add(key, fingerprints(item))
+
+    def discard(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def find(self, item):
+        """Retorna a chave de um item equivalente já na biblioteca, ou None
+
+        Mesmo DOI é duplicata. Mesmo título também, a menos que primeiro
+        autor e ano existam nos dois lados e sejam diferentes.
+        """
+        prints = fingerprints(item)
+        with self._lock:
+            if prints.get('doi') in self._by_doi:
+                return self._by_doi[prints['doi']]
+            for key in self._by_title.get(prints.get('title'), []):
+                existing = self.items[key].get('author_year')
+                if not existing or not prints.get('author_year') or existing == prints['author_year']:
+                    return key
+        return None
+
+    def sync(self, zot):
+        """Atualiza o índice com as mudanças da biblioteca desde a última versão"""
+        current = zot.last_modified_version()
+        if current == self.library_version:
+            return 0
+
+        # {chave: versão} de todos os itens alterados; item_versions passa limit=None,
+        # já que items() aplicaria o limite padrão de 100 e o resto nunca seria indexado
+        since = self.library_version
+        changed = zot.item_versions(since=since)
+        keys = list(changed)
+        for start in range(0, len(keys), 50):
+            batch = keys[start:start + 50]
+            for entry in zot.items(itemKey=','.join(batch), limit=50):
+                data = entry.get('data', entry)
+                with self._lock:
+                    if data.get('itemType') in CHILD_TYPES or data.get('deleted'):
+                        self._remove(data['key'])
+                    else:
+                        self._add(data['key'], fingerprints(data))
+
+        if since:
+            deleted = zot.deleted(since=since).get('items', [])
+            with self._lock:
+                for key in deleted:
+                    self._remove(key)
+
+        self.library_version = current
+        self.save()
+        return len(keys)
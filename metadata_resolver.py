@@ -0,0 +1,320 @@
+"""Resolução de metadados por identificador (DOI, ISBN, PMID).
+
+Quando a referência já traz um identificador, os metadados estruturados vêm
+de um serviço bibliográfico em CSL-JSON, convertidos para os campos do
+Zotero, sem gerar URL com o LLM nem fazer scrape. Os resolvedores seguem a
+interface MetadataResolver; o FixtureResolver atende testes offline a partir
+de um arquivo JSON local.
+"""
+import json
+import re
+
+from citation_parser import extract_doi
+
+ISBN_PATTERN = re.compile(r'\bISBN(?:-1[03])?:?\s*([\dX][\dX\- ]{8,16}[\dX])\b', re.IGNORECASE)
+PMID_PATTERN = re.compile(r'\bPMID:?\s*(\d{1,9})\b', re.IGNORECASE)
+
+# Tipos CSL -> itemType do Zotero
+CSL_TYPES = {
+    'article-journal': 'journalArticle',
+    'article-magazine': 'magazineArticle',
+    'article-newspaper': 'newspaperArticle',
+    'book': 'book',
+    'chapter': 'bookSection',
+    'paper-conference': 'conferencePaper',
+    'thesis': 'thesis',
+    'report': 'report',
+    'webpage': 'webpage',
+    'dataset': 'dataset',
+}
+
+# Campo do periódico/livro/evento (container-title) conforme o tipo do item
+CONTAINER_FIELDS = {
+    'journalArticle': 'publicationTitle',
+    'magazineArticle': 'publicationTitle',
+    'newspaperArticle': 'publicationTitle',
+    'bookSection': 'bookTitle',
+    'conferencePaper': 'proceedingsTitle',
+}
+
+# Campos CSL copiados diretamente
+CSL_FIELDS = {
+    'title': 'title',
+    'volume': 'volume',
+    'issue': 'issue',
+    'page': 'pages',
+    'DOI': 'DOI',
+    'ISBN': 'ISBN',
+    'ISSN': 'ISSN',
+    'URL': 'url',
+    'abstract': 'abstractNote',
+    'publisher': 'publisher',
+    'publisher-place': 'place',
+    'language': 'language',
+    'edition': 'edition',
+    'number-of-pages': 'numPages',
+}
+
+
+def valid_isbn(isbn):
+    """Confere o dígito verificador de ISBN-10 ou ISBN-13"""
+    if len(isbn) == 10:
+        if not re.fullmatch(r'\d{9}[\dX]', isbn):
+            return False
+        total = sum((10 - i) * (10 if c == 'X' else int(c)) for i, c in enumerate(isbn))
+        return total % 11 == 0
+    if len(isbn) == 13 and isbn.isdigit():
+        total = sum(int(c) * (1 if i % 2 == 0 else 3) for i, c in enumerate(isbn))
+        return total % 10 == 0
+    return False
+
+
+def extract_identifiers(text):
+    """Extrai DOI, ISBN e PMID de uma referência; retorna só os encontrados"""
+    identifiers = {}
+    doi = extract_doi(text)
+    if doi:
+        identifiers['DOI'] = doi
+    for match in ISBN_PATTERN.finditer(text):
+        isbn = re.sub(r'[\s\-]', '', match.group(1)).upper()
+        if valid_isbn(isbn):
+            identifiers['ISBN'] = isbn
+            break
+    match = PMID_PATTERN.search(text)
+    if match:
+        identifiers['PMID'] = match.group(1)
+    return identifiers
+
+
+def csl_date(value):
+    """Converte {'date-parts': [[2020, 5, 1]]} em '2020-05-01'"""
+    if not isinstance(value, dict):
+        return ''
+    parts = (value.get('date-parts') or [[]])[0]
+    if not parts or parts[0] in (None, ''):
+        return value.get('raw', '') or value.get('literal', '')
+    return '-'.join(f"{int(p):02d}" if i else str(p) for i, p in enumerate(parts))
+
+
+def csl_creators(csl):
+    creators = []
+    for role, creator_type in (('author', 'author'), ('editor', 'editor'), ('translator', 'translator')):
+        for person in csl.get(role, []):
+            if person.get('family'):
+                creators.append({
+                    'creatorType': creator_type,
+                    'firstName': person.get('given', ''),
+                    'lastName': person['family']
+                })
+            elif person.get('literal') or person.get('name'):
+                creators.append({'creatorType': creator_type, 'name': person.get('literal') or person.get('name')})
+    return creators
+
+
+def csl_to_zotero(csl):
+    """Converte um registro CSL-JSON em um item no formato do Zotero"""
+    item_type = CSL_TYPES.get(csl.get('type'), 'journalArticle')
+    item = {'itemType': item_type}
+
+    for csl_field, zotero_field in CSL_FIELDS.items():
+        value = csl.get(csl_field)
+        if isinstance(value, list):
+            value = value[0] if value else ''
+        if value not in (None, ''):
+            item[zotero_field] = str(value)
+
+    container = csl.get('container-title')
+    if isinstance(container, list):
+        container = container[0] if container else ''
+    if container:
+        item[CONTAINER_FIELDS.get(item_type, 'publicationTitle')] = container
+    if csl.get('container-title-short') and item_type == 'journalArticle':
+        short = csl['container-title-short']
+        item['journalAbbreviation'] = short[0] if isinstance(short, list) else short
+
+    creators = csl_creators(csl)
+    if creators:
+        item['creators'] = creators
+
+    date = csl_date(csl.get('issued')) or csl_date(csl.get('published-print'))
+    if date:
+        item['date'] = date
+
+    if csl.get('PMID'):
+        item['extra'] = f"PMID: {csl['PMID']}"
+    if item.get('pages'):
+        item['pages'] = item['pages'].replace('–', '-')
+    return item
+
+
+def http_session():
+    """Sessão do requests, importado só quando um resolvedor de rede é criado"""
+    import requests
+    return requests.Session()
+
+
+def found(response):
+    """False se o serviço não tem o identificador (404 e demais 4xx, exceto 429)
+
+    429 e 5xx levantam HTTPError, para que call_service espere, repita e
+    ajuste o orçamento do resolvedor.
+    """
+    if 400 <= response.status_code < 500 and response.status_code != 429:
+        return False
+    response.raise_for_status()
+    return response.status_code == 200
+
+
+def json_body(response):
+    """Corpo JSON da resposta, ou None se o serviço devolveu outra coisa (uma página HTML, por exemplo)"""
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+class MetadataResolver:
+    """Interface: recebe identificadores e retorna um registro CSL-JSON ou None
+
+    None significa só "não encontrado"; falhas do serviço levantam exceção.
+    """
+
+    def resolve(self, identifiers):
+        raise NotImplementedError
+
+
+class DOIResolver(MetadataResolver):
+    """CSL-JSON via negociação de conteúdo em doi.org (Crossref, DataCite, mEDRA...)"""
+
+    def __init__(self, timeout=15, session=None):
+        self.timeout = timeout
+        self.session = session or http_session()
+
+    def resolve(self, identifiers):
+        doi = identifiers.get('DOI')
+        if not doi:
+            return None
+        response = self.session.get(
+            f"https://doi.org/{doi}",
+            headers={'Accept': 'application/vnd.citationstyles.csl+json'},
+            timeout=self.timeout
+        )
+        if not found(response):
+            return None
+        return json_body(response)
+
+
+class PubMedResolver(MetadataResolver):
+    """CSL-JSON da API de citações do NCBI para PMIDs"""
+
+    def __init__(self, timeout=15, session=None):
+        self.timeout = timeout
+        self.session = session or http_session()
+
+    def resolve(self, identifiers):
+        pmid = identifiers.get('PMID')
+        if not pmid:
+            return None
+        response = self.session.get(
+            'https://api.ncbi.nlm.nih.gov/lit/ctxp/v1/pubmed/',
+            params={'format': 'csl', 'id': pmid},
+            timeout=self.timeout
+        )
+        if not found(response):
+            return None
+        csl = json_body(response)
+        if not isinstance(csl, dict):
+            return None
+        csl.setdefault('PMID', pmid)
+        return csl
+
+
+class OpenLibraryResolver(MetadataResolver):
+    """Dados de livros do Open Library para ISBNs, convertidos em CSL-JSON"""
+
+    def __init__(self, timeout=15, session=None):
+        self.timeout = timeout
+        self.session = session or http_session()
+
+    def resolve(self, identifiers):
+        isbn = identifiers.get('ISBN')
+        if not isbn:
+            return None
+        response = self.session.get(
+            'https://openlibrary.org/api/books',
+            params={'bibkeys': f"ISBN:{isbn}", 'format': 'json', 'jscmd': 'data'},
+            timeout=self.timeout
+        )
+        if not found(response):
+            return None
+        book = (json_body(response) or {}).get(f"ISBN:{isbn}")
+        if not book:
+            return None
+        year = re.search(r'\d{4}', book.get('publish_date', ''))
+        csl = {
+            'type': 'book',
+            'title': book.get('title', ''),
+            'ISBN': isbn,
+            'author': [{'literal': a['name']} for a in book.get('authors', [])],
+            'publisher': ', '.join(p['name'] for p in book.get('publishers', [])),
+            'publisher-place': ', '.join(p['name'] for p in book.get('publish_places', [])),
+            'number-of-pages': book.get('number_of_pages', ''),
+            'URL': book.get('url', ''),
+        }
+        if year:
+            csl['issued'] = {'date-parts': [[int(year.group())]]}
+        return csl
+
+
+class FixtureResolver(MetadataResolver):
+    """Resolvedor offline: registros CSL-JSON indexados por 'doi:...', 'isbn:...' ou 'pmid:...'"""
+
+    def __init__(self, records=None, path=None):
+        self.records = {}
+        if path:
+            with open(path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        for key, record in (records or {}).items():
+            kind, _, value = key.partition(':')
+            self.records[f"{kind.lower()}:{value.strip().lower()}"] = record
+
+    def resolve(self, identifiers):
+        for kind, value in identifiers.items():
+            record = self.records.get(f"{kind.lower()}:{value.lower()}")
+            if record is not None:
+                return record
+        return None
+
+
+class ChainResolver(MetadataResolver):
+    """Tenta cada resolvedor em ordem até um encontrar o identificador
+
+    "Não encontrado" (4xx ou resposta que não é JSON) passa para o
+    próximo; erros de rede, 429 e 5xx sobem para call_service, que espera e
+    repete a cadeia.
+    """
+
+    def __init__(self, resolvers):
+        self.resolvers = list(resolvers)
+
+    def resolve(self, identifiers):
+        for resolver in self.resolvers:
+            csl = resolver.resolve(identifiers)
+            if csl:
+                return csl
+        return None
+
+
+# Resolvedores disponíveis por nome, usados em ImportConfig.metadata_resolvers
+RESOLVERS = {
+    'doi': DOIResolver,
+    'pubmed': PubMedResolver,
+    'isbn': OpenLibraryResolver,
+}
+
+
+def build_resolver(names, fixture_path=''):
+    """Monta a cadeia de resolvedores; com fixture_path, usa só o arquivo local"""
+    if fixture_path:
+        return FixtureResolver(path=fixture_path)
+    return ChainResolver(RESOLVERS[name]() for name in names)
@@ -0,0 +1,99 @@
+"""Redução do conteúdo de páginas raspadas pelo Firecrawl.
+
+O markdown de uma página de periódico inclui menus, referências e rodapés e
+pode ter centenas de KB. Daqui saem só as partes úteis para a referência —
+resumo, palavras-chave e linhas de metadados de citação — com tamanho
+limitado, para o item, para a nota e para o prompt de mescla.
+"""
+import re
+
+HEADING = re.compile(r'^\s*(?:#{1,6}\s*(.+?)\s*#*|\*\*(.+?)\*\*:?|__(.+?)__:?)\s*$')
+ABSTRACT_TITLES = re.compile(r'^(?:abstract|resumo|resumen|summary|r[ée]sum[ée])\b', re.IGNORECASE)
+ABSTRACT_INLINE = re.compile(r'^\s*\**(?:abstract|resumo|resumen|summary)\**\s*[:.\-–]\s*(.+)', re.IGNORECASE)
+KEYWORDS_LINE = re.compile(
+    r'^\s*\**(?:key\s*-?\s*words?|palavras[\s-]*chaves?|descritores|palabras\s*clave|index terms)\**\s*[:.\-–]?\s*\**(.+)',
+    re.IGNORECASE
+)
+CITATION_LINE = re.compile(
+    r'\b(?:doi|issn|isbn|published|publicado|received|recebido|accepted|aceito|volume|cite this|como citar)\b',
+    re.IGNORECASE
+)
+MARKDOWN_NOISE = re.compile(r'!\[[^\]]*\]\([^)]*\)|\[([^\]]*)\]\([^)]*\)')
+
+
+def clean_line(line):
+    """Remove imagens e ênfases e deixa só o texto dos links"""
+    line = MARKDOWN_NOISE.sub(r'\1', line).replace('**', '').replace('__', '')
+    return ' '.join(line.split())
+
+
+def truncate(text, max_chars):
+    """Corta o texto no último espaço antes de max_chars"""
+    if not max_chars or len(text) <= max_chars:
+        return text
+    cut = text.rfind(' ', 0, max_chars)
+    return text[:cut if cut > 0 else max_chars].rstrip() + '…'
+
+
+def heading_text(line):
+    match = HEADING.match(line)
+    if not match:
+        return None
+    return next(group for group in match.groups() if group)
+
+
+def extract_abstract(markdown, max_chars=0):
+    """Texto da seção de resumo (título "Abstract", "Resumo"... ou linha "Abstract: ...")"""
+    lines = markdown.splitlines()
+    for idx, line in enumerate(lines):
+        title = heading_text(line)
+        if title and ABSTRACT_TITLES.match(title.strip('*_ ')):
+            body = []
+            for following in lines[idx + 1:]:
+                if heading_text(following) is not None and body:
+                    break
+                if following.strip():
+                    body.append(clean_line(following))
+                if sum(len(part) for part in body) > max(max_chars, 1) * 2:
+                    break
+            if body:
+                return truncate(' '.join(body), max_chars)
+        match = ABSTRACT_INLINE.match(line)
+        if match:
+            return truncate(clean_line(match.group(1)), max_chars)
+    return ''
+
+
+def extract_keywords(markdown, limit=20):
+    """Palavras-chave de uma linha "Keywords: a; b; c" (ou "Palavras-chave:")"""
+    for line in markdown.splitlines():
+        match = KEYWORDS_LINE.match(line)
+        if match:
+            keywords = re.split(r'\s*[;,·•|]\s*', clean_line(match.group(1)).strip(' .*'))
+            return [keyword for keyword in keywords if 1 < len(keyword) <= 80][:limit]
+    return []
+
+
+def extract_citation_lines(markdown, limit=10):
+    """Linhas curtas com metadados de citação (DOI, ISSN, datas de publicação...)"""
+    lines = []
+    for line in markdown.splitlines():
+        line = clean_line(line)
+        if line and len(line) <= 300 and CITATION_LINE.search(line) and line not in lines:
+            lines.append(line)
+            if len(lines) == limit:
+                break
+    return lines
+
+
+def page_excerpt(markdown, max_chars):
+    """Resumo, palavras-chave e metadados de citação da página, em até max_chars"""
+    parts = []
+    abstract = extract_abstract(markdown, max_chars)
+    if abstract:
+        parts.append(f"Resumo: {abstract}")
+    keywords = extract_keywords(markdown)
+    if keywords:
+        parts.append(f"Palavras-chave: {'; '.join(keywords)}")
+    parts.extend(extract_citation_lines(markdown))
+    return truncate('\n'.join(parts), max_chars)
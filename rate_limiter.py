@@ -0,0 +1,174 @@
+"""Orçamento de requisições e tokens por minuto para os serviços externos.
+
+Cada serviço tem um RateLimiter com baldes de requisições (RPM) e tokens
+(TPM) que se recarregam continuamente. Antes de cada chamada o pipeline
+reserva uma requisição e a estimativa de tokens do prompt; se o orçamento
+acabou, a thread espera só o tempo necessário em vez de disparar e levar um
+429. Os cabeçalhos x-ratelimit-* das respostas corrigem os limites e o saldo
+locais, e um 429 pausa todas as threads do serviço até o Retry-After.
+"""
+import re
+import threading
+import time
+
+# Status HTTP que valem nova tentativa
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+class RateLimitExceeded(Exception):
+    """O serviço continuou respondendo 429 depois de todas as tentativas"""
+
+
+def parse_duration(value):
+    """Converte '1s', '6m0s', '20ms' ou '2.5' em segundos (None se inválido)"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
+
+
+def error_response(error):
+    return getattr(error, 'response', None)
+
+
+def error_status(error):
+    """Status HTTP de uma exceção do OpenAI, do requests ou do Firecrawl, se houver"""
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(error_response(error), 'status_code', None)
+    return status
+
+
+def retry_after(error):
+    """Segundos pedidos pelo servidor no Retry-After (ou retry-after-ms) de um erro"""
+    headers = getattr(error_response(error), 'headers', None) or {}
+    if headers.get('retry-after-ms'):
+        delay = parse_duration(headers['retry-after-ms'])
+        return delay / 1000 if delay is not None else None
+    return parse_duration(headers.get('retry-after'))
+
+
+class RateLimiter:
+    """Baldes de requisições e tokens por minuto de um serviço (0 = sem limite)"""
+
+    def __init__(self, rpm=0, tpm=0, base_delay=1.0, max_delay=60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.throttled = 0
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def _wait_time(self, now, tokens):
+        if self._paused_until > now:
+            return self._paused_until - now
+        wait = 0.0
+        if self.rpm and self._requests < 1:
+            wait = (1 - self._requests) * 60 / self.rpm
+        if self.tpm and self._tokens < tokens:
+            wait = max(wait, (tokens - self._tokens) * 60 / self.tpm)
+        return wait
+
+    def acquire(self, tokens=0):
+        """Reserva uma requisição e tokens, esperando até haver orçamento"""
+        # Um prompt maior que o orçamento inteiro esperaria para sempre
+        tokens = min(tokens, self.tpm) if self.tpm else 0
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._wait_time(now, tokens)
+                if wait <= 0:
+                    break
+                self.throttled += 1
+                self._cond.wait(wait)
+            if self.rpm:
+                self._requests -= 1
+            if self.tpm:
+                self._tokens -= tokens
+
+    def settle(self, estimated, used):
+        """Corrige o saldo de tokens com o consumo real informado pela resposta"""
+        if not self.tpm or used is None:
+            return
+        with self._cond:
+            self._tokens = min(self.tpm, self._tokens + estimated - used)
+            self._cond.notify_all()
+
+    def pause(self, seconds):
+        """Suspende todas as chamadas ao serviço pelos próximos segundos"""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + min(seconds, self.max_delay))
+
+    def update_from_headers(self, headers):
+        """Ajusta limites e saldo com os cabeçalhos x-ratelimit-* da resposta"""
+        if not headers:
+            return
+        with self._cond:
+            self._refill(time.monotonic())
+            for kind in ('requests', 'tokens'):
+                limit = headers.get(f'x-ratelimit-limit-{kind}')
+                remaining = headers.get(f'x-ratelimit-remaining-{kind}')
+                try:
+                    limit = int(limit) if limit is not None else None
+                    remaining = int(remaining) if remaining is not None else None
+                except ValueError:
+                    continue
+                # O limite real da conta substitui o configurado
+                if kind == 'requests':
+                    if limit:
+                        self.rpm = limit
+                    if remaining is not None and self.rpm:
+                        self._requests = min(self._requests, remaining)
+                else:
+                    if limit:
+                        self.tpm = limit
+                    if remaining is not None and self.tpm:
+                        self._tokens = min(self._tokens, remaining)
+            self._cond.notify_all()
+
+    def backoff(self, error, attempt, transient=()):
+        """Decide se a chamada que falhou deve ser repetida e espera o necessário
+
+        Um 429 pausa todas as threads do serviço pelo Retry-After (ou pelo
+        backoff exponencial); outros erros temporários esperam só nesta thread.
+        transient acrescenta tipos de exceção de rede do SDK do serviço.
+        Retorna False se o erro não é temporário.
+        """
+        status = error_status(error)
+        # requests.JSONDecodeError deriva de OSError e de ValueError: é resposta inválida, não falha de rede
+        network_error = (status is None and isinstance(error, (OSError,) + tuple(transient))
+                         and not isinstance(error, ValueError))
+        if status not in RETRYABLE_STATUS and not network_error:
+            return False
+        delay = retry_after(error)
+        if delay is None:
+            delay = self.base_delay * 2 ** attempt
+        delay = min(delay, self.max_delay)
+        if status == 429:
+            self.pause(delay)
+        else:
+            time.sleep(delay)
+        return True
@@ -0,0 +1,152 @@
+"""Mescla determinística de um item com os dados complementares de uma página.
+
+Cada campo tem uma política de precedência (FIELD_POLICIES): o valor do item
+prevalece, o mais longo prevalece, um texto que contém o outro prevalece,
+datas ficam com a mais precisa, listas são unidas etc. Creators são
+deduplicados pelo nome normalizado. Toda divergência é reportada em
+conflicts, e só as que nenhuma regra decide deixam o item ambíguo; apenas
+esses campos precisam ser resolvidos pelo LLM.
+"""
+import re
+from dataclasses import dataclass, field
+
+from library_index import normalize, normalize_doi
+
+# Política de cada campo; os que não aparecem aqui usam DEFAULT_POLICY
+FIELD_POLICIES = {
+    'itemType': 'item',
+    'title': 'contains',
+    'shortTitle': 'item',
+    'creators': 'creators',
+    'date': 'date',
+    'DOI': 'identifier',
+    'ISBN': 'identifier',
+    'ISSN': 'identifier',
+    'url': 'item',
+    'accessDate': 'item',
+    'language': 'item',
+    'abstractNote': 'longest',
+    'tags': 'union',
+    'notes': 'union',
+    'extra': 'lines',
+}
+DEFAULT_POLICY = 'contains'
+
+
+@dataclass
+class MergeResult:
+    """Item mesclado, divergências encontradas e os campos que só o LLM decide"""
+    item: dict
+    # {campo: {'item': valor do item, 'enrichment': valor complementar}}
+    conflicts: dict = field(default_factory=dict)
+    # Campos em conflito sem regra que decida, em ordem de aparição
+    ambiguous: list = field(default_factory=list)
+
+
+def is_empty(value):
+    return value is None or value == '' or value == [] or value == {}
+
+
+def creator_key(creator):
+    """Sobrenome normalizado + inicial do prenome; 'name' para autores institucionais"""
+    last = normalize(creator.get('lastName') or creator.get('name', ''))
+    first = normalize(creator.get('firstName', ''))
+    return last, first[:1]
+
+
+def merge_creators(ours, theirs):
+    """Une as listas mantendo a ordem do item; um prenome mais completo substitui a inicial"""
+    merged = [dict(creator) for creator in ours]
+    by_name = {}
+    for creator in merged:
+        by_name.setdefault(creator_key(creator)[0], []).append(creator)
+    for creator in theirs:
+        last, initial = creator_key(creator)
+        matches = by_name.get(last, [])
+        # Mesmo sobrenome e iniciais compatíveis (ou uma delas ausente) é a mesma pessoa
+        same = next((c for c in matches if not initial or not creator_key(c)[1] or creator_key(c)[1] == initial), None)
+        if same is None:
+            merged.append(dict(creator))
+            by_name.setdefault(last, []).append(merged[-1])
+        elif len(creator.get('firstName', '')) > len(same.get('firstName', '')):
+            same['firstName'] = creator['firstName']
+    return merged
+
+
+def union(ours, theirs):
+    merged = list(ours)
+    for value in theirs:
+        if value not in merged:
+            merged.append(value)
+    return merged
+
+
+def date_digits(value):
+    return re.findall(r'\d+', str(value))
+
+
+def resolve(policy, ours, theirs):
+    """Aplica uma política a dois valores preenchidos
+
+    Retorna (valor, conflito, ambíguo): conflito indica que os valores
+    divergem; ambíguo, que a regra não decide qual deles é o certo.
+    """
+    if policy == 'creators':
+        return merge_creators(ours, theirs), False, False
+    if policy == 'union':
+        return union(ours, theirs), False, False
+    if policy == 'lines':
+        lines = union(str(ours).splitlines(), str(theirs).splitlines())
+        return '\n'.join(lines), False, False
+    if not isinstance(ours, str) or not isinstance(theirs, str):
+        return ours, ours != theirs, ours != theirs
+
+    if policy == 'identifier':
+        same = normalize_doi(ours).replace('-', '') == normalize_doi(theirs).replace('-', '')
+        return ours, not same, not same
+    if policy == 'date':
+        a, b = date_digits(ours), date_digits(theirs)
+        # '2020' e '2020-05-01' concordam; fica a data mais precisa
+        if a[:len(b)] == b or b[:len(a)] == a:
+            return (theirs if len(b) > len(a) else ours), False, False
+        return ours, True, True
+
+    a, b = normalize(ours), normalize(theirs)
+    if a == b:
+        return ours, False, False
+    if policy == 'item':
+        return ours, True, False
+    if policy == 'longest':
+        return (theirs if len(b) > len(a) else ours), True, False
+    # contains: um texto que contém o outro é a versão mais completa
+    if a in b:
+        return theirs, False, False
+    if b in a:
+        return ours, False, False
+    return ours, True, True
+
+
+def merge_item(item, data, policies=None):
+    """Mescla os dados complementares no item segundo as políticas por campo
+
+    Campos vazios de um lado ficam com o valor do outro; o itemType do item
+    nunca muda. Nos campos ambíguos o valor do item é mantido até que o LLM
+    decida.
+    """
+    policies = policies or FIELD_POLICIES
+    result = MergeResult(dict(item))
+    for name, value in data.items():
+        current = result.item.get(name)
+        if is_empty(value):
+            continue
+        if is_empty(current):
+            if name != 'itemType':
+                result.item[name] = value
+            continue
+        merged, conflict, ambiguous = resolve(policies.get(name, DEFAULT_POLICY), current, value)
+        result.item[name] = merged
+        if conflict:
+            result.conflicts[name] = {'item': current, 'enrichment': value}
+        if ambiguous:
+            result.ambiguous.append(name)
+    return result
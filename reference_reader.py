@@ -0,0 +1,227 @@
+"""Leitura de referências em fluxo, uma por vez, de textos e arquivos enormes.
+
+iter_references recebe as linhas aos poucos e gera cada referência assim
+que ela termina, reconhecendo registros BibTeX (@tipo{...}), RIS
+(TY  - ... ER  -), PubMed/MEDLINE (PMID- ... até a linha em branco),
+objetos CSL-JSON (uma lista [{...}, {...}] ou um objeto só), parágrafos
+separados por linha em branco, listas numeradas ou uma referência por
+linha. read_references lê um arquivo com mmap acima de MMAP_THRESHOLD,
+então a memória usada não depende do tamanho da entrada.
+"""
+import mmap
+import os
+import re
+
+# Marcadores de lista numerada no início de uma referência: "1.", "1)", "[1]"
+NUMBERED_REFERENCE = re.compile(r'^\s*(?:\[\d+\]|\d+[.)])\s+')
+
+BIBTEX_START = re.compile(r'^\s*@\s*(\w+)\s*[{(]')
+RIS_TAG = re.compile(r'^([A-Z][A-Z0-9])  -(?: |$)')
+# CSL-JSON: "[" sozinho ou seguido de "{", ou um objeto; "[1] Silva..." continua sendo texto
+CSL_JSON_START = re.compile(r'^\s*(?:\[\s*(?:\{|$)|\{)')
+
+# Entradas BibTeX que não são referências
+BIBTEX_SKIP = {'comment', 'preamble', 'string'}
+
+# Linhas examinadas para decidir como um texto livre separa as referências
+LOOKAHEAD_LINES = 1000
+
+# Arquivos a partir deste tamanho são lidos por mmap
+MMAP_THRESHOLD = 8 * 1024 * 1024
+
+
+def detect_format(line):
+    """'bibtex', 'ris', 'medline', 'csljson' ou 'text', a partir da primeira linha não vazia"""
+    if BIBTEX_START.match(line):
+        return 'bibtex'
+    line = line.strip('﻿')
+    if RIS_TAG.match(line):
+        return 'ris'
+    if line.startswith('PMID-'):
+        return 'medline'
+    if CSL_JSON_START.match(line):
+        return 'csljson'
+    return 'text'
+
+
+def iter_bibtex(lines):
+    """Gera cada entrada BibTeX completa, contando chaves para achar o fim"""
+    record, depth = [], 0
+    for line in lines:
+        if not record:
+            match = BIBTEX_START.match(line)
+            if not match:
+                continue
+            skip = match.group(1).lower() in BIBTEX_SKIP
+            # @article{...} conta chaves; a forma rara @article(...) conta parênteses
+            opener = line[match.end() - 1]
+            closer = '}' if opener == '{' else ')'
+        record.append(line.rstrip())
+        depth += line.count(opener) - line.count(closer)
+        if depth <= 0:
+            if not skip:
+                yield '\n'.join(record)
+            record, depth = [], 0
+    if record and not skip:
+        yield '\n'.join(record)
+
+
+def iter_ris(lines):
+    """Gera cada registro RIS, do TY ao ER"""
+    record = []
+    for line in lines:
+        line = line.rstrip()
+        if not line.strip():
+            continue
+        match = RIS_TAG.match(line)
+        if match and match.group(1) == 'ER':
+            if record:
+                yield '\n'.join(record)
+            record = []
+        elif match or record:
+            record.append(line)
+    if record:
+        yield '\n'.join(record)
+
+
+def iter_medline(lines):
+    """Gera cada registro MEDLINE, do PMID- até a linha em branco (ou o próximo PMID-)"""
+    record = []
+    for line in lines:
+        line = line.rstrip()
+        if not line.strip() or line.startswith('PMID-'):
+            if record:
+                yield '\n'.join(record)
+            record = [line] if line.strip() else []
+        elif record:
+            record.append(line)
+    if record:
+        yield '\n'.join(record)
+
+
+def iter_csl_json(lines):
+    """Gera o texto de cada objeto de uma lista CSL-JSON (ou do objeto único), contando chaves
+
+    Só o objeto em andamento fica na memória, não a lista inteira.
+    """
+    depth, in_string, escape = 0, False, False
+    record = []
+    for line in lines:
+        start = 0 if depth else None
+        for pos, char in enumerate(line):
+            if in_string:
+                if escape:
+                    escape = False
+                elif char == '\\':
+                    escape = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char == '{':
+                if not depth:
+                    start = pos
+                depth += 1
+            elif char == '}' and depth:
+                depth -= 1
+                if not depth:
+                    record.append(line[start:pos + 1])
+                    yield '\n'.join(record)
+                    record, start = [], None
+        if depth and start is not None:
+            record.append(line[start:])
+
+
+def iter_text(lines, lookahead=LOOKAHEAD_LINES):
+    """Referências de texto livre, como split_references, sem carregar tudo
+
+    As primeiras lookahead linhas decidem o modo: parágrafos se houver linha
+    em branco entre referências, lista numerada se houver marcadores, senão
+    uma referência por linha. lookahead=None examina a entrada inteira.
+    """
+    buffered = []
+    lines = iter(lines)
+    for line in lines:
+        buffered.append(line.strip())
+        if lookahead is not None and len(buffered) >= lookahead:
+            break
+    while buffered and not buffered[-1]:
+        buffered.pop()
+    first = next((idx for idx, line in enumerate(buffered) if line), len(buffered))
+    paragraphs = '' in buffered[first:]
+    numbered = any(NUMBERED_REFERENCE.match(line) for line in buffered)
+
+    current = []
+    for line in _chain(buffered, lines):
+        line = line.strip()
+        if paragraphs:
+            if line:
+                current.append(line)
+            elif current:
+                yield ' '.join(' '.join(current).split())
+                current = []
+        elif not line:
+            continue
+        elif numbered:
+            if current and NUMBERED_REFERENCE.match(line):
+                yield ' '.join(current)
+                current = []
+            current.append(line)
+        else:
+            yield line
+    if current:
+        yield ' '.join(' '.join(current).split()) if paragraphs else ' '.join(current)
+
+
+def _chain(buffered, rest):
+    yield from buffered
+    yield from rest
+
+
+def iter_references(lines, lookahead=LOOKAHEAD_LINES):
+    """Gera as referências de um iterável de linhas, detectando o formato"""
+    lines = iter(lines)
+    skipped = []
+    for line in lines:
+        skipped.append(line)
+        if line.strip():
+            break
+    if not skipped or not skipped[-1].strip():
+        return
+    kind = detect_format(skipped[-1].lstrip('﻿'))
+    lines = _chain(skipped, lines)
+    if kind == 'bibtex':
+        yield from iter_bibtex(lines)
+    elif kind == 'ris':
+        yield from iter_ris(line.lstrip('﻿') for line in lines)
+    elif kind == 'medline':
+        yield from iter_medline(line.lstrip('﻿') for line in lines)
+    elif kind == 'csljson':
+        yield from iter_csl_json(lines)
+    else:
+        yield from iter_text(lines, lookahead)
+
+
+def iter_file_lines(path, mmap_threshold=MMAP_THRESHOLD):
+    """Linhas de um arquivo UTF-8, lidas por mmap quando ele é grande"""
+    size = os.path.getsize(path)
+    if not size:
+        return
+    with open(path, 'rb') as f:
+        if size < mmap_threshold:
+            raw_lines = iter(f)
+            view = None
+        else:
+            view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            raw_lines = iter(view.readline, b'')
+        try:
+            for raw in raw_lines:
+                yield raw.decode('utf-8', errors='replace').lstrip('﻿').rstrip('\r\n')
+        finally:
+            if view is not None:
+                view.close()
+
+
+def read_references(path, lookahead=LOOKAHEAD_LINES):
+    """Gera as referências de um arquivo, uma por vez"""
+    return iter_references(iter_file_lines(path), lookahead)
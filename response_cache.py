@@ -0,0 +1,105 @@
+"""Cache local e persistente das respostas do OpenAI.
+
+As respostas ficam num arquivo SQLite, endereçadas pelo hash do modelo e do
+prompt normalizado (que inclui o texto das referências). Assim, reimportar a
+mesma bibliografia, ou corrigir uma referência e rodar de novo, só chama a
+API para o que mudou.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+
+
+def normalize_text(text):
+    """Normaliza unicode e espaços para que diferenças irrelevantes não mudem a chave"""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def cache_key(model, prompt):
+    """Chave de conteúdo: hash do modelo e do prompt normalizado"""
+    payload = json.dumps([model, normalize_text(prompt)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Cache SQLite com expiração (TTL), limite de entradas e contadores de acerto"""
+
+    def __init__(self, path, ttl=30 * 24 * 3600, max_entries=50000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " content TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+
+    def get(self, model, prompt):
+        """Retorna a resposta guardada ou None se não existir ou tiver expirado"""
+        key = cache_key(model, prompt)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, model, prompt, content):
+        """Guarda uma resposta e aplica a política de expiração e tamanho"""
+        key = cache_key(model, prompt)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, model, content, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        if self.ttl:
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        if self.max_entries:
+            # Remove as entradas acessadas há mais tempo (LRU)
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self):
+        """Contadores de acerto/erro desta sessão e tamanho atual do cache"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,98 @@
+"""Cache local dos resultados de scrape do Firecrawl, por URL.
+
+Cada página fica num arquivo JSON comprimido com gzip. Dentro do prazo de
+validade o resultado é reutilizado direto; depois dele a entrada vence e a
+página é raspada de novo. Não há revalidação condicional: o Firecrawl não
+devolve ETag nem Last-Modified nos metadados do scrape, então a expiração
+é só por idade.
+"""
+import contextlib
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+def scrape_key(url, params=None):
+    """Chave do cache: URL mais os parâmetros que mudam o conteúdo extraído"""
+    relevant = {k: v for k, v in (params or {}).items() if k != 'timeout'}
+    payload = json.dumps([url.strip(), relevant], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ScrapeCache:
+    """Resultados de scrape em disco, válidos por max_age segundos"""
+
+    def __init__(self, directory, max_age=7 * 24 * 3600):
+        self.directory = directory
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        # chave -> [lock, usuários]; a entrada sai quando o último usuário libera o lock
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json.gz")
+
+    @contextlib.contextmanager
+    def lock(self, url, params=None):
+        """Lock por URL: scrapes simultâneos da mesma página esperam o primeiro"""
+        key = scrape_key(url, params)
+        with self._locks_lock:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._locks_lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+    def _read(self, key):
+        try:
+            with gzip.open(self._path(key), 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, key, entry):
+        # Escrita atômica: outro processo nunca lê um arquivo pela metade
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get(self, url, params=None):
+        """Retorna o payload guardado se ainda for válido, senão None"""
+        key = scrape_key(url, params)
+        entry = self._read(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if time.time() - entry['fetched'] <= self.max_age:
+            self.hits += 1
+            return entry['payload']
+
+        self.misses += 1
+        return None
+
+    def put(self, url, params, payload):
+        """Guarda o payload com o horário do scrape"""
+        entry = {'url': url, 'fetched': time.time(), 'payload': payload}
+        self._write(scrape_key(url, params), entry)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,568 @@
+"""Parsers nativos dos formatos estruturados: BibTeX, RIS, CSL-JSON e PubMed/MEDLINE.
+
+Cada registro gerado por reference_reader vira direto um item no formato do
+Zotero (itemType, creators, campos do esquema e tags), o mesmo que
+create_zotero_items recebe do parse pelo LLM, sem chamada nenhuma ao
+OpenAI. parse_record detecta o formato pela primeira linha do registro e
+retorna None para texto livre ou para um registro sem título, que seguem
+pelo parser de citações e pelo LLM.
+"""
+import json
+import re
+import unicodedata
+
+from metadata_resolver import CONTAINER_FIELDS, csl_to_zotero
+from reference_reader import detect_format
+
+# Tipos de entrada BibTeX/BibLaTeX -> itemType do Zotero
+BIBTEX_TYPES = {
+    'article': 'journalArticle',
+    'book': 'book',
+    'booklet': 'book',
+    'mvbook': 'book',
+    'manual': 'book',
+    'inbook': 'bookSection',
+    'incollection': 'bookSection',
+    'inproceedings': 'conferencePaper',
+    'conference': 'conferencePaper',
+    'proceedings': 'book',
+    'phdthesis': 'thesis',
+    'mastersthesis': 'thesis',
+    'thesis': 'thesis',
+    'techreport': 'report',
+    'report': 'report',
+    'unpublished': 'manuscript',
+    'online': 'webpage',
+    'electronic': 'webpage',
+    'www': 'webpage',
+    'patent': 'patent',
+    'dataset': 'dataset',
+    'misc': 'document',
+}
+
+# Tipo da tese quando a entrada não traz o campo type
+BIBTEX_THESIS_TYPES = {'phdthesis': 'PhD thesis', 'mastersthesis': "Master's thesis"}
+
+# Campos BibTeX copiados diretamente (depois de limpar o LaTeX)
+BIBTEX_FIELDS = {
+    'title': 'title',
+    'volume': 'volume',
+    'edition': 'edition',
+    'series': 'series',
+    'publisher': 'publisher',
+    'address': 'place',
+    'location': 'place',
+    'isbn': 'ISBN',
+    'issn': 'ISSN',
+    'abstract': 'abstractNote',
+    'language': 'language',
+    'langid': 'language',
+    'note': 'extra',
+    'pagetotal': 'numPages',
+    'shortjournal': 'journalAbbreviation',
+}
+
+# Campos com endereços, que não passam pela limpeza do LaTeX (~ e -- fazem parte deles)
+BIBTEX_RAW_FIELDS = {'doi', 'url'}
+
+MONTHS = {name: f"{idx:02d}" for idx, name in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), start=1)}
+# Meses em português, comuns nos .bib de trabalhos brasileiros
+MONTHS.update({'fev': '02', 'abr': '04', 'mai': '05', 'ago': '08', 'set': '09', 'out': '10', 'dez': '12'})
+
+BIBTEX_ENTRY = re.compile(r'\s*@\s*(\w+)\s*[{(]\s*([^,\s]*)\s*,?')
+BIBTEX_FIELD = re.compile(r'[\s,]*([\w\-:.+]+)\s*=\s*')
+BIBTEX_TOKEN = re.compile(r'[\w\-.:+/]+')
+
+# Acentos do LaTeX (\'e, \~{a}, \c{c}) -> caractere combinante
+LATEX_ACCENTS = {
+    "'": '\u0301', '`': '\u0300', '^': '\u0302', '"': '\u0308', '~': '\u0303', '=': '\u0304',
+    '.': '\u0307', 'c': '\u0327', 'u': '\u0306', 'v': '\u030c', 'H': '\u030b', 'k': '\u0328',
+}
+LATEX_ACCENT = re.compile(r"\\([`'^\"~=.])\s*\{?\\?([A-Za-z])\}?|\\([cuvHk])\s*(?:\{\\?([A-Za-z])\}|\s([A-Za-z]))")
+LATEX_SYMBOLS = {
+    'ss': 'ß', 'o': 'ø', 'O': 'Ø', 'ae': 'æ', 'AE': 'Æ', 'oe': 'œ', 'OE': 'Œ', 'aa': 'å', 'AA': 'Å',
+    'l': 'ł', 'L': 'Ł', 'i': 'ı', 'j': 'ȷ',
+}
+LATEX_SYMBOL = re.compile(r'\\(ss|o|O|ae|AE|oe|OE|aa|AA|l|L|i|j)(?![A-Za-z])\s*')
+LATEX_ESCAPE = re.compile(r'\\([&%$#_{}])')
+LATEX_COMMAND = re.compile(r'\\[A-Za-z]+\*?\s*')
+
+# Tipos RIS -> itemType do Zotero
+RIS_TYPES = {
+    'JOUR': 'journalArticle',
+    'JFULL': 'journalArticle',
+    'EJOUR': 'journalArticle',
+    'MGZN': 'magazineArticle',
+    'NEWS': 'newspaperArticle',
+    'BOOK': 'book',
+    'EBOOK': 'book',
+    'EDBOOK': 'book',
+    'CHAP': 'bookSection',
+    'ECHAP': 'bookSection',
+    'CONF': 'conferencePaper',
+    'CPAPER': 'conferencePaper',
+    'THES': 'thesis',
+    'RPRT': 'report',
+    'ELEC': 'webpage',
+    'WEB': 'webpage',
+    'DATA': 'dataset',
+    'PAT': 'patent',
+    'UNPB': 'manuscript',
+    'MANSCPT': 'manuscript',
+    'GEN': 'document',
+}
+
+# Rótulos RIS copiados diretamente (o primeiro valor de cada um)
+RIS_FIELDS = {
+    'TI': 'title',
+    'T1': 'title',
+    'VL': 'volume',
+    'IS': 'issue',
+    'ET': 'edition',
+    'T3': 'series',
+    'CY': 'place',
+    'AB': 'abstractNote',
+    'N2': 'abstractNote',
+    'LA': 'language',
+    'UR': 'url',
+    'J2': 'journalAbbreviation',
+    'JA': 'journalAbbreviation',
+}
+RIS_LINE = re.compile(r'^([A-Z][A-Z0-9])  -(?: (.*))?$')
+
+# MEDLINE: rótulo de até 4 caracteres completado com espaços até o hífen ("PMID- ", "TI  - ", "FAU - ")
+MEDLINE_LINE = re.compile(r'^([A-Z][A-Z0-9]{1,3}) {0,2}- (.*)$')
+
+
+def _mask_braces(text):
+    """Cópia do texto com o conteúdo entre chaves apagado, para buscar separadores só no nível de fora"""
+    masked, depth = [], 0
+    for char in text:
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth = max(0, depth - 1)
+        masked.append(char if not depth or char in '{}' else '_')
+    return ''.join(masked)
+
+
+def split_top_level(text, pattern):
+    """Divide o texto pelo padrão, ignorando ocorrências dentro de chaves"""
+    parts, start = [], 0
+    for match in re.finditer(pattern, _mask_braces(text)):
+        parts.append(text[start:match.start()])
+        start = match.end()
+    parts.append(text[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def latex_text(value):
+    """Converte o LaTeX de um campo BibTeX em texto: acentos, símbolos, escapes, sem chaves nem comandos"""
+    def accent(match):
+        command = match.group(1) or match.group(3)
+        letter = match.group(2) or match.group(4) or match.group(5)
+        return unicodedata.normalize('NFC', letter + LATEX_ACCENTS[command])
+
+    value = LATEX_ACCENT.sub(accent, value)
+    value = LATEX_SYMBOL.sub(lambda match: LATEX_SYMBOLS[match.group(1)], value)
+    value = LATEX_ESCAPE.sub(lambda match: '\x00' + match.group(1), value)
+    value = LATEX_COMMAND.sub('', value)
+    value = value.replace('{', '').replace('}', '').replace('\x00', '')
+    value = value.replace('---', '—').replace('--', '–').replace('~', ' ')
+    return ' '.join(value.split())
+
+
+def _read_braced(record, pos):
+    """Conteúdo entre chaves a partir de record[pos] == '{'; retorna (conteúdo, posição seguinte)"""
+    depth = 0
+    for end in range(pos, len(record)):
+        if record[end] == '{' and record[end - 1] != '\\':
+            depth += 1
+        elif record[end] == '}' and record[end - 1] != '\\':
+            depth -= 1
+            if not depth:
+                return record[pos + 1:end], end + 1
+    return record[pos + 1:], len(record)
+
+
+def _read_quoted(record, pos):
+    """Conteúdo entre aspas (aspas dentro de chaves não encerram o valor)"""
+    depth = 0
+    for end in range(pos + 1, len(record)):
+        char = record[end]
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+        elif char == '"' and not depth and record[end - 1] != '\\':
+            return record[pos + 1:end], end + 1
+    return record[pos + 1:], len(record)
+
+
+def bibtex_fields(record):
+    """Tipo da entrada e campos brutos ({nome em minúsculas: valor}) de um registro BibTeX"""
+    match = BIBTEX_ENTRY.match(record)
+    if not match:
+        return None, {}
+    fields = {}
+    pos = match.end()
+    while True:
+        field = BIBTEX_FIELD.match(record, pos)
+        if not field:
+            break
+        pos = field.end()
+        parts = []
+        while pos < len(record):
+            char = record[pos]
+            if char == '{':
+                value, pos = _read_braced(record, pos)
+            elif char == '"':
+                value, pos = _read_quoted(record, pos)
+            else:
+                token = BIBTEX_TOKEN.match(record, pos)
+                if not token:
+                    break
+                # Números e macros (@string, meses): o macro fica como está
+                value, pos = token.group(), token.end()
+            parts.append(value)
+            while pos < len(record) and record[pos].isspace():
+                pos += 1
+            # Concatenação: "Parte " # macro # {parte}
+            if pos < len(record) and record[pos] == '#':
+                pos += 1
+                while pos < len(record) and record[pos].isspace():
+                    pos += 1
+                continue
+            break
+        fields[field.group(1).lower()] = ''.join(parts)
+    return match.group(1).lower(), fields
+
+
+def bibtex_creator(name, creator_type):
+    """'Sobrenome, Nome', 'Nome da Sobrenome' ou '{Instituição}' -> creator do Zotero"""
+    name = name.strip()
+    if name.lower() == 'others':
+        return None
+    if name.startswith('{') and name.endswith('}') and len(split_top_level(name, r'\s+')) == 1:
+        return {'creatorType': creator_type, 'name': latex_text(name)}
+    parts = split_top_level(name, r',')
+    if len(parts) >= 2:
+        # "von Sobrenome, Jr, Nome": o Jr fica de fora
+        last, first = parts[0], parts[-1]
+    else:
+        words = split_top_level(name, r'\s+')
+        # Partículas em minúsculas (da, de, van, von) fazem parte do sobrenome
+        idx = len(words) - 1
+        while idx > 1 and words[idx - 1][:1].islower():
+            idx -= 1
+        first, last = ' '.join(words[:idx]), ' '.join(words[idx:])
+    return {'creatorType': creator_type, 'firstName': latex_text(first), 'lastName': latex_text(last)}
+
+
+def bibtex_creators(value, creator_type):
+    names = (bibtex_creator(name, creator_type) for name in split_top_level(value, r'\s+and\s+'))
+    return [creator for creator in names if creator and (creator.get('lastName') or creator.get('name'))]
+
+
+def month_number(value):
+    """'jan', 'January', 'fev.' ou '3' -> '01'..'12' (vazio se não reconhecer)"""
+    value = value.strip().lower().rstrip('.')
+    if value.isdigit() and 1 <= int(value) <= 12:
+        return f"{int(value):02d}"
+    return MONTHS.get(value[:3], '')
+
+
+def join_date(year, month='', day=''):
+    """Data no formato do Zotero: YYYY, YYYY-MM ou YYYY-MM-DD"""
+    if not year:
+        return ''
+    if not month:
+        return year
+    if day and day.isdigit():
+        return f"{year}-{month}-{int(day):02d}"
+    return f"{year}-{month}"
+
+
+def clean_doi(value):
+    return re.sub(r'^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)', '', value.strip(), flags=re.IGNORECASE)
+
+
+def keyword_tags(values):
+    """Tags do Zotero a partir de listas de palavras-chave separadas por vírgula ou ponto e vírgula"""
+    tags = []
+    for value in values:
+        for keyword in re.split(r'[;,]', value):
+            keyword = keyword.strip()
+            if keyword and keyword not in tags:
+                tags.append(keyword)
+    return [{'tag': tag} for tag in tags]
+
+
+def parse_bibtex(record):
+    """Registro BibTeX -> item do Zotero"""
+    entry_type, raw = bibtex_fields(record)
+    if entry_type is None:
+        return None
+    fields = {name: value.replace('{', '').replace('}', '').strip() if name in BIBTEX_RAW_FIELDS
+              else latex_text(value) for name, value in raw.items()}
+    item_type = BIBTEX_TYPES.get(entry_type, 'document')
+    item = {'itemType': item_type}
+
+    for bibtex_field, zotero_field in BIBTEX_FIELDS.items():
+        if fields.get(bibtex_field) and zotero_field not in item:
+            item[zotero_field] = fields[bibtex_field]
+
+    creators = bibtex_creators(raw.get('author', ''), 'author')
+    creators += bibtex_creators(raw.get('editor', ''), 'editor')
+    creators += bibtex_creators(raw.get('translator', ''), 'translator')
+    if creators:
+        item['creators'] = creators
+
+    journal = fields.get('journal') or fields.get('journaltitle')
+    if journal:
+        item['publicationTitle'] = journal
+    if fields.get('booktitle'):
+        item[CONTAINER_FIELDS.get(item_type, 'bookTitle')] = fields['booktitle']
+
+    number = fields.get('number') or fields.get('issue')
+    if number:
+        item[{'report': 'reportNumber', 'patent': 'patentNumber'}.get(item_type, 'issue')] = number
+    if fields.get('pages'):
+        item['pages'] = re.sub(r'\s*[-–—]+\s*', '-', fields['pages'])
+
+    if item_type == 'thesis':
+        item['university'] = fields.get('school') or fields.get('institution') or ''
+        item['thesisType'] = fields.get('type') or BIBTEX_THESIS_TYPES.get(entry_type, '')
+    elif item_type == 'report':
+        item['institution'] = fields.get('institution') or fields.get('publisher') or ''
+        item['reportType'] = fields.get('type', '')
+    elif item_type == 'conferencePaper' and fields.get('organization') and not item.get('publisher'):
+        item['publisher'] = fields['organization']
+
+    date = fields.get('date', '')
+    if not date and fields.get('year'):
+        date = join_date(fields['year'], month_number(fields.get('month', '')), fields.get('day', ''))
+    if date:
+        item['date'] = date
+    if fields.get('doi'):
+        item['DOI'] = clean_doi(fields['doi'])
+    if fields.get('url'):
+        item['url'] = fields['url']
+
+    tags = keyword_tags([fields[name] for name in ('keywords', 'keyword') if fields.get(name)])
+    if tags:
+        item['tags'] = tags
+    return item
+
+
+def ris_fields(record):
+    """{rótulo: [valores]} de um registro RIS; linhas sem rótulo continuam o valor anterior"""
+    fields, last = {}, None
+    for line in record.splitlines():
+        match = RIS_LINE.match(line.rstrip())
+        if match:
+            last = match.group(1)
+            fields.setdefault(last, []).append((match.group(2) or '').strip())
+        elif last is not None and line.strip():
+            fields[last][-1] = f"{fields[last][-1]} {line.strip()}".strip()
+    return fields
+
+
+def ris_creator(value, creator_type):
+    """'Sobrenome, Nome' -> creator; sem vírgula, o nome fica num campo só (ex.: instituições)"""
+    last, sep, first = value.partition(',')
+    if not sep:
+        return {'creatorType': creator_type, 'name': value.strip()}
+    # RIS permite "Sobrenome, Nome, Sufixo"
+    return {'creatorType': creator_type, 'firstName': first.split(',')[0].strip(), 'lastName': last.strip()}
+
+
+def ris_date(value):
+    """'2020/03/15/' ou '2020///' -> '2020-03-15' / '2020'"""
+    parts = (value.split('/') + ['', ''])[:3]
+    year = parts[0].strip()[:4]
+    if not year.isdigit():
+        return value.strip()
+    return join_date(year, month_number(parts[1]) if parts[1].strip() else '', parts[2].strip())
+
+
+def parse_ris(record):
+    """Registro RIS -> item do Zotero"""
+    fields = ris_fields(record)
+    if not fields.get('TY'):
+        return None
+    item_type = RIS_TYPES.get(fields['TY'][0].upper(), 'document')
+    item = {'itemType': item_type}
+
+    def first(*tags):
+        return next((values[0] for values in (fields.get(tag) for tag in tags) if values and values[0]), '')
+
+    for tag, zotero_field in RIS_FIELDS.items():
+        if first(tag) and zotero_field not in item:
+            item[zotero_field] = first(tag)
+
+    creators = [ris_creator(value, 'author') for tag in ('AU', 'A1') for value in fields.get(tag, []) if value]
+    if item_type != 'journalArticle':
+        creators += [ris_creator(value, 'editor') for tag in ('A2', 'ED') for value in fields.get(tag, []) if value]
+    if creators:
+        item['creators'] = creators
+
+    if item_type == 'book':
+        # Num livro, o título secundário é a coleção
+        if first('T2') and not item.get('series'):
+            item['series'] = first('T2')
+    else:
+        container = first('JF', 'JO', 'T2', 'BT') if item_type == 'journalArticle' else first('T2', 'BT', 'JF', 'JO')
+        if container:
+            item[CONTAINER_FIELDS.get(item_type, 'publicationTitle')] = container
+
+    start, end = first('SP'), first('EP')
+    if start:
+        item['pages'] = f"{start}-{end}" if end and end != start and '-' not in start else start
+
+    date = ris_date(first('DA', 'PY', 'Y1'))
+    if date:
+        item['date'] = date
+
+    publisher = first('PB')
+    if publisher:
+        item[{'thesis': 'university', 'report': 'institution'}.get(item_type, 'publisher')] = publisher
+    if first('SN'):
+        item['ISBN' if item_type in ('book', 'bookSection') else 'ISSN'] = first('SN')
+    if first('DO'):
+        item['DOI'] = clean_doi(first('DO'))
+    if fields.get('N1'):
+        item['extra'] = '\n'.join(value for value in fields['N1'] if value)
+
+    tags = keyword_tags(fields.get('KW', []))
+    if tags:
+        item['tags'] = tags
+    return item
+
+
+def medline_fields(record):
+    """{rótulo: [valores]} de um registro MEDLINE; as linhas recuadas continuam o valor anterior"""
+    fields, last = {}, None
+    for line in record.splitlines():
+        match = MEDLINE_LINE.match(line)
+        if match and not line.startswith(' '):
+            last = match.group(1)
+            fields.setdefault(last, []).append(match.group(2).strip())
+        elif last is not None and line.strip():
+            fields[last][-1] = f"{fields[last][-1]} {line.strip()}"
+    return fields
+
+
+def medline_author(full, short):
+    """FAU 'Silva, Joao A' (ou AU 'Silva JA', quando não há FAU) -> creator"""
+    if full:
+        last, _, first = full.partition(',')
+        return {'creatorType': 'author', 'firstName': first.strip(), 'lastName': last.strip()}
+    last, _, initials = short.rpartition(' ')
+    if not last or not initials.isupper():
+        return {'creatorType': 'author', 'firstName': '', 'lastName': short.strip()}
+    return {'creatorType': 'author', 'firstName': ' '.join(f"{letter}." for letter in initials), 'lastName': last}
+
+
+def medline_date(value):
+    """'2020 Jan 15', '2020 Jan-Feb' ou '2020 Spring' -> '2020-01-15', '2020-01', '2020'"""
+    parts = value.split()
+    if not parts or not parts[0][:4].isdigit():
+        return value
+    month = month_number(re.split(r'[-/]', parts[1])[0]) if len(parts) > 1 else ''
+    return join_date(parts[0][:4], month, parts[2] if len(parts) > 2 and month else '')
+
+
+def medline_pages(value):
+    """Completa o intervalo abreviado do MEDLINE: '123-9' -> '123-129'"""
+    start, sep, end = value.partition('-')
+    if sep and start.isdigit() and end.isdigit() and len(end) < len(start):
+        end = start[:len(start) - len(end)] + end
+    return f"{start}-{end}" if sep else start
+
+
+def parse_medline(record):
+    """Registro PubMed/MEDLINE (formato .nbib) -> item do Zotero (artigo de periódico)"""
+    fields = medline_fields(record)
+
+    def first(tag):
+        return (fields.get(tag) or [''])[0]
+
+    if not first('PMID'):
+        return None
+
+    item = {'itemType': 'journalArticle', 'title': first('TI').rstrip('.')}
+    full_names, short_names = fields.get('FAU', []), fields.get('AU', [])
+    if full_names:
+        creators = [medline_author(name, '') for name in full_names]
+    else:
+        creators = [medline_author('', name) for name in short_names]
+    creators += [{'creatorType': 'author', 'name': name} for name in fields.get('CN', [])]
+    if creators:
+        item['creators'] = creators
+
+    for tag, zotero_field in (('JT', 'publicationTitle'), ('TA', 'journalAbbreviation'), ('VI', 'volume'),
+                              ('IP', 'issue'), ('AB', 'abstractNote'), ('LA', 'language')):
+        if first(tag):
+            item[zotero_field] = first(tag)
+    if first('DP'):
+        item['date'] = medline_date(first('DP'))
+    if first('PG'):
+        item['pages'] = medline_pages(first('PG'))
+    if first('IS'):
+        item['ISSN'] = first('IS').split(' ')[0]
+    doi = next((value[:-len('[doi]')].strip() for tag in ('AID', 'LID') for value in fields.get(tag, [])
+                if value.endswith('[doi]')), '')
+    if doi:
+        item['DOI'] = doi
+
+    extra = [f"PMID: {first('PMID')}"]
+    if first('PMC'):
+        extra.append(f"PMCID: {first('PMC')}")
+    item['extra'] = '\n'.join(extra)
+
+    tags = [{'tag': value.lstrip('*')} for value in fields.get('MH', []) + fields.get('OT', []) if value]
+    if tags:
+        item['tags'] = tags
+    return item
+
+
+def parse_csl_json(record):
+    """Objeto CSL-JSON -> item do Zotero (via csl_to_zotero, o mesmo dos resolvedores)"""
+    csl = json.loads(record)
+    if not isinstance(csl, dict):
+        return None
+    item = csl_to_zotero(csl)
+    keywords = csl.get('keyword')
+    if keywords:
+        item['tags'] = keyword_tags(keywords if isinstance(keywords, list) else [keywords])
+    return item
+
+
+PARSERS = {'bibtex': parse_bibtex, 'ris': parse_ris, 'medline': parse_medline, 'csljson': parse_csl_json}
+
+
+def record_format(reference):
+    """Formato estruturado de um registro ('bibtex', 'ris', 'medline', 'csljson') ou None"""
+    first_line = reference.lstrip().split('\n', 1)[0]
+    kind = detect_format(first_line)
+    return kind if kind in PARSERS else None
+
+
+def parse_record(reference):
+    """Converte um registro estruturado num item do Zotero, sem LLM
+
+    Retorna None se o registro é texto livre, está malformado ou não tem
+    título; nesse caso ele segue o caminho normal do parse.
+    """
+    kind = record_format(reference)
+    if kind is None:
+        return None
+    try:
+        item = PARSERS[kind](reference)
+    except (ValueError, TypeError, KeyError):
+        return None
+    if not item or not isinstance(item.get('title'), str) or not item['title'].strip():
+        return None
+    return {field: value for field, value in item.items() if value}
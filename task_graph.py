@@ -0,0 +1,108 @@
+"""Execução de tarefas por dependências: cada nó roda assim que as suas terminam.
+
+Nós sem dependência entre si (ex.: o esquema do Zotero, a sincronização do
+índice da biblioteca e a geração da URL de uma referência, que só precisa
+do texto) rodam em paralelo com o parse em vez de esperar por ele.
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class TaskGraph:
+    """Grafo de tarefas sobre um pool de threads
+
+        graph = TaskGraph(4)
+        graph.add('schema', fetch_schema)
+        graph.add('index', sync_index)
+        graph.add('create', create_items, items, deps=('schema', 'index'))
+        graph.result('create')
+
+    Um nó recebe os argumentos dados em add seguidos dos resultados das
+    dependências, na ordem de deps. Se uma dependência falha, o nó falha
+    com a mesma exceção sem rodar.
+    """
+
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        self._nodes = {}
+        # Todos os nós ainda não concluídos, inclusive os anônimos, para close() cancelar
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def add(self, name, func, *args, deps=()):
+        """Agenda um nó e retorna o seu Future; name=None cria um nó anônimo, não registrado"""
+        with self._lock:
+            if name is not None and name in self._nodes:
+                raise ValueError(f"nó repetido no grafo: {name}")
+            parents = [self._nodes[dep] for dep in deps]
+            node = Future()
+            if name is not None:
+                self._nodes[name] = node
+            self._pending.add(node)
+        node.add_done_callback(self._finished)
+
+        remaining = len(parents)
+        remaining_lock = threading.Lock()
+
+        def run():
+            if not node.set_running_or_notify_cancel():
+                return
+            try:
+                node.set_result(func(*args, *(parent.result() for parent in parents)))
+            except BaseException as e:
+                node.set_exception(e)
+
+        def parent_done(parent):
+            nonlocal remaining
+            with remaining_lock:
+                remaining -= 1
+                if remaining:
+                    return
+            failed = next((p for p in parents if p.cancelled() or p.exception() is not None), None)
+            if failed is not None:
+                if node.set_running_or_notify_cancel():
+                    node.set_exception(failed.exception() if not failed.cancelled() else
+                                       RuntimeError("dependência cancelada"))
+                return
+            try:
+                self._executor.submit(run)
+            except RuntimeError:
+                # Grafo já encerrado
+                node.cancel()
+
+        if parents:
+            for parent in parents:
+                parent.add_done_callback(parent_done)
+        else:
+            self._executor.submit(run)
+        return node
+
+    def _finished(self, node):
+        with self._lock:
+            self._pending.discard(node)
+
+    def node(self, name):
+        """Future de um nó registrado"""
+        return self._nodes[name]
+
+    def result(self, name, timeout=None):
+        """Espera o nó e retorna o seu resultado (ou levanta a sua exceção)"""
+        return self._nodes[name].result(timeout)
+
+    def __contains__(self, name):
+        return name in self._nodes
+
+    def close(self):
+        """Cancela os nós que ainda não começaram e espera os que estão rodando"""
+        with self._lock:
+            pending = list(self._pending)
+        for node in pending:
+            node.cancel()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
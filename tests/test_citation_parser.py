@@ -0,0 +1,106 @@
+import pytest
+
+from citation_parser import count_authors, parse_citation, score
+
+
+def names(item):
+    return [(c['lastName'], c['firstName']) for c in item['creators']]
+
+
+def test_abnt_article():
+    item, confidence = parse_citation(
+        "SILVA, João A.; SOUZA, M. Efeitos do treino. Revista de Nutrição, v. 12, n. 3, p. 45-67, jan./mar. 2020."
+    )
+    assert item['itemType'] == 'journalArticle'
+    assert names(item) == [('Silva', 'João A.'), ('Souza', 'M.')]
+    assert item['title'] == 'Efeitos do treino'
+    assert item['publicationTitle'] == 'Revista de Nutrição'
+    assert (item['volume'], item['issue'], item['pages'], item['date']) == ('12', '3', '45-67', '2020')
+    assert confidence == 1.0
+
+
+def test_abnt_article_with_place():
+    item, confidence = parse_citation(
+        "SOUZA, M. Políticas públicas. Cadernos de Saúde Pública, Rio de Janeiro, v. 30, n. 1, p. 1-10, 2014."
+    )
+    assert item['title'] == 'Políticas públicas'
+    assert item['publicationTitle'] == 'Cadernos de Saúde Pública'
+    assert (item['volume'], item['issue'], item['pages'], item['date']) == ('30', '1', '1-10', '2014')
+    assert confidence == 1.0
+
+
+def test_score_penalizes_split_inside_volume():
+    item = {'itemType': 'journalArticle', 'creators': [{'lastName': 'Souza'}],
+            'title': 'Políticas públicas. Cadernos de Saúde Pública, Rio de Janeiro, v',
+            'publicationTitle': '30', 'volume': '1', 'pages': '1-10', 'date': '2014'}
+    assert score(item) < 0.9
+
+
+def test_abnt_book():
+    item, confidence = parse_citation("SILVA, J. A. Métodos quantitativos. 2. ed. São Paulo: Atlas, 2020.")
+    assert item['itemType'] == 'book'
+    assert names(item) == [('Silva', 'J. A.')]
+    assert (item['edition'], item['place'], item['publisher'], item['date']) == ('2', 'São Paulo', 'Atlas', '2020')
+    assert confidence == 1.0
+
+
+@pytest.mark.parametrize('reference, expected', [
+    ("Silva, J. A., & Souza, M. (2020). Efeitos do treino na saúde. Revista de Nutrição, 12(3), 45–67.",
+     [('Silva', 'J. A.'), ('Souza', 'M.')]),
+    ("LeCun, Y., Bengio, Y., & Hinton, G. (2015). Deep learning. Nature, 521(7553), 436–444.",
+     [('LeCun', 'Y.'), ('Bengio', 'Y.'), ('Hinton', 'G.')]),
+    ("Silva, J. A.-B., Souza, M., & Lima, P. (2018). Um título. Revista X, 3(1), 1-9.",
+     [('Silva', 'J. A.-B.'), ('Souza', 'M.'), ('Lima', 'P.')]),
+])
+def test_apa_article_keeps_last_author(reference, expected):
+    item, confidence = parse_citation(reference)
+    assert item['itemType'] == 'journalArticle'
+    assert names(item) == expected
+    assert confidence == 1.0
+
+
+def test_apa_book_keeps_last_initial():
+    item, confidence = parse_citation("Souza, M. A. (2019). Métodos quantitativos (2nd ed.). São Paulo: Atlas.")
+    assert item['itemType'] == 'book'
+    assert names(item) == [('Souza', 'M. A.')]
+    assert (item['edition'], item['place'], item['publisher']) == ('2', 'São Paulo', 'Atlas')
+
+
+def test_apa_doi():
+    item, _ = parse_citation("LeCun, Y., Bengio, Y., & Hinton, G. (2015). Deep learning. Nature, 521(7553), 436–444. "
+                             "https://doi.org/10.1038/nature14539")
+    assert item['DOI'] == '10.1038/nature14539'
+    assert item['pages'] == '436-444'
+
+
+def test_vancouver_article():
+    item, confidence = parse_citation("Silva JA, Souza M. Efeitos do treino na saúde. J Nutr. 2020 Jan;12(3):45-67.")
+    assert item['itemType'] == 'journalArticle'
+    assert names(item) == [('Silva', 'J. A.'), ('Souza', 'M.')]
+    assert (item['publicationTitle'], item['volume'], item['issue'], item['pages'], item['date']) == \
+        ('J Nutr', '12', '3', '45-67', '2020')
+    assert confidence == 1.0
+
+
+@pytest.mark.parametrize('text, style, expected', [
+    ("SILVA, João A.; SOUZA, M.", 'abnt', 2),
+    ("Silva, J. A., & Souza, M.", 'apa', 2),
+    ("LeCun, Y., Bengio, Y., & Hinton, G.", 'apa', 3),
+    ("Souza, M. A.", 'apa', 1),
+    ("Silva JA, Souza M, Lima P", 'vancouver', 3),
+])
+def test_count_authors(text, style, expected):
+    assert count_authors(text, style) == expected
+
+
+def test_missing_author_lowers_confidence():
+    # "Souza, Maria" não tem iniciais e o parser não o extrai: a nota não pode ficar em 1.0
+    item, confidence = parse_citation(
+        "Silva, J. A., Souza, Maria, & Lima, P. (2020). Um título. Revista X, 3(1), 1-9."
+    )
+    assert names(item) == [('Silva', 'J. A.'), ('Lima', 'P.')]
+    assert confidence < 0.9
+
+
+def test_unrecognized_reference():
+    assert parse_citation("texto qualquer sem estrutura de referência") == (None, 0.0)
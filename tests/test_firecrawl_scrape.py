@@ -0,0 +1,60 @@
+import pytest
+import requests
+
+from import_engine import ImportConfig, ImportEngine, firecrawl_data, firecrawl_timeout
+
+
+class Response:
+    def __init__(self, status_code, body, reason='OK'):
+        self.status_code = status_code
+        self.body = body
+        self.reason = reason
+
+    def json(self):
+        if isinstance(self.body, Exception):
+            raise self.body
+        return self.body
+
+
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def post(self, url, json=None, timeout=None):
+        self.requests.append((url, json, timeout))
+        return self.responses.pop(0)
+
+
+def test_client_timeout_is_in_seconds():
+    # A API recebe milissegundos; o requests, segundos
+    assert firecrawl_timeout({'timeout': 30000}) == 35
+    assert firecrawl_timeout({}) is None
+
+
+def test_firecrawl_data():
+    assert firecrawl_data(Response(200, {'success': True, 'data': {'markdown': 'x'}})) == {'markdown': 'x'}
+    with pytest.raises(ValueError):
+        firecrawl_data(Response(200, {'success': False, 'error': 'página bloqueada'}))
+    with pytest.raises(requests.HTTPError) as error:
+        firecrawl_data(Response(502, ValueError('html'), reason='Bad Gateway'))
+    assert error.value.response.status_code == 502
+
+
+def test_scrape_posts_with_converted_timeout_and_retries_5xx():
+    config = ImportConfig(firecrawl_key='chave', firecrawl_api_url='http://local/firecrawl/', scrape_cache_dir='',
+                          journal_path='', response_cache_path='')
+    engine = ImportEngine(config)
+    engine.rate_limits['firecrawl'].base_delay = 0
+    engine._local.firecrawl = session = FakeSession(
+        Response(503, {'error': 'ocupado'}, reason='Service Unavailable'),
+        Response(200, {'success': True, 'data': {'markdown': 'x', 'metadata': {'creditsUsed': 5}}}),
+    )
+
+    data = engine.scrape('https://exemplo.org', {'formats': ['markdown'], 'timeout': 20000})
+    assert data == {'markdown': 'x', 'metadata': {'creditsUsed': 5}}
+    assert len(session.requests) == 2
+    url, body, timeout = session.requests[-1]
+    assert url == 'http://local/firecrawl/v1/scrape'
+    assert body == {'url': 'https://exemplo.org', 'formats': ['markdown'], 'timeout': 20000}
+    assert timeout == 25
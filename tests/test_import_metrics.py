@@ -0,0 +1,15 @@
+from import_metrics import ImportMetrics
+
+
+def test_summary_counts_only_failures_as_errors():
+    metrics = ImportMetrics()
+    metrics.record('firecrawl', 'scrape', 0.2)
+    metrics.record('firecrawl', 'scrape', 0.0, status='cached')
+    metrics.record('firecrawl', 'scrape', 0.0, status='cached')
+    metrics.record('firecrawl', 'scrape', 1.0, status='error')
+    metrics.record('zotero', 'create_items', 0.5, status='partial', batch_size=50)
+
+    operations = metrics.summary()['operations']
+    assert {name: operations['firecrawl.scrape'][name] for name in ('calls', 'errors', 'cached')} == \
+        {'calls': 4, 'errors': 1, 'cached': 2}
+    assert operations['zotero.create_items']['errors'] == 0
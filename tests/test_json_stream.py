@@ -0,0 +1,126 @@
+from types import SimpleNamespace
+
+import pytest
+
+from import_engine import ImportConfig, ImportEngine
+from json_stream import JSONItemStream, ReplayFilter, loads_tolerant
+
+RESPONSE = ('Aqui está:\n```json\n[{"itemType": "book", "title": "Livro [1]", "creators": [{"lastName": "Silva"}]},\n'
+            ' {"itemType": "journalArticle", "title": "Artigo \\"entre aspas\\" {x}"}]\n```\nQualquer dúvida, avise.')
+
+
+def feed_in_chunks(text, size, stream=None):
+    stream = stream or JSONItemStream()
+    found = []
+    for start in range(0, len(text), size):
+        found += stream.feed(text[start:start + size])
+    return stream, found
+
+
+@pytest.mark.parametrize('size', [1, 2, 7, 50, len(RESPONSE)])
+def test_items_split_across_chunks(size):
+    stream, found = feed_in_chunks(RESPONSE, size)
+    assert [item['title'] for item in found] == ['Livro [1]', 'Artigo "entre aspas" {x}']
+    assert found[0]['creators'] == [{'lastName': 'Silva'}]
+    assert stream.close() == found
+    assert stream.errors == 0
+
+
+def test_each_item_is_emitted_as_soon_as_it_closes():
+    emitted = []
+    stream = JSONItemStream(on_item=emitted.append)
+    stream.feed('[{"title": "A"}, {"title": ')
+    assert [item['title'] for item in emitted] == ['A']
+    stream.feed('"B"}]')
+    assert [item['title'] for item in emitted] == ['A', 'B']
+
+
+def test_text_after_the_document_is_ignored():
+    stream, found = feed_in_chunks('[{"title": "A"}] e depois [{"title": "B"}]', 3)
+    assert [item['title'] for item in stream.close()] == ['A']
+
+
+def test_truncated_response_keeps_complete_items():
+    stream, found = feed_in_chunks('[{"title": "A"}, {"title": "B", "creators": [{"lastName": "Si', 4)
+    assert [item['title'] for item in stream.close()] == ['A']
+
+
+def test_malformed_item_does_not_drop_the_others():
+    stream, found = feed_in_chunks('[{"title": "A"}, {"title": "B",}, {"title": "C" "x"}, {"title": "D"}]', 5)
+    assert [item['title'] for item in stream.close()] == ['A', 'D']
+    assert stream.errors == 2
+
+
+def test_items_inside_root_object():
+    stream, found = feed_in_chunks('{"items": [{"itemType": "book", "title": "A"}, {"nota": 1}]}', 6)
+    assert [item['title'] for item in stream.close()] == ['A']
+
+
+def test_single_item_without_list_is_emitted_on_close():
+    emitted = []
+    stream = JSONItemStream(on_item=emitted.append)
+    feed_in_chunks('```json\n{"itemType": "book", "title": "A", "creators": [{"lastName": "Silva"}]}\n```', 5, stream)
+    assert emitted == []
+    assert [item['title'] for item in stream.close()] == ['A']
+    assert [item['title'] for item in emitted] == ['A']
+
+
+def test_root_object_without_item_fields_is_not_an_item():
+    stream, _ = feed_in_chunks('{"erro": "sem referências"}', 4)
+    assert stream.close() == []
+
+
+def test_loads_tolerant():
+    assert loads_tolerant('```json\n{"a": [1, 2]}\n``` fim') == {'a': [1, 2]}
+    assert loads_tolerant('Resposta: [1] e {"x": 2}') == [1]
+    with pytest.raises(ValueError):
+        loads_tolerant('sem json')
+
+
+def test_replay_filter_skips_items_already_emitted():
+    emitted = []
+    replays = ReplayFilter(emitted.append)
+    first = replays.attempt()
+    first({'title': 'A'})
+    second = replays.attempt()
+    for title in ('A', 'B', 'B'):
+        second({'title': title})
+    # O 'B' repetido na mesma resposta vale; o 'A' da tentativa anterior, não
+    assert [item['title'] for item in emitted] == ['A', 'B', 'B']
+
+
+class CutStreamClient:
+    """Cliente OpenAI falso cujo primeiro streaming cai depois do primeiro item"""
+
+    def __init__(self, content):
+        self.content = content
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(with_raw_response=self))
+
+    def create(self, **request):
+        self.calls += 1
+        cut = self.calls == 1
+
+        def chunks():
+            for start in range(0, len(self.content), 5):
+                if cut and start > self.content.index('}') + 5:
+                    raise ConnectionResetError("conexão interrompida")
+                delta = SimpleNamespace(content=self.content[start:start + 5])
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+
+        return SimpleNamespace(headers={}, parse=chunks)
+
+
+def test_stream_retry_does_not_repeat_items():
+    config = ImportConfig(library_id='1', api_key='x', openai_key='x', firecrawl_key='x',
+                          journal_path='', response_cache_path='', scrape_cache_dir='')
+    engine = ImportEngine(config)
+    engine.rate_limits['openai'].base_delay = 0
+    client = CutStreamClient('[{"itemType": "book", "title": "A"}, {"itemType": "book", "title": "B"}]')
+    engine.openai_client = lambda: client
+
+    emitted = []
+    items = engine.request_items('modelo', 'prompt', on_item=emitted.append)
+    assert client.calls == 2
+    assert [item['title'] for item in emitted] == ['A', 'B']
+    assert [item['title'] for item in items] == ['A', 'B']
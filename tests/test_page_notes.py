@@ -0,0 +1,53 @@
+from import_engine import ImportConfig, ImportEngine
+
+
+class FakeSchema:
+    def template(self, item_type, zot):
+        return {'itemType': item_type, 'title': '', 'creators': []}
+
+    def valid_fields(self, item_type):
+        return {'title', 'date'}
+
+
+class FakeZotero:
+    """Cliente falso: cria os itens com chaves sequenciais e guarda cada payload enviado"""
+
+    def __init__(self):
+        self.request = None
+        self.payloads = []
+
+    def check_items(self, items):
+        return items
+
+    def create_items(self, items, parentid=None):
+        self.payloads.append(items)
+        start = sum(len(payload) for payload in self.payloads[:-1])
+        return {'success': {str(position): f"KEY{start + position}" for position in range(len(items))}}
+
+
+def engine_with(zot):
+    config = ImportConfig(library_id='1', api_key='x', openai_key='x', firecrawl_key='x', duplicate_mode='force',
+                          journal_path='', response_cache_path='', scrape_cache_dir='', upload_workers=1)
+    engine = ImportEngine(config, resolver=object())
+    engine.zotero_client = lambda: zot
+    engine.zotero_schema = lambda client: FakeSchema()
+    return engine
+
+
+def test_excerpt_note_is_created_as_child_note():
+    zot = FakeZotero()
+    item = {'itemType': 'journalArticle', 'title': 'Artigo', 'creators': [],
+            'notes': [{'note': 'Resumo: um estudo & outro\nPalavras-chave: saúde'}]}
+    engine_with(zot).create_zotero_items([item, {'itemType': 'journalArticle', 'title': 'Sem nota'}])
+
+    items, notes = zot.payloads
+    assert [entry['title'] for entry in items] == ['Artigo', 'Sem nota']
+    assert 'notes' not in items[0]
+    assert notes == [{'itemType': 'note', 'parentItem': 'KEY0', 'tags': [], 'collections': [], 'relations': {},
+                      'note': '<p>Resumo: um estudo &amp; outro</p><p>Palavras-chave: saúde</p>'}]
+
+
+def test_no_note_request_without_notes():
+    zot = FakeZotero()
+    engine_with(zot).create_zotero_items([{'itemType': 'journalArticle', 'title': 'Artigo'}])
+    assert len(zot.payloads) == 1
@@ -0,0 +1,171 @@
+import json
+
+import pytest
+
+import rate_limiter
+from rate_limiter import RateLimiter, parse_duration, retry_after
+
+
+class FakeClock:
+    """Relógio controlado pelo teste: esperas avançam o tempo em vez de dormir"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.waits = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.waits.append(seconds)
+        self.now += seconds
+
+
+class FakeCondition:
+    def __init__(self, clock):
+        self.clock = clock
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def wait(self, seconds):
+        self.clock.sleep(seconds)
+
+    def notify_all(self):
+        pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, 'time', clock)
+    return clock
+
+
+def limiter(clock, **kwargs):
+    limiter = RateLimiter(**kwargs)
+    limiter._cond = FakeCondition(clock)
+    return limiter
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = Response(status_code, headers)
+
+
+def test_parse_duration():
+    assert parse_duration('2.5') == 2.5
+    assert parse_duration('6m0s') == 360
+    assert parse_duration('1h2m3s') == 3723
+    assert parse_duration('20ms') == pytest.approx(0.02)
+    assert parse_duration('logo') is None
+    assert parse_duration(None) is None
+
+
+def test_request_bucket_refills_continuously(clock):
+    rl = limiter(clock, rpm=60)
+    for _ in range(60):
+        rl.acquire()
+    assert clock.waits == [] and rl.throttled == 0
+    rl.acquire()
+    assert clock.waits == [pytest.approx(1.0)]
+    clock.now += 30
+    for _ in range(30):
+        rl.acquire()
+    assert len(clock.waits) == 1
+
+
+def test_token_bucket_waits_for_the_prompt_estimate(clock):
+    rl = limiter(clock, tpm=6000)
+    rl.acquire(tokens=5000)
+    rl.acquire(tokens=3000)
+    # Faltavam 2000 tokens, que voltam em 20 s a 100 tokens/s
+    assert clock.waits == [pytest.approx(20.0)]
+    assert rl.throttled == 1
+
+
+def test_prompt_larger_than_budget_does_not_wait_forever(clock):
+    rl = limiter(clock, tpm=1000)
+    rl.acquire(tokens=50000)
+    assert clock.waits == []
+
+
+def test_settle_returns_unused_tokens(clock):
+    rl = limiter(clock, tpm=6000)
+    rl.acquire(tokens=6000)
+    rl.settle(6000, 1000)
+    rl.acquire(tokens=5000)
+    assert clock.waits == []
+
+
+def test_headers_override_limits_and_remaining(clock):
+    rl = limiter(clock, rpm=1000, tpm=100000)
+    rl.update_from_headers({'x-ratelimit-limit-requests': '60', 'x-ratelimit-remaining-requests': '0',
+                            'x-ratelimit-limit-tokens': '40000', 'x-ratelimit-remaining-tokens': 'x'})
+    # Cabeçalho inválido: os limites de tokens ficam como estavam
+    assert (rl.rpm, rl.tpm) == (60, 100000)
+    rl.acquire()
+    assert clock.waits == [pytest.approx(1.0)]
+
+
+def test_retry_after_headers():
+    assert retry_after(HTTPError(429, {'retry-after': '7'})) == 7
+    assert retry_after(HTTPError(429, {'retry-after-ms': '250', 'retry-after': '7'})) == 0.25
+    assert retry_after(HTTPError(429)) is None
+    assert retry_after(ValueError()) is None
+
+
+def test_429_pauses_the_whole_service_for_retry_after(clock):
+    rl = limiter(clock, rpm=600, max_delay=30)
+    assert rl.backoff(HTTPError(429, {'retry-after': '5'}), attempt=0)
+    # A pausa vale para a próxima reserva de qualquer thread, sem dormir nesta
+    assert clock.waits == []
+    rl.acquire()
+    assert clock.waits == [pytest.approx(5.0)]
+
+
+def test_retry_after_is_capped_by_max_delay(clock):
+    rl = limiter(clock, max_delay=10)
+    assert rl.backoff(HTTPError(503, {'retry-after': '120'}), attempt=0)
+    assert clock.waits == [10]
+
+
+def test_exponential_backoff_without_retry_after(clock):
+    rl = limiter(clock, base_delay=0.5, max_delay=60)
+    for attempt in range(4):
+        assert rl.backoff(HTTPError(502), attempt)
+    assert clock.waits == [0.5, 1.0, 2.0, 4.0]
+
+
+def test_network_errors_are_retried(clock):
+    class TransportError(Exception):
+        pass
+
+    rl = limiter(clock, base_delay=1)
+    assert rl.backoff(ConnectionResetError(), attempt=0)
+    assert rl.backoff(TransportError(), attempt=0, transient=(TransportError,))
+    assert clock.waits == [1, 1]
+
+
+def test_permanent_errors_are_not_retried(clock):
+    class DecodeError(OSError, ValueError):
+        pass
+
+    rl = limiter(clock)
+    assert not rl.backoff(HTTPError(400), attempt=0)
+    assert not rl.backoff(HTTPError(404), attempt=0)
+    assert not rl.backoff(ValueError('resposta inválida'), attempt=0)
+    assert not rl.backoff(json.JSONDecodeError('x', '', 0), attempt=0)
+    # Como requests.JSONDecodeError: resposta inválida, não falha de rede
+    assert not rl.backoff(DecodeError(), attempt=0)
+    assert clock.waits == []
@@ -0,0 +1,101 @@
+from reference_merge import merge_creators, merge_item
+
+
+def author(last, first=''):
+    return {'creatorType': 'author', 'lastName': last, 'firstName': first}
+
+
+def test_empty_fields_are_filled_from_either_side():
+    result = merge_item({'itemType': 'book', 'title': 'Livro', 'volume': ''},
+                        {'volume': '3', 'publisher': 'Editora', 'pages': None})
+    assert result.item == {'itemType': 'book', 'title': 'Livro', 'volume': '3', 'publisher': 'Editora'}
+    assert result.conflicts == {} and result.ambiguous == []
+
+
+def test_item_policy_keeps_item_value():
+    result = merge_item({'itemType': 'book', 'url': 'https://a.org/x'}, {'itemType': 'journalArticle', 'url': 'https://b.org/y'})
+    assert result.item == {'itemType': 'book', 'url': 'https://a.org/x'}
+    assert set(result.conflicts) == {'itemType', 'url'}
+    assert result.ambiguous == []
+
+
+def test_contains_policy_prefers_the_fuller_text():
+    result = merge_item({'title': 'Efeitos do treino'}, {'title': 'Efeitos do Treino: um ensaio clínico'})
+    assert result.item['title'] == 'Efeitos do Treino: um ensaio clínico'
+    result = merge_item({'publisher': 'Editora da Universidade de São Paulo'}, {'publisher': 'Universidade de São Paulo'})
+    assert result.item['publisher'] == 'Editora da Universidade de São Paulo'
+    assert result.conflicts == {} and result.ambiguous == []
+
+
+def test_contains_policy_with_unrelated_texts_is_ambiguous():
+    result = merge_item({'title': 'Efeitos do treino'}, {'title': 'Dieta e sono'})
+    assert result.item['title'] == 'Efeitos do treino'
+    assert result.conflicts == {'title': {'item': 'Efeitos do treino', 'enrichment': 'Dieta e sono'}}
+    assert result.ambiguous == ['title']
+
+
+def test_normalized_texts_are_equal():
+    result = merge_item({'publicationTitle': 'Revista de Nutrição'}, {'publicationTitle': 'REVISTA DE NUTRICAO'})
+    assert result.item['publicationTitle'] == 'Revista de Nutrição'
+    assert result.conflicts == {}
+
+
+def test_longest_policy():
+    result = merge_item({'abstractNote': 'Curto.'}, {'abstractNote': 'Um resumo bem mais longo.'})
+    assert result.item['abstractNote'] == 'Um resumo bem mais longo.'
+    assert 'abstractNote' in result.conflicts and result.ambiguous == []
+
+
+def test_date_policy_keeps_the_most_precise():
+    assert merge_item({'date': '2020'}, {'date': '2020-05-01'}).item['date'] == '2020-05-01'
+    assert merge_item({'date': '2020-05'}, {'date': '2020'}).item['date'] == '2020-05'
+    result = merge_item({'date': '2020'}, {'date': '2019'})
+    assert result.item['date'] == '2020'
+    assert result.ambiguous == ['date']
+
+
+def test_identifier_policy_ignores_prefix_case_and_hyphens():
+    result = merge_item({'DOI': '10.1590/ABC-123', 'ISBN': '978-85-0000-000-0'},
+                        {'DOI': 'https://doi.org/10.1590/abc-123', 'ISBN': '9788500000000'})
+    assert result.item == {'DOI': '10.1590/ABC-123', 'ISBN': '978-85-0000-000-0'}
+    assert result.conflicts == {}
+    result = merge_item({'DOI': '10.1590/abc'}, {'DOI': '10.1590/xyz'})
+    assert result.item['DOI'] == '10.1590/abc'
+    assert result.ambiguous == ['DOI']
+
+
+def test_union_and_lines_policies():
+    result = merge_item({'tags': [{'tag': 'a'}], 'extra': 'PMID: 1\nnota'},
+                        {'tags': [{'tag': 'b'}, {'tag': 'a'}], 'extra': 'PMID: 1\nPMCID: PMC2'})
+    assert result.item['tags'] == [{'tag': 'a'}, {'tag': 'b'}]
+    assert result.item['extra'] == 'PMID: 1\nnota\nPMCID: PMC2'
+    assert result.conflicts == {}
+
+
+def test_non_text_values_that_differ_are_ambiguous():
+    result = merge_item({'volume': 3}, {'volume': '4'})
+    assert result.item['volume'] == 3
+    assert result.ambiguous == ['volume']
+
+
+def test_custom_policies():
+    result = merge_item({'title': 'A'}, {'title': 'B'}, policies={'title': 'item'})
+    assert result.item['title'] == 'A'
+    assert result.ambiguous == []
+
+
+def test_creators_are_deduplicated_and_completed():
+    merged = merge_creators(
+        [author('Silva', 'J.'), author('Souza'), {'creatorType': 'author', 'name': 'IBGE'}],
+        [author('SILVA', 'João'), author('Souza', 'Maria'), author('Silva', 'Pedro'), {'creatorType': 'author', 'name': 'ibge'}],
+    )
+    assert [(c.get('lastName') or c['name'], c.get('firstName')) for c in merged] == [
+        ('Silva', 'João'), ('Souza', 'Maria'), ('IBGE', None), ('Silva', 'Pedro')]
+
+
+def test_merge_does_not_touch_the_inputs():
+    item = {'creators': [author('Silva', 'J.')], 'tags': [{'tag': 'a'}]}
+    data = {'creators': [author('Silva', 'João')], 'tags': [{'tag': 'b'}]}
+    result = merge_item(item, data)
+    assert result.item['creators'][0]['firstName'] == 'João'
+    assert item == {'creators': [author('Silva', 'J.')], 'tags': [{'tag': 'a'}]}
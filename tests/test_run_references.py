@@ -0,0 +1,26 @@
+from import_engine import ImportConfig, ImportEngine
+from import_journal import reference_id
+
+from test_page_notes import FakeSchema, FakeZotero
+
+
+def test_reference_dropped_at_parse_gets_failed_outcome():
+    config = ImportConfig(library_id='1', api_key='x', openai_key='x', firecrawl_key='x', duplicate_mode='force',
+                          journal_path='', response_cache_path='', scrape_cache_dir='', prefetch_queries=False,
+                          metadata_resolvers=())
+    engine = ImportEngine(config)
+    zot = FakeZotero()
+    engine.zotero_client = lambda: zot
+    engine.zotero_schema = lambda client: FakeSchema()
+    # O LLM devolve item só para a primeira referência do bloco
+    engine.parse_numbered = lambda chunk: [{'itemType': 'journalArticle', 'title': 'Lida'}] + [None] * (len(chunk) - 1)
+    engine.fetch_enrichment = lambda reference, item, cancel_event=None, query=None: ('resolved', {})
+
+    outcomes = []
+    engine.run_references(['Referência lida', 'Referência ilegível'], on_item=outcomes.append)
+
+    by_status = {outcome['status']: outcome for outcome in outcomes}
+    assert sorted(by_status) == ['created', 'failed']
+    assert by_status['failed']['ref'] == reference_id('Referência ilegível')
+    assert by_status['failed']['reference'] == 'Referência ilegível'
+    assert engine.metrics.summary()['references'] == {'created': 1, 'failed': 1}
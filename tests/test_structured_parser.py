@@ -0,0 +1,212 @@
+import pytest
+
+from reference_reader import iter_references
+from structured_parser import parse_record
+
+
+def records(text):
+    return [parse_record(record) for record in iter_references(text.splitlines())]
+
+
+def names(item):
+    return [(c.get('lastName'), c.get('firstName')) if 'lastName' in c else c['name'] for c in item['creators']]
+
+
+BIBTEX = r"""@article{silva2020,
+  author = {Silva, Jo{\~a}o A. and de Souza, Maria and {Instituto Brasileiro de Geografia}},
+  title = {Efeitos do {Treino} na sa{\'u}de},
+  journal = "Revista de Nutri{\c c}{\~a}o",
+  volume = 12, number = {3}, pages = {45--67},
+  year = 2020, month = mar,
+  doi = {https://doi.org/10.1590/1234-5678},
+  keywords = {treino; sa{\'u}de, nutri{\c c}{\~a}o}
+}
+
+@incollection{costa2018,
+  author = {Costa, Ana},
+  editor = {Lima, Pedro},
+  title = "Cap{\'\i}tulo " # {um},
+  booktitle = {Coletânea},
+  publisher = {Editora X}, address = {S{\~a}o Paulo},
+  year = {2018}
+}
+"""
+
+
+def test_bibtex_records():
+    article, chapter = records(BIBTEX)
+    assert article['itemType'] == 'journalArticle'
+    assert names(article) == [('Silva', 'João A.'), ('de Souza', 'Maria'), 'Instituto Brasileiro de Geografia']
+    assert article['title'] == 'Efeitos do Treino na saúde'
+    assert article['publicationTitle'] == 'Revista de Nutrição'
+    assert (article['volume'], article['issue'], article['pages']) == ('12', '3', '45-67')
+    assert article['date'] == '2020-03'
+    assert article['DOI'] == '10.1590/1234-5678'
+    assert [tag['tag'] for tag in article['tags']] == ['treino', 'saúde', 'nutrição']
+
+    assert chapter['itemType'] == 'bookSection'
+    assert chapter['title'] == 'Capítulo um'
+    assert chapter['bookTitle'] == 'Coletânea'
+    assert [c['creatorType'] for c in chapter['creators']] == ['author', 'editor']
+    assert (chapter['publisher'], chapter['place'], chapter['date']) == ('Editora X', 'São Paulo', '2018')
+
+
+@pytest.mark.parametrize('record', [
+    "@article{semtitulo, author = {Silva, A.}, year = 2020}",
+    "@article{vazio,}",
+    "@misc{",
+])
+def test_bibtex_malformed_falls_back(record):
+    assert parse_record(record) is None
+
+
+def test_bibtex_unclosed_value_keeps_the_rest():
+    assert parse_record('@article{aberto, title = {Sem fechar') == {'itemType': 'journalArticle', 'title': 'Sem fechar'}
+    item = parse_record('@book{x, title = {Livro}, publisher = "Editora {X}')
+    assert item['title'] == 'Livro'
+    assert item['publisher'] == 'Editora X'
+
+
+RIS = """TY  - JOUR
+AU  - Silva, João A.
+AU  - Souza, Maria
+TI  - Efeitos do treino
+  na saúde
+T2  - Revista de Nutrição
+VL  - 12
+IS  - 3
+SP  - 45
+EP  - 67
+PY  - 2020/03/15/
+DO  - doi:10.1590/1234-5678
+KW  - treino
+KW  - saúde
+ER  -
+
+TY  - BOOK
+AU  - Instituto Brasileiro de Geografia
+TI  - Censo
+T2  - Série Estudos
+PB  - IBGE
+SN  - 978-85-240-0000-0
+PY  - 2010
+ER  -
+"""
+
+
+def test_ris_records():
+    article, book = records(RIS)
+    assert article['itemType'] == 'journalArticle'
+    assert names(article) == [('Silva', 'João A.'), ('Souza', 'Maria')]
+    assert article['title'] == 'Efeitos do treino na saúde'
+    assert article['publicationTitle'] == 'Revista de Nutrição'
+    assert (article['pages'], article['date'], article['DOI']) == ('45-67', '2020-03-15', '10.1590/1234-5678')
+    assert [tag['tag'] for tag in article['tags']] == ['treino', 'saúde']
+
+    assert book['itemType'] == 'book'
+    assert names(book) == ['Instituto Brasileiro de Geografia']
+    assert (book['series'], book['publisher'], book['ISBN'], book['date']) == (
+        'Série Estudos', 'IBGE', '978-85-240-0000-0', '2010')
+
+
+@pytest.mark.parametrize('record', [
+    "TY  - JOUR\nAU  - Silva, A.\nPY  - 2020\nER  - ",
+    "TY  - JOUR\nTI  - \nER  - ",
+])
+def test_ris_malformed_falls_back(record):
+    assert parse_record(record) is None
+
+
+def test_ris_unknown_type_and_bad_date():
+    item = parse_record("TY  - XYZ\nTI  - Documento\nPY  - s.d.\nER  - ")
+    assert item == {'itemType': 'document', 'title': 'Documento', 'date': 's.d.'}
+    assert parse_record("TY  - \nTI  - Sem tipo\nER  - ") == {'itemType': 'document', 'title': 'Sem tipo'}
+
+
+MEDLINE = """PMID- 12345678
+TI  - Effects of training on health: a randomized
+      trial.
+AB  - Background.
+FAU - Silva, Joao A
+AU  - Silva JA
+FAU - Souza, Maria
+AU  - Souza M
+CN  - Grupo de Estudos
+JT  - Revista de Nutricao
+TA  - Rev Nutr
+VI  - 12
+IP  - 3
+PG  - 145-9
+DP  - 2020 Mar 15
+IS  - 1415-5273 (Print)
+AID - 10.1590/1234-5678 [doi]
+PMC - PMC7654321
+MH  - *Exercise
+OT  - training
+
+PMID- 87654321
+TI  - Short names only.
+AU  - Costa AB
+DP  - 2019 Spring
+"""
+
+
+def test_medline_records():
+    article, short = records(MEDLINE)
+    assert article['itemType'] == 'journalArticle'
+    assert article['title'] == 'Effects of training on health: a randomized trial'
+    assert names(article) == [('Silva', 'Joao A'), ('Souza', 'Maria'), 'Grupo de Estudos']
+    assert (article['publicationTitle'], article['journalAbbreviation']) == ('Revista de Nutricao', 'Rev Nutr')
+    assert (article['pages'], article['date'], article['ISSN']) == ('145-149', '2020-03-15', '1415-5273')
+    assert article['DOI'] == '10.1590/1234-5678'
+    assert article['extra'] == 'PMID: 12345678\nPMCID: PMC7654321'
+    assert [tag['tag'] for tag in article['tags']] == ['Exercise', 'training']
+
+    assert names(short) == [('Costa', 'A. B.')]
+    assert short['date'] == '2019'
+
+
+@pytest.mark.parametrize('record', [
+    "PMID- 1\nAU  - Silva JA\nDP  - 2020",
+    "PMID- \nTI  - Sem PMID.",
+])
+def test_medline_malformed_falls_back(record):
+    assert parse_record(record) is None
+
+
+CSL_JSON = """[
+  {"type": "article-journal", "title": "Efeitos do treino", "container-title": ["Revista de Nutrição"],
+   "author": [{"family": "Silva", "given": "João A."}, {"literal": "Grupo de Estudos"}],
+   "volume": 12, "issue": "3", "page": "45–67", "DOI": "10.1590/1234-5678",
+   "issued": {"date-parts": [[2020, 3, 15]]}, "keyword": "treino, saúde"},
+  {"type": "book", "title": "Livro {com chaves}", "publisher": "Editora", "issued": {"date-parts": [[2018]]}}
+]
+"""
+
+
+def test_csl_json_records():
+    article, book = records(CSL_JSON)
+    assert article['itemType'] == 'journalArticle'
+    assert article['title'] == 'Efeitos do treino'
+    assert article['publicationTitle'] == 'Revista de Nutrição'
+    assert (article['volume'], article['issue'], article['pages']) == ('12', '3', '45-67')
+    assert article['date'] == '2020-03-15'
+    assert [tag['tag'] for tag in article['tags']] == ['treino', 'saúde']
+
+    assert book['itemType'] == 'book'
+    assert book['title'] == 'Livro {com chaves}'
+    assert (book['publisher'], book['date']) == ('Editora', '2018')
+
+
+@pytest.mark.parametrize('record', [
+    '{"type": "book", "title": "Sem fechar"',
+    '{"type": "book", "author": [{"family": "Silva"}]}',
+    '{"type": "book", "title": []}',
+    '[1, 2]',
+])
+def test_csl_json_malformed_falls_back(record):
+    assert parse_record(record) is None
+
+
+def test_free_text_is_not_structured():
+    assert parse_record("SILVA, J. Efeitos do treino. Revista, v. 1, p. 1-2, 2020.") is None
@@ -0,0 +1,52 @@
+import pytest
+
+from zotero_uploader import ZoteroUploader
+
+
+def transport_errors():
+    errors = []
+    for module, name in (('httpx2', 'ConnectError'), ('httpx', 'ConnectError'), ('requests', 'ConnectionError')):
+        try:
+            errors.append(getattr(__import__(module), name))
+        except ImportError:
+            pass
+    return errors
+
+
+class FlakyClient:
+    """Cliente falso do pyzotero: a primeira criação cai com erro de transporte"""
+
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+        self.request = None
+
+    def check_items(self, items):
+        return items
+
+    def create_items(self, items):
+        self.calls += 1
+        if self.calls == 1:
+            raise self.error('conexão recusada')
+        return {'success': {str(position): f"KEY{position}" for position in range(len(items))}}
+
+
+@pytest.mark.parametrize('error', transport_errors())
+def test_transport_error_retries_batch(error):
+    client = FlakyClient(error)
+    uploader = ZoteroUploader(lambda: client, base_delay=0.0)
+    report = uploader.upload([('0', {'title': 'a'}), ('1', {'title': 'b'})])
+    assert client.calls == 2
+    assert report == {'success': {'0': 'KEY0', '1': 'KEY1'}, 'failed': {}}
+
+
+def test_permanent_error_is_not_retried():
+    class BrokenClient(FlakyClient):
+        def create_items(self, items):
+            self.calls += 1
+            raise ValueError('erro de programação')
+
+    client = BrokenClient(None)
+    report = ZoteroUploader(lambda: client, base_delay=0.0).upload([('0', {'title': 'a'})])
+    assert client.calls == 1
+    assert report['failed']['0']['message'] == 'erro de programação'
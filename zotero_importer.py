@@ -1,16 +1,21 @@
-from pyzotero import zotero
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import json
 import os
-from openai import OpenAI
-from firecrawl import FirecrawlApp
+import time
 import traceback
 from dotenv import load_dotenv
 
+from import_engine import ImportConfig, ImportEngine, save_credentials, CREDENTIALS_FILE
+from import_worker import ImportWorker
+
 # Carregar variáveis de ambiente
 load_dotenv()
 
+# Com esta variável apontando para um arquivo, o programa fecha assim que a janela
+# aparece e grava o instante nele; serve para medir a abertura do código e do executável
+STARTUP_PROBE_VAR = 'ZOTERO_IMPORTER_STARTUP_PROBE'
+
 class ZoteroImporter:
     def __init__(self):
         try:
@@ -18,6 +23,10 @@ class ZoteroImporter:
             self.window.title("Importador de Referências para Zotero")
             self.window.geometry("800x700")
             
+            # Importação em segundo plano (ImportWorker) e intervalo de consulta da fila
+            self.worker = None
+            self.poll_interval_ms = 100
+            
             # Inicializar variáveis
             self.library_id = tk.StringVar()
             self.api_key = tk.StringVar()
@@ -88,9 +97,16 @@ class ZoteroImporter:
             self.submit_btn = ttk.Button(button_frame, text="Importar Referências", command=self.import_references, style='Accent.TButton')
             self.submit_btn.pack(side="left", padx=5)
             
+            self.cancel_btn = ttk.Button(button_frame, text="Cancelar", command=self.cancel_import, state="disabled")
+            self.cancel_btn.pack(side="left", padx=5)
+            
             self.clear_btn = ttk.Button(button_frame, text="Limpar", command=self.clear_text)
             self.clear_btn.pack(side="left", padx=5)
             
+            # Configure progress
+            self.progress_bar = ttk.Progressbar(self.window, mode="determinate")
+            self.progress_bar.pack(fill="x", padx=10, pady=5)
+            
             # Configure status
             self.status_var = tk.StringVar()
             self.status_label = ttk.Label(self.window, textvariable=self.status_var, wraplength=780)
@@ -112,9 +128,9 @@ class ZoteroImporter:
     def load_credentials(self):
         """Load saved credentials if they exist"""
         try:
-            if os.path.exists('zotero_credentials.json'):
+            if os.path.exists(CREDENTIALS_FILE):
                 print("Arquivo de credenciais encontrado")
-                with open('zotero_credentials.json', 'r', encoding='utf-8') as f:
+                with open(CREDENTIALS_FILE, 'r', encoding='utf-8') as f:
                     creds = json.load(f)
                     print("Credenciais carregadas do arquivo")
                     
@@ -147,15 +163,7 @@ class ZoteroImporter:
             if not all(hasattr(self, attr) for attr in ['library_id', 'api_key', 'openai_key', 'firecrawl_key']):
                 raise Exception("Widgets de credenciais não inicializados")
                 
-            creds = {
-                'library_id': self.library_id_entry.get(),
-                'api_key': self.api_key_entry.get(),
-                'openai_key': self.openai_key_entry.get(),
-                'firecrawl_key': self.firecrawl_key_entry.get()
-            }
-            
-            with open('zotero_credentials.json', 'w', encoding='utf-8') as f:
-                json.dump(creds, f, indent=4)
+            save_credentials(self.get_config(), CREDENTIALS_FILE)
             print("Credenciais salvas com sucesso")
             self.status_var.set("Credenciais salvas com sucesso!")
         except Exception as e:
@@ -166,274 +174,22 @@ class ZoteroImporter:
         self.text_area.delete('1.0', tk.END)
         self.status_var.set("")
     
-    def parse_references(self, text):
-        """Analisa as referências usando OpenAI e retorna JSON estruturado"""
-        client = OpenAI(api_key=self.openai_key_entry.get())
-        
-        prompt_template = f"""
-        Analise as referências bibliográficas abaixo e converta em um JSON estruturado para o Zotero.
-        
-        Regras importantes:
-        1. Determine o tipo correto do item (itemType):
-           - "journalArticle" para artigos de periódicos
-           - "book" para livros
-           - "bookSection" para capítulos de livros
-           - "thesis" para teses e dissertações
-           - "conferencePaper" para trabalhos em eventos
-        
-        2. Para autores, use SEMPRE o formato:
-           "creators": [
-              {{"creatorType": "author", "firstName": "Nome", "lastName": "Sobrenome"}}
-           ]
-        
-        3. Campos obrigatórios por tipo:
-           - Para journalArticle:
-             "title", "creators", "date", "publicationTitle", "volume", "issue", "pages"
-           - Para book:
-             "title", "creators", "date", "publisher", "place"
-           - Para bookSection:
-             "title", "creators", "bookTitle", "publisher", "date"
-           - Para thesis:
-             "title", "creators", "date", "university", "thesisType"
-           - Para conferencePaper:
-             "title", "creators", "date", "conferenceName", "place"
-        
-        4. Regras adicionais:
-           - Não inclua campos vazios
-           - Use o campo "language" apenas se tiver certeza
-           - Extraia o DOI se disponível
-           - Mantenha datas no formato YYYY-MM-DD ou YYYY
-           - Para páginas, use o formato "1-10" ou apenas "1" se for página única
-        
-        Referências para processar:
-        {text}
-        
-        Retorne APENAS o JSON, sem explicações ou comentários.
-        """
-
-        try:
-            response = client.chat.completions.create(
-                model="o3-mini",
-                messages=[{"role": "user", "content": prompt_template}]
-            )
-            
-            parsed_data = json.loads(response.choices[0].message.content)
-            return parsed_data if isinstance(parsed_data, list) else [parsed_data]
-            
-        except json.JSONDecodeError as e:
-            raise Exception(f"Erro ao decodificar JSON da resposta do OpenAI: {str(e)}")
-        except Exception as e:
-            raise Exception(f"Erro ao analisar referências com OpenAI: {str(e)}")
-    
-    def create_zotero_items(self, items):
-        """Create items in Zotero"""
-        zot = zotero.Zotero(self.library_id_entry.get(), 'user', self.api_key_entry.get())
-        
-        if not items:
-            raise Exception("Nenhum item válido para criar no Zotero.")
-        
-        # Process in batches of 50 (API limit)
-        BATCH_SIZE = 50
-        current_batch = []
-        results = []
-        
-        # Get valid fields for items
-        valid_fields = {}
-        try:
-            item_types = zot.item_types()
-            for item_type in item_types:
-                type_fields = zot.item_type_fields(item_type['itemType'])
-                valid_fields[item_type['itemType']] = [field['field'] for field in type_fields]
-        except Exception as e:
-            raise Exception(f"Erro ao obter campos válidos do Zotero: {str(e)}")
-        
-        for idx, item in enumerate(items, start=1):
-            try:
-                # Get item type, default to 'journalArticle' if not specified
-                item_type = item.get('itemType', 'journalArticle')
-                
-                # Create a new template for this item type
-                template = zot.item_template(item_type)
-                
-                # Only copy valid fields for this item type
-                if item_type in valid_fields:
-                    valid_item_fields = valid_fields[item_type]
-                    for field, value in item.items():
-                        if field in valid_item_fields:
-                            template[field] = value
-                        elif field == 'creators':
-                            # Handle creators separately as they have a special structure
-                            template['creators'] = value
-                
-                current_batch.append(template)
-                
-                if (idx % BATCH_SIZE == 0) or (idx == len(items)):
-                    try:
-                        zot.check_items(current_batch)
-                        result = zot.create_items(current_batch)
-                        results.append(result)
-                    except Exception as e:
-                        raise Exception(f"Erro ao criar lote de itens no Zotero: {str(e)}")
-                    current_batch = []
-            
-            except Exception as e:
-                print(f"Aviso: Erro ao processar item {idx}: {str(e)}")
-                continue
-        
-        return results
-    
-    def generate_firecrawl_query(self, text):
-        """Gera URLs para o Firecrawl usando OpenAI"""
-        client = OpenAI(api_key=self.openai_key_entry.get())
-        
-        prompt_template = f"""
-        A partir das referências abaixo, identifique e retorne a URL do documento acadêmico.
-        Se houver múltiplas referências, retorne apenas a URL mais relevante.
-        Priorize URLs de repositórios acadêmicos (ex: scielo.org, researchgate.net, academia.edu).
-        Se não encontrar uma URL específica, retorne a URL da página principal do periódico ou instituição.
-
-        Referências:
-        {text}
-
-        Retorne APENAS a URL, sem explicações ou formatação adicional.
-        """
-
-        try:
-            response = client.chat.completions.create(
-                model="o3-mini",
-                messages=[{"role": "user", "content": prompt_template}]
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            raise Exception(f"Erro ao gerar URL para Firecrawl: {str(e)}")
-
-    def fetch_firecrawl_data(self, query):
-        """Busca dados usando Firecrawl"""
-        try:
-            app = FirecrawlApp(api_key=self.firecrawl_key_entry.get())
-            print(f"Buscando URL: {query}")
-            
-            # Primeiro fazemos um scrape da URL
-            results = app.scrape_url(
-                query,
-                params={
-                    'formats': ['markdown', 'json'],
-                    'jsonOptions': {
-                        'prompt': 'Extraia os metadados acadêmicos desta página, incluindo: título, autores, data, DOI, abstract, palavras-chave e informações de publicação.'
-                    }
-                }
-            )
-            
-            print(f"Resultado do Firecrawl: {json.dumps(results, indent=2)}")
-            
-            # Organizando os dados retornados
-            data = results.get('data', {})
-            json_data = data.get('json', {})
-            
-            # Converter autores para o formato do Zotero
-            creators = []
-            if 'authors' in json_data:
-                for author in json_data['authors']:
-                    name_parts = author['name'].split()
-                    if len(name_parts) > 1:
-                        creators.append({
-                            'creatorType': 'author',
-                            'firstName': ' '.join(name_parts[:-1]),
-                            'lastName': name_parts[-1]
-                        })
-                    else:
-                        creators.append({
-                            'creatorType': 'author',
-                            'firstName': '',
-                            'lastName': name_parts[0]
-                        })
-            
-            # Construir metadados formatados
-            metadata = {
-                'title': json_data.get('title', ''),
-                'abstractNote': json_data.get('abstract', ''),
-                'url': query,
-                'language': data.get('language', ''),
-                'creators': creators,
-                'date': json_data.get('date', ''),
-                'extra': ''
-            }
-            
-            # Adicionar informações de publicação
-            pub_info = json_data.get('publication_info', {})
-            if pub_info:
-                metadata['publisher'] = pub_info.get('publisher', '')
-                metadata['edition'] = pub_info.get('edition', '')
-                if 'print_year' in pub_info:
-                    metadata['date'] = str(pub_info['print_year'])
-                
-                # Adicionar informações adicionais ao campo extra
-                extra_info = []
-                if pub_info.get('online_version'):
-                    extra_info.append(f"Versão online: {pub_info['online_version']}")
-                if pub_info.get('available_from'):
-                    extra_info.append(f"Disponível em: {pub_info['available_from']}")
-                if extra_info:
-                    metadata['extra'] = '\n'.join(extra_info)
-            
-            # Adicionar palavras-chave
-            if 'keywords' in json_data:
-                metadata['tags'] = [{'tag': kw} for kw in json_data['keywords']]
-            
-            # Adicionar conteúdo markdown como nota se disponível
-            if 'markdown' in data:
-                metadata['notes'] = [{'note': data['markdown']}]
-            
-            return metadata
-            
-        except Exception as e:
-            print(f"Erro detalhado do Firecrawl: {str(e)}")
-            raise Exception(f"Erro ao buscar dados via Firecrawl: {str(e)}")
-
-    def merge_reference_data(self, openai_json, firecrawl_data):
-        """Mescla dados do OpenAI com dados do Firecrawl"""
-        client = OpenAI(api_key=self.openai_key_entry.get())
-        
-        merge_prompt = f"""
-        Mescle os dois conjuntos de dados em um único JSON para Zotero.
-        Mantenha a estrutura do Zotero e priorize dados mais completos.
-        
-        Regras importantes:
-        1. Mantenha o itemType original do OpenAI
-        2. Preserve todos os creators do OpenAI, mas adicione novos do Firecrawl se não existirem
-        3. Use os dados do Firecrawl para enriquecer:
-           - title se mais completo
-           - abstractNote para o resumo
-           - url da fonte
-           - DOI se disponível
-           - tags para palavras-chave
-           - notes para conteúdo adicional
-           - extra para informações complementares
-        4. Para campos conflitantes, use a versão mais completa
-        5. Mantenha apenas campos válidos do Zotero
-
-        Dados OpenAI:
-        {json.dumps(openai_json, ensure_ascii=False)}
-
-        Dados Firecrawl:
-        {json.dumps(firecrawl_data, ensure_ascii=False)}
-
-        Retorne APENAS o JSON mesclado, sem explicações.
-        """
-
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "user", "content": merge_prompt}]
-            )
-            merged_data = json.loads(response.choices[0].message.content)
-            return merged_data if isinstance(merged_data, list) else [merged_data]
-        except Exception as e:
-            raise Exception(f"Erro ao mesclar dados: {str(e)}")
+    def get_config(self):
+        """Monta a configuração do motor de importação a partir dos campos da interface"""
+        return ImportConfig(
+            library_id=self.library_id_entry.get(),
+            api_key=self.api_key_entry.get(),
+            openai_key=self.openai_key_entry.get(),
+            firecrawl_key=self.firecrawl_key_entry.get()
+        )
 
     def import_references(self):
         """Import references to Zotero"""
-        if not all([self.library_id_entry.get(), self.api_key_entry.get(), self.openai_key_entry.get(), self.firecrawl_key_entry.get()]):
+        if self.worker is not None:
+            return
+        
+        config = self.get_config()
+        if config.missing_credentials():
             self.status_var.set("Por favor, insira todas as credenciais (Zotero, OpenAI e Firecrawl)")
             return
         
@@ -443,38 +199,87 @@ class ZoteroImporter:
                 self.status_var.set("Por favor, insira algumas referências")
                 return
             
-            # Passo 1: Parse inicial com OpenAI
-            self.status_var.set("Analisando referências com OpenAI...")
-            self.window.update()
-            openai_parsed = self.parse_references(text)
-            
-            # Passo 2: Gerar query e buscar no Firecrawl
-            self.status_var.set("Buscando dados complementares via Firecrawl...")
-            self.window.update()
-            firecrawl_query = self.generate_firecrawl_query(text)
-            firecrawl_data = self.fetch_firecrawl_data(firecrawl_query)
-            
-            # Passo 3: Mesclar dados
-            self.status_var.set("Mesclando dados...")
-            self.window.update()
-            merged_items = self.merge_reference_data(openai_parsed, firecrawl_data)
-            
-            # Passo 4: Criar no Zotero
-            self.status_var.set(f"Criando {len(merged_items)} itens no Zotero...")
-            self.window.update()
-            results = self.create_zotero_items(merged_items)
-            
-            self.save_credentials()
-            
-            total_success = sum(len(result.get('success', {})) for result in results)
-            self.status_var.set(f"Importados com sucesso: {total_success} referências")
+            # O pipeline roda numa thread; o progresso chega pela fila do worker
+            self.worker = ImportWorker(ImportEngine(config))
+            self.worker.start(text)
+            self.set_running(True)
+            self.window.after(self.poll_interval_ms, self.poll_worker)
             
         except Exception as e:
             self.status_var.set(f"Erro: {str(e)}")
     
+    def cancel_import(self):
+        """Pede o cancelamento da importação em andamento
+
+        A thread só para na próxima verificação (um scrape ou uma chamada ao
+        LLM em curso termina antes), então o botão Importar continua
+        desabilitado até ela sair: duas importações ao mesmo tempo gravariam
+        no mesmo diário e no mesmo índice da biblioteca.
+        """
+        if self.worker is None:
+            return
+        self.worker.cancel()
+        self.cancel_btn.configure(state="disabled")
+        self.status_var.set("Cancelando a importação...")
+    
+    def set_running(self, running):
+        """Habilita ou desabilita os botões conforme o estado da importação"""
+        self.submit_btn.configure(state="disabled" if running else "normal")
+        self.cancel_btn.configure(state="normal" if running else "disabled")
+        if running:
+            self.progress_bar.configure(value=0, maximum=1)
+    
+    def poll_worker(self):
+        """Consome os eventos do worker e atualiza a interface"""
+        worker = self.worker
+        if worker is None:
+            return
+        
+        if worker.cancel_event.is_set():
+            # Cancelada: só a saída da thread libera a interface; o progresso é descartado
+            if worker.is_running():
+                self.window.after(self.poll_interval_ms, self.poll_worker)
+                return
+            finished = [event for event in worker.poll() if event.kind == 'done']
+            self.worker = None
+            self.set_running(False)
+            # A importação pode ter terminado antes de notar o cancelamento
+            self.status_var.set(finished[-1].message if finished else "Importação cancelada")
+            return
+        
+        for event in worker.poll():
+            if event.kind == 'stage':
+                self.status_var.set(event.message)
+            elif event.kind == 'reference':
+                self.progress_bar.configure(value=event.current, maximum=max(event.total, 1))
+                self.status_var.set(f"{event.message} ({event.current}/{event.total})")
+            elif event.kind == 'done':
+                self.worker = None
+                self.set_running(False)
+                self.save_credentials()
+                self.status_var.set(event.message)
+                return
+            elif event.kind in ('error', 'cancelled'):
+                self.worker = None
+                self.set_running(False)
+                self.status_var.set(event.message)
+                return
+        
+        self.window.after(self.poll_interval_ms, self.poll_worker)
+    
     def run(self):
         """Start the application"""
+        probe = os.environ.get(STARTUP_PROBE_VAR)
+        if probe:
+            self.window.after_idle(lambda: self.startup_probe(probe))
         self.window.mainloop()
+    
+    def startup_probe(self, path):
+        """Grava o instante em que a janela ficou pronta e fecha o programa (benchmarks/startup.py)"""
+        self.window.update()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(repr(time.time()))
+        self.window.destroy()
 
 if __name__ == "__main__":
     app = ZoteroImporter()
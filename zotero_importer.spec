@@ -1,4 +1,16 @@
 # -*- mode: python ; coding: utf-8 -*-
+#
+#   pyinstaller --clean zotero_importer.spec              # um único .exe (padrão)
+#   pyinstaller --clean zotero_importer.spec -- --onedir  # pasta com o .exe e as bibliotecas
+#
+# O .exe único se descompacta numa pasta temporária a cada execução, o que
+# atrasa a janela em alguns segundos; no modo --onedir os arquivos já estão
+# no disco e o programa abre direto (sem UPX, que também custa na abertura).
+import argparse
+
+spec_parser = argparse.ArgumentParser()
+spec_parser.add_argument('--onedir', action='store_true')
+options = spec_parser.parse_args()
 
 block_cipher = None
 
@@ -7,11 +19,13 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('.env.example', '.')],
-    hiddenimports=['tkinter', 'openai', 'firecrawl', 'pyzotero', 'python-dotenv'],
+    # Os SDKs são importados dentro das funções (no primeiro uso); listados aqui para garantir que entrem
+    hiddenimports=['tkinter', 'openai', 'requests', 'pyzotero', 'python-dotenv'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Dependências opcionais do openai que o programa não usa
+    excludes=['numpy', 'pandas', 'matplotlib', 'IPython', 'pytest'],
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
     cipher=block_cipher,
@@ -20,24 +34,53 @@ a = Analysis(
 
 pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.zipfiles,
-    a.datas,
-    [],
-    name='Text to Zotero',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=False,
-    disable_windowed_traceback=False,
-    argv_emulation=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None
-) 
\ No newline at end of file
+if options.onedir:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        name='Text to Zotero',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=False,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.zipfiles,
+        a.datas,
+        strip=False,
+        upx=False,
+        upx_exclude=[],
+        name='Text to Zotero'
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.zipfiles,
+        a.datas,
+        [],
+        name='Text to Zotero',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=True,
+        upx_exclude=[],
+        runtime_tmpdir=None,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None
+    )
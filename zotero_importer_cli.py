@@ -0,0 +1,146 @@
+"""Importação em lote pela linha de comando, sem interface gráfica.
+
+Lê referências de arquivos .txt/.bib/.ris/.nbib/.csl.json, de diretórios
+(todos os arquivos com essas extensões) ou da entrada padrão ('-'), roda o
+mesmo pipeline do ImportEngine e escreve uma linha JSON por referência na
+saída. Mensagens de progresso e avisos vão para stderr, para a saída poder
+ser redirecionada.
+
+    python zotero_importer_cli.py referencias/ --output resultado.jsonl
+
+Códigos de saída: 0 se tudo foi importado, 1 se alguma referência falhou,
+2 para erros de uso ou de configuração.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from import_engine import CREDENTIALS_FILE, ImportConfig, ImportEngine
+from library_index import DUPLICATE_MODES
+from reference_reader import iter_references, read_references
+
+# Extensões lidas quando a entrada é um diretório (.json genérico fica de fora: pode ser outro arquivo)
+INPUT_EXTENSIONS = ('.txt', '.bib', '.ris', '.nbib', '.csl.json')
+
+
+def collect_inputs(paths):
+    """Expande diretórios nos arquivos de referências que eles contêm"""
+    inputs = []
+    for path in paths:
+        if path == '-' or not os.path.isdir(path):
+            inputs.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(INPUT_EXTENSIONS):
+                    inputs.append(os.path.join(root, name))
+    return inputs
+
+
+def read_input(path):
+    """Referências de um arquivo ou do stdin, lidas em fluxo, uma por vez"""
+    if path == '-':
+        return iter_references(line.rstrip('\r\n') for line in sys.stdin)
+    return read_references(path)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Importa referências bibliográficas para o Zotero e escreve o resultado em JSONL"
+    )
+    parser.add_argument('inputs', nargs='+', help="arquivos .txt/.bib/.ris/.nbib/.csl.json, diretórios ou '-' para stdin")
+    parser.add_argument('-o', '--output', help="arquivo JSONL de saída (padrão: stdout)")
+    parser.add_argument('--credentials', nargs='?', const=CREDENTIALS_FILE,
+                        help="lê as credenciais de um arquivo JSON em vez das variáveis de ambiente")
+    parser.add_argument('--library-type', choices=('user', 'group'), help="tipo da biblioteca do Zotero")
+    parser.add_argument('--workers', type=int, help="referências enriquecidas em paralelo")
+    parser.add_argument('--parse-workers', type=int, help="blocos analisados pelo LLM em paralelo")
+    parser.add_argument('--upload-workers', type=int, help="lotes enviados ao Zotero em paralelo")
+    parser.add_argument('--duplicates', choices=DUPLICATE_MODES, help="o que fazer com itens já na biblioteca")
+    parser.add_argument('--journal', help="diário de importação usado para retomar execuções")
+    parser.add_argument('--trace', help="grava uma linha JSON por chamada externa (tempo, fila, tokens, custo)")
+    parser.add_argument('--metrics-file', help="grava as métricas no formato de texto do Prometheus (.prom)")
+    parser.add_argument('--metrics-port', type=int, help="expõe as métricas em http://127.0.0.1:PORTA/metrics")
+    parser.add_argument('-v', '--verbose', action='store_true', help="mostra o progresso em stderr")
+    return parser
+
+
+def build_config(args):
+    overrides = {}
+    for option, field in (('library_type', 'library_type'), ('workers', 'max_workers'),
+                          ('parse_workers', 'parse_workers'), ('upload_workers', 'upload_workers'),
+                          ('duplicates', 'duplicate_mode'), ('journal', 'journal_path'),
+                          ('trace', 'metrics_trace_path'), ('metrics_file', 'metrics_prometheus_path')):
+        value = getattr(args, option)
+        if value is not None:
+            overrides[field] = value
+    if args.credentials:
+        return ImportConfig.from_credentials_file(args.credentials, **overrides)
+    load_dotenv()
+    return ImportConfig.from_env(**overrides)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        config = build_config(args)
+    except (OSError, ValueError) as e:
+        parser.exit(2, f"Erro: {str(e)}\n")
+    missing = config.missing_credentials()
+    if missing:
+        parser.exit(2, f"Erro: credenciais ausentes: {', '.join(missing)}\n")
+
+    inputs = collect_inputs(args.inputs)
+    if not inputs:
+        parser.exit(2, "Erro: nenhum arquivo de referências encontrado\n")
+
+    engine = ImportEngine(config)
+    if args.metrics_port:
+        engine.metrics.serve(args.metrics_port)
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    failures = 0
+
+    def progress(event):
+        if args.verbose and event.kind == 'stage':
+            print(event.message, file=sys.stderr)
+
+    try:
+        for source in inputs:
+            def write(outcome):
+                nonlocal failures
+                if outcome['status'] == 'failed':
+                    failures += 1
+                record = {'source': source, **outcome}
+                output.write(json.dumps(record, ensure_ascii=False) + '\n')
+                output.flush()
+
+            try:
+                references = read_input(source)
+                # Os prints do pipeline não podem se misturar ao JSONL em stdout
+                with contextlib.redirect_stdout(sys.stderr):
+                    engine.run_references(references, progress=progress, on_item=write)
+            except Exception as e:
+                failures += 1
+                write({'status': 'error', 'error': str(e)})
+    except KeyboardInterrupt:
+        print("Importação interrompida; o diário permite retomar de onde parou", file=sys.stderr)
+        return 130
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        engine.metrics.close()
+        if args.verbose:
+            print(json.dumps(engine.metrics.summary(), ensure_ascii=False, indent=2), file=sys.stderr)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""Cache do esquema de tipos de item do Zotero.
+
+Os tipos de item, seus campos válidos e os templates vêm do endpoint
+/schema da API do Zotero (um único pedido, revalidado por ETag) e ficam
+salvos em disco. Em memória, os campos de cada tipo são frozensets e os
+templates são entregues como cópias profundas, sem nenhuma chamada por item.
+"""
+import copy
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+ZOTERO_API = 'https://api.zotero.org'
+
+# Campos de um item que não são texto
+LIST_FIELDS = {'creators', 'tags', 'notes', 'collections', 'relations'}
+
+# Um SchemaCache por arquivo, compartilhado entre importações do mesmo processo
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def build_template(item_type):
+    """Monta o template de um tipo de item a partir da entrada do /schema"""
+    template = {'itemType': item_type['itemType']}
+    creator_types = item_type.get('creatorTypes', [])
+    primary = next((c['creatorType'] for c in creator_types if c.get('primary')), None)
+    if primary or creator_types:
+        template['creators'] = [{
+            'creatorType': primary or creator_types[0]['creatorType'],
+            'firstName': '',
+            'lastName': ''
+        }]
+    else:
+        template['creators'] = []
+    for field in item_type.get('fields', []):
+        template[field['field']] = ''
+    template.update({'tags': [], 'collections': [], 'relations': {}})
+    return template
+
+
+class SchemaCache:
+    """Campos válidos e templates por tipo de item, persistidos em disco"""
+
+    def __init__(self, path, max_age=24 * 3600, endpoint=ZOTERO_API, timeout=15):
+        self.path = path
+        self.max_age = max_age
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.version = None
+        self.etag = None
+        self.checked = 0
+        self._fields = {}
+        self._templates = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def shared(cls, path, **kwargs):
+        """Retorna a instância do processo para este arquivo, criando-a se preciso"""
+        with _instances_lock:
+            if path not in _instances:
+                _instances[path] = cls(path, **kwargs)
+            return _instances[path]
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.version = data.get('version')
+        self.etag = data.get('etag')
+        self.checked = data.get('checked', 0)
+        self._fields = {t: frozenset(fields) for t, fields in data.get('fields', {}).items()}
+        self._templates = data.get('templates', {})
+
+    def _save(self):
+        if not self.path:
+            return
+        data = {
+            'version': self.version,
+            'etag': self.etag,
+            'checked': self.checked,
+            'fields': {t: sorted(fields) for t, fields in self._fields.items()},
+            'templates': self._templates,
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def ensure_loaded(self, zot):
+        """Garante um esquema atual, revalidando no máximo uma vez a cada max_age"""
+        with self._lock:
+            if self._fields and time.time() - self.checked < self.max_age:
+                return
+            if not self._refresh_schema() and not self._fields:
+                self._load_from_client(zot)
+            self.checked = time.time()
+            self._save()
+
+    def _refresh_schema(self):
+        """GET /schema condicional; retorna False se o endpoint não respondeu"""
+        import requests
+        headers = {'If-None-Match': self.etag} if self.etag and self._fields else {}
+        try:
+            response = requests.get(f"{self.endpoint}/schema", headers=headers, timeout=self.timeout)
+        except requests.RequestException:
+            return False
+        if response.status_code == 304:
+            return True
+        if response.status_code != 200:
+            return False
+
+        schema = response.json()
+        self.version = schema.get('version')
+        self.etag = response.headers.get('ETag')
+        self._fields = {}
+        self._templates = {}
+        for item_type in schema.get('itemTypes', []):
+            name = item_type['itemType']
+            self._fields[name] = frozenset(field['field'] for field in item_type.get('fields', []))
+            self._templates[name] = build_template(item_type)
+        return True
+
+    def _load_from_client(self, zot):
+        """Alternativa quando /schema não está disponível: pyzotero, tipo a tipo"""
+        try:
+            for item_type in zot.item_types():
+                type_fields = zot.item_type_fields(item_type['itemType'])
+                self._fields[item_type['itemType']] = frozenset(field['field'] for field in type_fields)
+        except Exception as e:
+            raise Exception(f"Erro ao obter campos válidos do Zotero: {str(e)}")
+
+    def valid_fields(self, item_type):
+        """Campos válidos do tipo, ou None se o tipo não existir"""
+        return self._fields.get(item_type)
+
+    def validate(self, item):
+        """Problemas que impedem a criação do item; lista vazia se ele é válido
+
+        Campos desconhecidos não contam, porque são descartados na criação.
+        Sem esquema carregado, só a estrutura do item é conferida.
+        """
+        if not isinstance(item, dict):
+            return ["o item não é um objeto JSON"]
+        problems = []
+        item_type = item.get('itemType', 'journalArticle')
+        if self._fields and item_type not in self._fields:
+            problems.append(f"itemType desconhecido: {item_type}")
+        if not isinstance(item.get('title'), str) or not item['title'].strip():
+            problems.append("sem título")
+        creators = item.get('creators', [])
+        if not isinstance(creators, list) or not all(
+                isinstance(c, dict) and (c.get('lastName') or c.get('name')) for c in creators):
+            problems.append("creators fora do formato do Zotero")
+        for field, value in item.items():
+            if field not in LIST_FIELDS and not field.startswith('_') and not isinstance(value, (str, int, float)):
+                problems.append(f"valor inválido em {field}")
+        return problems
+
+    def template(self, item_type, zot):
+        """Cópia de um template; busca no Zotero só se o tipo não estiver no cache"""
+        template = self._templates.get(item_type)
+        if template is None:
+            template = zot.item_template(item_type)
+            with self._lock:
+                self._templates[item_type] = template
+                self._save()
+        return copy.deepcopy(template)
@@ -0,0 +1,173 @@
+"""Envio concorrente de lotes ao Zotero, com retentativas e backoff.
+
+Vários lotes são enviados ao mesmo tempo, cada thread com seu próprio
+cliente pyzotero. Os cabeçalhos Backoff e Retry-After da API pausam todas as
+threads, e só os itens que falharam por erro temporário (mapa 'failed' da
+resposta, ou o lote inteiro se a requisição caiu) são reenviados.
+"""
+import functools
+import importlib
+import inspect
+import sys
+import threading
+import time
+
+# Códigos de falha por item que valem nova tentativa
+TRANSIENT_CODES = {408, 409, 412, 429, 500, 502, 503, 504}
+
+
+@functools.lru_cache(maxsize=None)
+def zotero_error(name):
+    """Classe de erro do pyzotero; versões recentes acrescentaram o sufixo Error aos nomes
+
+    O pyzotero só é importado aqui, no primeiro erro ou lote, para não pesar
+    na abertura da janela e do CLI.
+    """
+    from pyzotero import zotero_errors
+    return getattr(zotero_errors, f"{name}Error", None) or getattr(zotero_errors, name)
+
+
+@functools.lru_cache(maxsize=None)
+def network_errors():
+    """Erros de rede do cliente HTTP que o pyzotero usa (httpx2, httpx ou requests, conforme a versão)
+
+    A base vem do módulo HTTP importado pelo próprio cliente do pyzotero, já
+    que nenhuma dessas bibliotecas deriva seus erros de OSError (só alguns
+    do requests). Importados no primeiro erro.
+    """
+    from pyzotero import zotero
+    errors = [OSError]
+    client = sys.modules.get(zotero.Zotero.__module__, zotero)
+    modules = [value for value in vars(client).values() if inspect.ismodule(value)]
+    for name in ('httpx2', 'httpx', 'requests'):
+        try:
+            modules.append(importlib.import_module(name))
+        except ImportError:
+            pass
+    for module in modules:
+        base = getattr(module, 'RequestError', None) or getattr(module, 'RequestException', None)
+        if isinstance(base, type) and issubclass(base, Exception) and base not in errors:
+            errors.append(base)
+    return tuple(errors)
+
+
+class ZoteroUploader:
+    """Envia lotes de itens ao Zotero e devolve um relatório por item"""
+
+    def __init__(self, client_factory, max_retries=4, base_delay=1.0, max_delay=60.0, metrics=None):
+        self.client_factory = client_factory
+        # ImportMetrics opcional: cada lote vira um registro 'create_items' com o tamanho do lote
+        self.metrics = metrics
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._local = threading.local()
+        self._backoff_lock = threading.Lock()
+        self._resume_at = 0.0
+
+    def _client(self):
+        # pyzotero guarda o último request na instância; uma por thread
+        if not hasattr(self._local, 'zot'):
+            self._local.zot = self.client_factory()
+        return self._local.zot
+
+    def _last_response(self, zot):
+        return getattr(zot, 'request', None)
+
+    def _pause(self, seconds):
+        """Pausa todas as threads até o fim do backoff pedido pela API"""
+        with self._backoff_lock:
+            self._resume_at = max(self._resume_at, time.time() + seconds)
+
+    def _wait_backoff(self):
+        delay = self._resume_at - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _honor_headers(self, zot):
+        headers = getattr(self._last_response(zot), 'headers', None) or {}
+        for header in ('Backoff', 'Retry-After'):
+            value = headers.get(header)
+            if value:
+                try:
+                    self._pause(min(float(value), self.max_delay))
+                except ValueError:
+                    pass
+
+    def _is_transient(self, zot, error):
+        if isinstance(error, zotero_error('TooManyRequests')):
+            return True
+        # Conexão caída, tempo esgotado e afins também são temporários
+        if isinstance(error, network_errors()):
+            return True
+        status = getattr(self._last_response(zot), 'status_code', None)
+        return status in TRANSIENT_CODES
+
+    def upload(self, entries):
+        """Envia um lote [(id, item), ...]
+
+        Retorna {'success': {id: chave}, 'failed': {id: {'code', 'message'}}}.
+        Nenhum item some do relatório: o que não foi criado aparece em 'failed'.
+        """
+        stats = {'retries': 0, 'waited': 0.0}
+        start = time.perf_counter()
+        report = self._upload(entries, stats)
+        if self.metrics is not None:
+            status = 'ok' if not report['failed'] else 'partial' if report['success'] else 'error'
+            self.metrics.record('zotero', 'create_items', time.perf_counter() - start, stats['waited'],
+                                stats['retries'], status, batch_size=len(entries),
+                                failed=len(report['failed']) or None)
+        return report
+
+    def _upload(self, entries, stats):
+        zot = self._client()
+        pending = list(entries)
+        report = {'success': {}, 'failed': {}}
+
+        for attempt in range(self.max_retries + 1):
+            if not pending:
+                break
+            waiting = time.perf_counter()
+            if attempt:
+                stats['retries'] = attempt
+                time.sleep(min(self.base_delay * 2 ** (attempt - 1), self.max_delay))
+            self._wait_backoff()
+            stats['waited'] += time.perf_counter() - waiting
+
+            items = [item for _, item in pending]
+            # Sem isto, uma falha antes da resposta deixaria o status e os cabeçalhos da tentativa anterior
+            zot.request = None
+            try:
+                zot.check_items(items)
+                result = zot.create_items(items)
+            except zotero_error('InvalidItemFields') as e:
+                for item_id, _ in pending:
+                    report['failed'][item_id] = {'code': 400, 'message': str(e)}
+                return report
+            except Exception as e:
+                self._honor_headers(zot)
+                status = getattr(self._last_response(zot), 'status_code', None)
+                failure = {'code': status or 0, 'message': str(e)}
+                if not self._is_transient(zot, e) or attempt == self.max_retries:
+                    for item_id, _ in pending:
+                        report['failed'][item_id] = failure
+                    return report
+                continue
+
+            self._honor_headers(zot)
+            retry = []
+            for position, (item_id, item) in enumerate(pending):
+                key = result.get('success', {}).get(str(position))
+                if key is None:
+                    key = result.get('unchanged', {}).get(str(position))
+                if key is not None:
+                    report['success'][item_id] = key
+                    report['failed'].pop(item_id, None)
+                    continue
+                failure = result.get('failed', {}).get(str(position), {'code': 0, 'message': 'Sem resposta do Zotero'})
+                report['failed'][item_id] = failure
+                if failure.get('code') in TRANSIENT_CODES:
+                    retry.append((item_id, item))
+            pending = retry
+
+        return report